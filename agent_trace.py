@@ -0,0 +1,404 @@
+"""
+Step timeline of the browser agents.
+
+An agent run in a book module is an opaque loop of "ask the LLM, run the
+actions it picked". The trace of a run (started by agent_usage.run_agent) shows
+where each step's seconds go:
+
+    llm      LLM think time (llm_cache.LLMUsageCounter reports every call)
+    action   controller actions decorated with @traced_action, e.g.
+             fill_bet9ja_stake_amount, timed as a whole
+    js       their page.evaluate() calls, made through evaluate_js()
+    wait     the `await new Promise(resolve => setTimeout(resolve, N))` sleeps
+             inside that JS, measured in the page only when the "tracing"
+             instrument_waits setting of config.json is on
+    other    the rest: browser state capture, built-in actions (click, type,
+             navigate), browser_use bookkeeping
+
+A step starts with an LLM call and lasts until the next one. The built-in actions
+of a step are named from the agent history.
+
+got.py prints the timeline of every run of a placement, grouped by leg, and
+returns it in result["agent_timeline"].
+
+By default the scripts are run exactly as written and only their page.evaluate()
+time is recorded. instrument_waits rewrites the scripts of the traced actions to
+time their sleeps; these are the scripts that fill stakes and click place, so
+leave it off outside of debugging.
+"""
+
+import asyncio
+import functools
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_TRACING_SETTINGS = {
+    # Rewrite the setTimeout sleeps of traced scripts to measure them (changes the scripts run on the books)
+    "instrument_waits": False,
+}
+
+TIMELINE_WIDTH = 60
+
+# Bar characters, highest priority first when a slot overlaps several
+BAR_CHARS = (("wait", "w"), ("js", "J"), ("action", "A"), ("llm", "L"))
+
+_WAIT_PATTERN = re.compile(r"new Promise\(\s*(\w+)\s*=>\s*setTimeout\(\s*\1\s*,\s*([^()]+?)\s*\)\s*\)")
+_FUNCTION_PATTERN = re.compile(r"^\s*(async\s+)?(\([^)]*\)\s*=>|\w+\s*=>|function\b)")
+
+_WAIT_WRAPPER = """async (__arbArg) => {
+    const __arbWaits = [];
+    const __arbWait = async (ms) => {
+        const started = performance.now();
+        await new Promise(resolve => setTimeout(resolve, ms));
+        __arbWaits.push(performance.now() - started);
+    };
+    const __arbResult = await (%s)(__arbArg);
+    return { result: __arbResult, waits: __arbWaits };
+}"""
+
+_instrumented_scripts: Dict[str, Optional[str]] = {}
+
+_tracing_settings = dict(DEFAULT_TRACING_SETTINGS)
+
+
+def configure_tracing(**settings):
+    """Apply the "tracing" section of config.json (DEFAULT_TRACING_SETTINGS keys)"""
+    _tracing_settings.update(settings)
+
+
+class AgentTrace:
+    """LLM calls and traced actions of one agent run, in seconds since its start"""
+
+    def __init__(self, bookmaker: str, role: str):
+        self.bookmaker = bookmaker
+        self.role = role
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.seconds = 0.0
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.actions: List[Dict[str, Any]] = []
+        self.step_actions: List[List[str]] = []
+        self._pending_llm: Dict[Any, Dict[str, Any]] = {}
+
+    def now(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def llm_started(self, call_id):
+        call = {"start": self.now(), "end": None, "cached": False}
+        self._pending_llm[call_id] = call
+        self.llm_calls.append(call)
+
+    def llm_finished(self, call_id, cached: bool = False):
+        call = self._pending_llm.pop(call_id, None)
+        if call is not None:
+            call["end"] = self.now()
+            call["cached"] = cached
+
+    def finish(self, history=None):
+        self.seconds = self.now()
+        for call in self._pending_llm.values():
+            call["end"] = self.seconds
+        self._pending_llm.clear()
+        self.step_actions = _history_actions(history)
+
+    def steps(self) -> List[Dict[str, Any]]:
+        """
+        Split the run at each LLM call.
+
+        Returns:
+            List[Dict[str, Any]]: One entry per step (step 0 is the setup before the
+            first LLM call, when there is any): start, seconds, llm, cached, actions
+            (name, seconds, js, wait), builtin action names and other seconds.
+        """
+        starts = [call["start"] for call in self.llm_calls]
+        # (step number, start); a setup step only if something ran before the first LLM call
+        bounds = [(0, 0.0)] if not starts or starts[0] > 0.05 else []
+        bounds += [(number, start) for number, start in enumerate(starts, 1)]
+
+        steps = []
+        for index, (number, start) in enumerate(bounds):
+            end = bounds[index + 1][1] if index + 1 < len(bounds) else self.seconds
+            calls = [call for call in self.llm_calls if start <= call["start"] < end]
+            llm = sum((call["end"] or end) - call["start"] for call in calls)
+            actions = [
+                {
+                    "name": action["name"],
+                    "seconds": round(action["end"] - action["start"], 3),
+                    "js": round(action["js"], 3),
+                    "wait": round(sum(action["waits"]), 3),
+                }
+                for action in self.actions if start <= action["start"] < end
+            ]
+            traced = {action["name"] for action in actions}
+            builtin = []
+            if number >= 1 and number - 1 < len(self.step_actions):
+                builtin = [name for name in self.step_actions[number - 1] if name not in traced]
+            busy = llm + sum(action["seconds"] for action in actions)
+            steps.append({
+                "step": number,
+                "start": round(start, 3),
+                "seconds": round(end - start, 3),
+                "llm": round(llm, 3),
+                "cached": bool(calls) and all(call["cached"] for call in calls),
+                "actions": actions,
+                "builtin": builtin,
+                "other": round(max(0.0, end - start - busy), 3),
+            })
+        return steps
+
+    def totals(self) -> Dict[str, float]:
+        llm = sum((call["end"] or self.seconds) - call["start"] for call in self.llm_calls)
+        action = sum(action["end"] - action["start"] for action in self.actions)
+        js = sum(action["js"] for action in self.actions)
+        wait = sum(sum(action["waits"]) for action in self.actions)
+        return {
+            "seconds": round(self.seconds, 3),
+            "llm": round(llm, 3),
+            "action": round(action, 3),
+            "js": round(js, 3),
+            "wait": round(wait, 3),
+            "other": round(max(0.0, self.seconds - llm - action), 3),
+        }
+
+    def bar(self, width: int = TIMELINE_WIDTH) -> str:
+        """The run as one line, e.g. LLLLL..AJJwwwwLLL, each char 1/width of the run"""
+        if self.seconds <= 0:
+            return ""
+        intervals = {"llm": [], "action": [], "js": [], "wait": []}
+        for call in self.llm_calls:
+            intervals["llm"].append((call["start"], call["end"] or self.seconds))
+        for action in self.actions:
+            intervals["action"].append((action["start"], action["end"]))
+            intervals["js"].extend(action["js_spans"])
+            intervals["wait"].extend(action["wait_spans"])
+
+        slot = self.seconds / width
+        chars = []
+        for index in range(width):
+            middle = (index + 0.5) * slot
+            char = "."
+            for kind, symbol in BAR_CHARS:
+                if any(start <= middle < end for start, end in intervals[kind]):
+                    char = symbol
+                    break
+            chars.append(char)
+        return "".join(chars)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "bookmaker": self.bookmaker,
+            "role": self.role,
+            "started_at": self.started_at,
+            "totals": self.totals(),
+            "steps": self.steps(),
+        }
+
+    def format(self) -> str:
+        """Multi-line timeline of the run"""
+        totals = self.totals()
+
+        def share(seconds):
+            return f"{seconds / totals['seconds'] * 100:.0f}%" if totals["seconds"] else "0%"
+
+        lines = [
+            f"{self.bookmaker} {self.role}: {totals['seconds']:.1f}s — LLM {totals['llm']:.1f}s ({share(totals['llm'])}), "
+            f"actions {totals['action']:.1f}s (JS {totals['js']:.1f}s, waits {totals['wait']:.1f}s), "
+            f"other {totals['other']:.1f}s ({share(totals['other'])})",
+            f"   |{self.bar()}|",
+        ]
+        for step in self.steps():
+            parts = [f"LLM {step['llm']:.1f}s" + (" (cached)" if step["cached"] else "")] if step["step"] else ["setup"]
+            for action in step["actions"]:
+                parts.append(f"{action['name']} {action['seconds']:.1f}s (JS {action['js']:.1f}s, waits {action['wait']:.1f}s)")
+            parts.extend(step["builtin"])
+            parts.append(f"other {step['other']:.1f}s")
+            label = f"step {step['step']}" if step["step"] else "start"
+            lines.append(f"   {label:<7} +{step['start']:5.1f}s  {' → '.join(parts)}")
+        return "\n".join(lines)
+
+
+def _history_actions(history) -> List[List[str]]:
+    """Action names per step from a browser_use AgentHistoryList (empty if unavailable)"""
+    steps = []
+    for item in getattr(history, "history", None) or []:
+        names = []
+        model_output = getattr(item, "model_output", None)
+        for action in getattr(model_output, "action", None) or []:
+            try:
+                dumped = action.model_dump(exclude_unset=True)
+            except Exception:
+                continue
+            names.extend(name for name, params in dumped.items() if params is not None)
+        steps.append(names)
+    return steps
+
+
+_current_trace: ContextVar[Optional[AgentTrace]] = ContextVar("agent_trace", default=None)
+_current_action: ContextVar[Optional[Dict[str, Any]]] = ContextVar("agent_trace_action", default=None)
+
+
+def start_agent_trace(bookmaker: str, role: str) -> AgentTrace:
+    """Start tracing an agent run in the current task (see agent_usage.run_agent)"""
+    trace = AgentTrace(bookmaker, role)
+    _current_trace.set(trace)
+    return trace
+
+
+def end_agent_trace(history=None) -> Optional[AgentTrace]:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.finish(history)
+    _current_trace.set(None)
+    return trace
+
+
+def trace_llm_start(call_id):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.llm_started(call_id)
+
+
+def trace_llm_end(call_id, cached: bool = False):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.llm_finished(call_id, cached)
+
+
+def _start_action(name: str):
+    trace = _current_trace.get()
+    if trace is None:
+        return None, None
+    action = {"name": name, "start": trace.now(), "end": None, "js": 0.0, "waits": [],
+              "js_spans": [], "wait_spans": []}
+    trace.actions.append(action)
+    return trace, _current_action.set(action)
+
+
+def _end_action(trace, token):
+    if trace is None:
+        return
+    action = _current_action.get()
+    action["end"] = trace.now()
+    _current_action.reset(token)
+
+
+def traced_action(func):
+    """Decorator for controller actions: times the action on the current agent trace"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            trace, token = _start_action(func.__name__)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _end_action(trace, token)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace, token = _start_action(func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _end_action(trace, token)
+    return wrapper
+
+
+def _instrument(script: str) -> Optional[str]:
+    """The script with its setTimeout sleeps measured, or None if there is nothing to measure"""
+    if script not in _instrumented_scripts:
+        if len(_instrumented_scripts) >= 256:
+            # Scripts built with f-strings (credentials, stakes) would grow it forever
+            _instrumented_scripts.clear()
+        instrumented = None
+        if _FUNCTION_PATTERN.match(script) and _WAIT_PATTERN.search(script):
+            instrumented = _WAIT_WRAPPER % _WAIT_PATTERN.sub(r"__arbWait(\2)", script.strip())
+        _instrumented_scripts[script] = instrumented
+    return _instrumented_scripts[script]
+
+
+async def evaluate_js(page, script: str, arg: Any = None):
+    """
+    page.evaluate() that adds its time to the traced action in progress. With
+    instrument_waits on, the script is rewritten to also measure its setTimeout
+    sleeps; otherwise it runs unchanged.
+
+    Parameters:
+        page: Playwright page.
+        script (str): JavaScript expression or function.
+        arg: Argument passed to the function.
+
+    Returns:
+        What page.evaluate() returns.
+    """
+    action = _current_action.get()
+    trace = _current_trace.get()
+    if action is None or trace is None:
+        return await page.evaluate(script, arg)
+
+    instrumented = _instrument(script) if _tracing_settings["instrument_waits"] else None
+    started = trace.now()
+    try:
+        if instrumented is None:
+            return await page.evaluate(script, arg)
+        measured = await page.evaluate(instrumented, arg) or {}
+        waits = [ms / 1000 for ms in measured.get("waits") or []]
+        action["waits"].extend(waits)
+        # The sleeps happen in the page in sequence; place them at the end of the call
+        wait_start = trace.now() - sum(waits)
+        action["wait_spans"].append((wait_start, wait_start + sum(waits)))
+        return measured.get("result")
+    finally:
+        ended = trace.now()
+        action["js"] += ended - started
+        action["js_spans"].append((started, ended))
+
+
+def format_timeline(traces: List[AgentTrace]) -> str:
+    """Timelines of a placement's agent runs, grouped by book in first-run order"""
+    books: Dict[str, List[AgentTrace]] = {}
+    for trace in traces:
+        books.setdefault(trace.bookmaker, []).append(trace)
+
+    lines = []
+    for bookmaker, runs in books.items():
+        total = sum(trace.seconds for trace in runs)
+        llm = sum(trace.totals()["llm"] for trace in runs)
+        wait = sum(trace.totals()["wait"] for trace in runs)
+        lines.append(f"🕒 {bookmaker}: {total:.1f}s in agents (LLM {llm:.1f}s, JS waits {wait:.1f}s)")
+        lines.extend(f"   {trace.format()}".replace("\n", "\n   ") for trace in runs)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    class DemoPage:
+        async def evaluate(self, script, arg=None):
+            waits = [float(ms) for ms in re.findall(r"__arbWait\((\d+)\)", script)]
+            await asyncio.sleep(0.02 + sum(waits) / 1000)
+            return {"result": {"success": True}, "waits": waits} if "__arbWait" in script else {"success": True}
+
+    @traced_action
+    async def fill_demo_stake_amount(page, stake):
+        return await evaluate_js(page, """async (stakeData) => {
+            await new Promise(resolve => setTimeout(resolve, 150));
+            return true;
+        }""", {"stakeAmount": stake})
+
+    async def demo():
+        trace = start_agent_trace("demo", "place")
+        page = DemoPage()
+        for step in range(2):
+            trace_llm_start(step)
+            await asyncio.sleep(0.2)
+            trace_llm_end(step)
+            await fill_demo_stake_amount(page, 10)
+            await asyncio.sleep(0.05)
+        end_agent_trace()
+        print(format_timeline([trace]))
+
+    asyncio.run(demo())
+    configure_tracing(instrument_waits=True)
+    asyncio.run(demo())
@@ -0,0 +1,282 @@
+"""
+LLM usage and cost accounting per browser agent run.
+
+Every Agent.run() in the book modules goes through run_agent(), tagged with
+the book and the agent's role:
+
+    balance   balance checker (agent4)
+    select    navigation and odds selection (agent2)
+    verify    betslip verification (agent3)
+    place     stake entry and place bet (agent5)
+
+While the agent runs, llm_cache.LLMUsageCounter reports every LLM call to
+record_llm_call(). The AgentRun in the current context then collects the model,
+the calls (and cache hits), the input/output tokens and the cost. run_agent()
+adds the number of steps and the wall time, and keeps the run's step timeline
+(agent_trace.py) in AgentRun.trace.
+
+Each run is rolled up three ways:
+- into the UsageLedger of the opportunity being executed (got.py starts one per
+  opportunity and returns ledger.summary() in result["llm_usage"]),
+- into AGENT_USAGE, the process-wide totals per book and role that mainrunner.py
+  logs after every cycle,
+- into the Prometheus counters arb_agent_*.
+
+Costs use MODEL_PRICES (USD per million tokens), which the "llm_usage" section
+of config.json can override.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from agent_trace import end_agent_trace, start_agent_trace
+from metrics import METRICS
+
+
+DEFAULT_LLM_USAGE_SETTINGS = {
+    # USD per million tokens, {model prefix: [input, output]}
+    "prices_per_million": {},
+    # Warn when one opportunity's agents cost more than this (USD); null disables it
+    "budget_per_opportunity_usd": None,
+}
+
+# USD per million input/output tokens; the longest matching model prefix wins
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+}
+
+AGENT_ROLES = ("balance", "select", "verify", "place")
+
+
+def set_model_prices(prices: Dict[str, Any]):
+    """Override or add model prices: {model prefix: [input, output] USD per million tokens}"""
+    for model, (input_price, output_price) in (prices or {}).items():
+        MODEL_PRICES[model] = (float(input_price), float(output_price))
+
+
+def token_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """USD cost of a call, 0 for models without a price"""
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    if not matches:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[max(matches, key=len)]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+class AgentRun:
+    """Usage of one Agent.run()"""
+
+    def __init__(self, bookmaker: str, role: str):
+        self.bookmaker = bookmaker
+        self.role = role
+        self.model = ""
+        self.steps = 0
+        self.llm_calls = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.seconds = 0.0
+        # Step timeline of the run (agent_trace.AgentTrace)
+        self.trace = None
+        self._lock = threading.Lock()
+
+    def add_call(self, model: str, input_tokens: int, output_tokens: int, cache_hit: bool):
+        with self._lock:
+            self.model = self.model or model
+            if cache_hit:
+                self.cache_hits += 1
+                return
+            self.llm_calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cost_usd += token_cost(model, input_tokens, output_tokens)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "bookmaker": self.bookmaker,
+            "role": self.role,
+            "model": self.model,
+            "steps": self.steps,
+            "llm_calls": self.llm_calls,
+            "cache_hits": self.cache_hits,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 5),
+            "seconds": round(self.seconds, 3),
+        }
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"runs": 0, "steps": 0, "llm_calls": 0, "cache_hits": 0,
+            "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0, "seconds": 0.0}
+
+
+def _add_run(totals: Dict[str, Any], run: AgentRun):
+    totals["runs"] += 1
+    for key in ("steps", "llm_calls", "cache_hits", "input_tokens", "output_tokens", "cost_usd", "seconds"):
+        totals[key] += getattr(run, key)
+
+
+def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+    return {**totals, "cost_usd": round(totals["cost_usd"], 5), "seconds": round(totals["seconds"], 3)}
+
+
+class UsageLedger:
+    """Agent runs of one executed opportunity"""
+
+    def __init__(self):
+        self.runs: List[AgentRun] = []
+
+    def add(self, run: AgentRun):
+        self.runs.append(run)
+
+    @property
+    def cost_usd(self) -> float:
+        return sum(run.cost_usd for run in self.runs)
+
+    def summary(self) -> Dict[str, Any]:
+        """Every run, plus totals for the opportunity and per book"""
+        total = _empty_totals()
+        by_book: Dict[str, Dict[str, Any]] = {}
+        for run in self.runs:
+            _add_run(total, run)
+            _add_run(by_book.setdefault(run.bookmaker, _empty_totals()), run)
+        return {
+            "runs": [run.as_dict() for run in self.runs],
+            "by_bookmaker": {book: _rounded(totals) for book, totals in by_book.items()},
+            "total": _rounded(total),
+        }
+
+    def format(self) -> str:
+        """One log line per opportunity"""
+        total = self.summary()["total"]
+        roles = ", ".join(
+            f"{run.bookmaker}/{run.role} {run.steps} steps {run.input_tokens + run.output_tokens} tok ${run.cost_usd:.4f}"
+            for run in self.runs
+        )
+        return (f"{total['llm_calls']} calls, {total['input_tokens']}+{total['output_tokens']} tokens, "
+                f"${total['cost_usd']:.4f}" + (f" ({roles})" if roles else ""))
+
+
+class AgentUsageStore:
+    """Totals per (book, role) since the process started"""
+
+    def __init__(self):
+        self.totals: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, run: AgentRun):
+        with self._lock:
+            _add_run(self.totals.setdefault((run.bookmaker, run.role), _empty_totals()), run)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{book: {role: totals with per-run averages}}"""
+        with self._lock:
+            snapshot: Dict[str, Dict[str, Dict[str, Any]]] = {}
+            for (bookmaker, role), totals in self.totals.items():
+                runs = totals["runs"] or 1
+                snapshot.setdefault(bookmaker, {})[role] = {
+                    **_rounded(totals),
+                    "avg_steps": round(totals["steps"] / runs, 1),
+                    "avg_seconds": round(totals["seconds"] / runs, 2),
+                    "avg_cost_usd": round(totals["cost_usd"] / runs, 5),
+                }
+            return snapshot
+
+
+AGENT_USAGE = AgentUsageStore()
+
+_current_run: ContextVar[Optional[AgentRun]] = ContextVar("agent_run", default=None)
+_current_ledger: ContextVar[Optional[UsageLedger]] = ContextVar("usage_ledger", default=None)
+
+
+def start_usage() -> UsageLedger:
+    """Start collecting the agent runs of an opportunity in the current task"""
+    ledger = UsageLedger()
+    _current_ledger.set(ledger)
+    return ledger
+
+
+def end_usage():
+    _current_ledger.set(None)
+
+
+def record_llm_call(model: str, input_tokens: int, output_tokens: int, cache_hit: bool = False):
+    """Add an LLM call to the agent run in progress (calls outside run_agent() are ignored)"""
+    run = _current_run.get()
+    if run is not None:
+        run.add_call(model, input_tokens, output_tokens, cache_hit)
+
+
+async def run_agent(agent, bookmaker: str, role: str):
+    """
+    Run a browser agent and account for its LLM usage.
+
+    Parameters:
+        agent: The browser_use Agent.
+        bookmaker (str): Book key, e.g. "bet9ja".
+        role (str): One of AGENT_ROLES.
+
+    Returns:
+        The agent's history, as returned by agent.run().
+    """
+    run = AgentRun(bookmaker, role)
+    token = _current_run.set(run)
+    start_agent_trace(bookmaker, role)
+    started = time.perf_counter()
+    history = None
+    try:
+        history = await agent.run()
+        return history
+    finally:
+        run.seconds = time.perf_counter() - started
+        run.steps = len(getattr(history, "history", None) or [])
+        run.trace = end_agent_trace(history)
+        _current_run.reset(token)
+
+        AGENT_USAGE.add(run)
+        ledger = _current_ledger.get()
+        if ledger is not None:
+            ledger.add(run)
+
+        METRICS.inc("arb_agent_runs_total", bookmaker=bookmaker, role=role)
+        METRICS.inc("arb_agent_steps_total", run.steps, bookmaker=bookmaker, role=role)
+        METRICS.inc("arb_agent_seconds_total", run.seconds, bookmaker=bookmaker, role=role)
+        METRICS.inc("arb_agent_tokens_total", run.input_tokens, bookmaker=bookmaker, role=role, direction="input")
+        METRICS.inc("arb_agent_tokens_total", run.output_tokens, bookmaker=bookmaker, role=role, direction="output")
+        METRICS.inc("arb_agent_cost_usd_total", run.cost_usd, bookmaker=bookmaker, role=role)
+        print(f"🧾 {bookmaker} {role} agent: {run.steps} steps, {run.llm_calls} LLM calls "
+              f"+ {run.cache_hits} cached, {run.input_tokens}+{run.output_tokens} tokens, "
+              f"${run.cost_usd:.4f}, {run.seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    class DemoHistory:
+        history = [1, 2, 3]
+
+    class DemoAgent:
+        async def run(self):
+            record_llm_call("gpt-4o", 5200, 310)
+            record_llm_call("gpt-4o", 5600, 280)
+            record_llm_call("gpt-4o", 5600, 280, cache_hit=True)
+            return DemoHistory()
+
+    async def demo():
+        ledger = start_usage()
+        await run_agent(DemoAgent(), "leon", "select")
+        await run_agent(DemoAgent(), "bet9ja", "verify")
+        print(f"🧠 {ledger.format()}")
+        print(f"📊 {AGENT_USAGE.snapshot()}")
+
+    asyncio.run(demo())
@@ -1,5 +1,6 @@
 from playwright.sync_api import sync_playwright
 import json
+import shutil
 import time
 import logging
 import traceback
@@ -11,6 +12,9 @@ import os
 # Add the agent directory to the path to import config_manager
 
 from config_manager import ConfigManager
+from opportunity_io import ARB_OPPORTUNITIES_FILE, AtomicJsonlWriter
+from opportunity_store import OpportunityStore
+from profiling import profile_cycle
 
 
 # Bookmaker ID assignments from breaking-bet.com
@@ -118,21 +122,32 @@ def scrape_arbitrage_opportunities():
     with sync_playwright() as p:
         browser_type = p.chromium
         
-        # Launch browser
+        # Launch browser (headless mode from the "browser" section of config.json;
+        # "new" uses Chrome's new headless mode, which renders like headed Chrome)
+        config = ConfigManager()
+        browser_settings = config.get_browser_settings()
+        scraper_headless = config.get_scraper_headless()
         browser = browser_type.launch(
-            headless=False,
+            headless=bool(scraper_headless),
+            args=["--headless=new"] if scraper_headless == "new" else None,
             slow_mo=100,
         )
         
         # Create context
         context = browser.new_context(
-            viewport={"width": 1366, "height": 768},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+            viewport=browser_settings.get("viewport") or {"width": 1366, "height": 768},
+            user_agent=browser_settings.get("user_agent") or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
         )
         
         # Create page
         page = context.new_page()
         
+        # Rows are streamed into a temp JSONL file as they are extracted and
+        # published over arb_opportunities.jsonl in one rename at the end.
+        # Every row is also recorded in the opportunity store for history.
+        writer = None
+        store = OpportunityStore()
+        
         try:
             # Set timeout
             page.set_default_timeout(60000)
@@ -192,7 +207,7 @@ def scrape_arbitrage_opportunities():
                     time.sleep(2)
                 else:
                     logger.error("❌ Could not find filter icon")
-                    return []
+                    return 0
             
             # Wait for modal
             logger.info("Waiting for filter modal...")
@@ -202,7 +217,7 @@ def scrape_arbitrage_opportunities():
                 page.screenshot(path="modal_open.png")
             except Exception as e:
                 logger.error(f"❌ Filter modal not found: {e}")
-                return []
+                return 0
             
             # Uncheck Handicaps, Ind. totals, and Additional markets
             logger.info("Unchecking specific markets (Handicaps, Ind. totals, totals, Additional)...")
@@ -692,9 +707,12 @@ def scrape_arbitrage_opportunities():
 
             # Log what we found
             logger.info(f"Extraction complete. Found {len(main_opportunities)} opportunities")
+            writer = AtomicJsonlWriter(ARB_OPPORTUNITIES_FILE)
+            writer.write_many(main_opportunities)
+            store.ingest(main_opportunities)
             if len(main_opportunities) > 0:
                 logger.info("First opportunity sample:")
-                logger.info(json.dumps(main_opportunities[0], indent=2))
+                logger.info(json.dumps(main_opportunities[0]))
             else:
                 logger.error("No opportunities extracted despite being visible")
                 # Take screenshot for debugging
@@ -719,7 +737,7 @@ def scrape_arbitrage_opportunities():
             logger.info(f"Found {len(show_all_links)} 'show all' links")
             
             # Process each "show all" link
-            detailed_opportunities = []
+            detailed_count = 0
             for i, link_data in enumerate(show_all_links):
                 try:
                     logger.info(f"Processing 'show all' link {i+1}/{len(show_all_links)}: {link_data['text']}")
@@ -983,9 +1001,11 @@ def scrape_arbitrage_opportunities():
                     # FIX: Directly add the opportunities to our collection without filtering
                     # Instead of using detailed_page_opportunities_to_add which is being filtered
                     if len(detailed_page_opportunities) > 0:
-                        # Add all opportunities directly
-                        detailed_opportunities.extend(detailed_page_opportunities)
-                        logger.info(f"Added {len(detailed_page_opportunities)} opportunities to our collection")
+                        # Append them to the JSONL output straight away
+                        writer.write_many(detailed_page_opportunities)
+                        store.ingest(detailed_page_opportunities)
+                        detailed_count += len(detailed_page_opportunities)
+                        logger.info(f"Added {len(detailed_page_opportunities)} opportunities to {ARB_OPPORTUNITIES_FILE}")
                     else:
                         logger.warning(f"No opportunities extracted from detailed page {i+1}")
                     
@@ -1039,68 +1059,49 @@ def scrape_arbitrage_opportunities():
                         time.sleep(5)  # Longer wait for main page
                         page.wait_for_selector('.loot_wrap', timeout=60000)
             
-            # Process all collected opportunities
-            all_opportunities = main_opportunities + detailed_opportunities
-            
-            # FIX: Skip filtering and just report the count
-            logger.info(f"Total opportunities found: {len(all_opportunities)}")
+            # Publish everything written so far
+            total_count = writer.count
+            logger.info(f"Total opportunities found: {total_count} ({len(main_opportunities)} main, {detailed_count} detailed)")
+            writer.commit()
             
-            # FIX: Always save opportunities, even if there's only a few
-            if len(all_opportunities) > 0:
-                # Create timestamp for filename
+            if total_count > 0:
+                # Keep a timestamped copy of this scrape; a hard link avoids writing the rows twice
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                
-                # Create directory if it doesn't exist
                 os.makedirs("opportunities", exist_ok=True)
-                
-                # Save to JSON file
-                output_file =  r"arb_opportunities.json"
-                with open(output_file, 'w') as f:
-                    json.dump(all_opportunities, f, indent=2)
-                
-                # Also save a copy to fixed location for easy access
-                with open("arb_opportunities.json", 'w') as f:
-                    json.dump(all_opportunities, f, indent=2)
+                archive_file = os.path.join("opportunities", f"arb_opportunities_{timestamp}.jsonl")
+                try:
+                    os.link(ARB_OPPORTUNITIES_FILE, archive_file)
+                except OSError:
+                    shutil.copyfile(ARB_OPPORTUNITIES_FILE, archive_file)
                     
-                logger.info(f"✅ Saved {len(all_opportunities)} arbitrage opportunities to {output_file}")
-                return all_opportunities
+                logger.info(f"✅ Saved {total_count} arbitrage opportunities to {ARB_OPPORTUNITIES_FILE}")
             else:
                 logger.warning("⚠️ No opportunities found to save")
-                
-            
-                empty_opportunities = []
-    
-                output_file = r"arb_opportunities.json"
-                with open(output_file, 'w') as f:
-                 json.dump(empty_opportunities, f, indent=2)
-    
-                with open("arb_opportunities.json", 'w') as f:
-                  json.dump(empty_opportunities, f, indent=2)
-    
-                logger.info("🧹 Cleared opportunities file (set to empty array)")
-                return []
+                logger.info("🧹 Cleared opportunities file (no rows)")
+            return total_count
             
             
             
         except Exception as e:
             logger.error(f"Error during scraping: {str(e)}")
             logger.error(traceback.format_exc())
+            if writer is not None:
+                writer.abort()
             page.screenshot(path="error.png")
-            return []
+            return 0
             
         finally:
+            store.close()
             browser.close()
             logger.info("Browser closed")
 
 if __name__ == "__main__":
     logger.info("=== Starting Arbitrage Scraper ===")
     try:
-        opportunities = scrape_arbitrage_opportunities()
-        logger.info(f"Scraping complete. Found {len(opportunities)} opportunities")
-        
-        if opportunities:
-            logger.info("Sample opportunity:")
-            logger.info(json.dumps(opportunities[0], indent=2))
+        # Profiled if profiling is on and this run falls in the sample fraction
+        with profile_cycle("scraper", ConfigManager().get_profiling_settings()):
+            opportunity_count = scrape_arbitrage_opportunities()
+        logger.info(f"Scraping complete. Found {opportunity_count} opportunities")
     except Exception as e:
         logger.error(f"Fatal error: {str(e)}")
         logger.error(traceback.format_exc())
\ No newline at end of file
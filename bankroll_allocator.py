@@ -0,0 +1,201 @@
+"""
+Bankroll allocation across all currently executable arbitrage opportunities.
+
+Instead of sizing every arb on its own against a fixed max stake, the allocator
+looks at the whole filtered generation together with the last known balance of
+each book and hands out stakes greedily, best profit percent first, subject to:
+  - the balance left on every book a leg is placed on
+  - a per-event exposure cap (several arbs on the same match share it)
+  - a per-arb max stake and a minimum worth placing
+
+With two legs per arb every constraint is linear in the arb's total stake, so
+the greedy pass by profit percent is the fractional-knapsack optimum for a
+single binding book and a good approximation otherwise. It runs in
+microseconds, so it can be re-run on every scrape.
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from stake_engine import batch_arbitrage_stakes, odds_matrix
+
+
+BALANCE_CACHE_FILE = "balance_cache.json"
+
+DEFAULT_BANKROLL_SETTINGS = {
+    "max_stake_per_arb_usd": 30,
+    "max_event_exposure_usd": 60,
+    "min_stake_per_arb_usd": 2,
+    "balance_cache_ttl_minutes": 30,
+}
+
+
+class BalanceCache:
+    """
+    Last known balance of every book, in USD, persisted between runs.
+
+    Balances older than the TTL are treated as unknown so a stale number never
+    constrains (or inflates) an allocation.
+    """
+
+    def __init__(self, path: str = BALANCE_CACHE_FILE, ttl_seconds: float = 30 * 60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.balances = self._load()
+        # Lookups answered with a fresh balance vs. unknown/stale ones
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """Write the cache atomically next to its target"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".balance_cache.", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.balances, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def update(self, bookmaker: str, balance_usd: float, balance: float = None, currency: str = "USD"):
+        """Record a freshly checked balance"""
+        self.balances[bookmaker.lower()] = {
+            "balance_usd": round(float(balance_usd), 2),
+            "balance": balance,
+            "currency": currency,
+            "updated_at": time.time(),
+        }
+        self.save()
+
+    def debit(self, bookmaker: str, amount_usd: float):
+        """Subtract a placed stake so the next allocation does not reuse it"""
+        entry = self.balances.get(bookmaker.lower())
+        if entry:
+            entry["balance_usd"] = round(max(0.0, entry["balance_usd"] - amount_usd), 2)
+            self.save()
+
+    def _is_fresh(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and time.time() - entry.get("updated_at", 0) <= self.ttl_seconds
+
+    def get_usd(self, bookmaker: str) -> Optional[float]:
+        """Fresh balance of a book in USD, or None if unknown or stale"""
+        entry = self.balances.get(bookmaker.lower())
+        if not self._is_fresh(entry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["balance_usd"]
+
+    def fresh_books(self) -> List[str]:
+        """Books with a fresh balance, without counting as cache lookups (for monitoring)"""
+        return [bookmaker for bookmaker, entry in list(self.balances.items()) if self._is_fresh(entry)]
+
+    def available(self) -> Dict[str, float]:
+        """All fresh balances in USD"""
+        fresh = {}
+        for bookmaker in self.balances:
+            balance = self.get_usd(bookmaker)
+            if balance is not None:
+                fresh[bookmaker] = balance
+        return fresh
+
+
+def event_key(opportunity: Dict) -> str:
+    """Identify the underlying match so arbs on the same event share one exposure cap"""
+    matchup = opportunity.get("matchup")
+    if matchup:
+        return f"{matchup}|{opportunity.get('event_time', '')}".lower()
+    teams = sorted(str(opportunity.get(field, "")).lower() for field in ("team1_bk1", "team2_bk1"))
+    return f"{teams[0]}|{teams[1]}|{opportunity.get('event_time', '')}".lower()
+
+
+def allocate_bankroll(opportunities: Sequence[Dict], balances_usd: Dict[str, float],
+                      settings: Optional[Dict] = None) -> List[Dict]:
+    """
+    Allocate stakes across opportunities to maximize expected profit.
+
+    Parameters:
+        opportunities (Sequence[Dict]): Executable opportunities (odd_bk1, odd_bk2, bookmaker1, bookmaker2, ...).
+        balances_usd (Dict[str, float]): Known balance per book in USD. Books missing here are
+            not constrained by balance; the balance check at execution time still applies.
+        settings (Dict): Overrides for DEFAULT_BANKROLL_SETTINGS.
+
+    Returns:
+        List[Dict]: Copies of the funded opportunities, best profit percent first, each with
+        "allocated_stake_usd" (total across legs) and "allocated_stakes_usd" (per leg).
+    """
+    if not opportunities:
+        return []
+
+    config = dict(DEFAULT_BANKROLL_SETTINGS)
+    config.update(settings or {})
+    max_stake = float(config["max_stake_per_arb_usd"])
+    max_exposure = float(config["max_event_exposure_usd"])
+    min_stake = float(config["min_stake_per_arb_usd"])
+
+    # Stake weights for a total of 1 and the profit percent of every arb in one pass
+    engine = batch_arbitrage_stakes(odds_matrix(opportunities), 1.0)
+    weights = engine["stakes"]
+    profit_percent = np.nan_to_num(engine["profit_percent"], nan=-np.inf)
+    order = np.argsort(-profit_percent, kind="stable")
+
+    remaining = {bookmaker.lower(): float(balance) for bookmaker, balance in balances_usd.items()}
+    exposure = {}
+    allocations = []
+
+    for index in order:
+        if not engine["is_arbitrage"][index]:
+            continue
+        opportunity = opportunities[index]
+        legs = [
+            (str(opportunity.get(f"bookmaker{leg + 1}", "")).lower(), float(weights[index, leg]))
+            for leg in range(weights.shape[1]) if weights[index, leg] > 0
+        ]
+
+        # Weight per book (both legs could be on the same book)
+        book_weights = {}
+        for bookmaker, weight in legs:
+            book_weights[bookmaker] = book_weights.get(bookmaker, 0.0) + weight
+
+        key = event_key(opportunity)
+        cap = min(max_stake, max_exposure - exposure.get(key, 0.0))
+        for bookmaker, weight in book_weights.items():
+            if bookmaker in remaining:
+                cap = min(cap, remaining[bookmaker] / weight)
+
+        if cap < min_stake:
+            continue
+
+        for bookmaker, weight in book_weights.items():
+            if bookmaker in remaining:
+                remaining[bookmaker] -= cap * weight
+        exposure[key] = exposure.get(key, 0.0) + cap
+
+        allocated = dict(opportunity)
+        allocated["allocated_stake_usd"] = round(cap, 2)
+        allocated["allocated_stakes_usd"] = [round(cap * weight, 2) for _, weight in legs]
+        allocations.append(allocated)
+
+    return allocations
+
+
+if __name__ == "__main__":
+    example = [
+        {"bookmaker1": "bet9ja", "bookmaker2": "leon", "odd_bk1": "2.10", "odd_bk2": "2.05", "matchup": "A vs B", "event_time": "Jul 04, 10:35"},
+        {"bookmaker1": "bet9ja", "bookmaker2": "vbet", "odd_bk1": "2.20", "odd_bk2": "2.00", "matchup": "C vs D", "event_time": "Jul 04, 12:00"},
+        {"bookmaker1": "leon", "bookmaker2": "vbet", "odd_bk1": "1.80", "odd_bk2": "2.40", "matchup": "A vs B", "event_time": "Jul 04, 10:35"},
+    ]
+    balances = {"bet9ja": 25.0, "leon": 40.0, "vbet": 15.0}
+    print(f"💼 Allocating bankroll {balances}")
+    for allocation in allocate_bankroll(example, balances):
+        print(f"  {allocation['bookmaker1']}/{allocation['bookmaker2']} {allocation['matchup']}: "
+              f"${allocation['allocated_stake_usd']} {allocation['allocated_stakes_usd']}")
@@ -0,0 +1,569 @@
+"""
+Offline end-to-end benchmark of the arbitrage executor.
+
+Drives ArbitrageBettingSystem.execute_arbitrage (pipelined) through N synthetic
+opportunities without real bookmakers or API keys:
+
+- MockBookServer serves a Bet9ja-style book on 127.0.0.1: the account header
+  (.myaccount__details), event pages with a 1-2 market, the betslip
+  (.betslip__match), the stake input and the place bet button. Every executor
+  browser session routes bet9ja.com and sports.bet9ja.com to it, so the real
+  bet9ja.py code (direct balance read, controller actions, odds gate) runs
+  unchanged against it. Both legs of every opportunity are placed on the mock book.
+- ScriptedChatModel stands in for the LLM. It answers each agent (balance,
+  select, verify, place) with the actions a good model picks, after a fixed
+  think time, and reports token usage like an API model does.
+- Exchange rates come from an offline snapshot (OFFLINE_RATES).
+
+The run happens in a scratch directory with its own config.json, Chrome
+profiles, sessions/ and conversations/, so real profiles and login states are
+never touched. The report gives p50/p95 seconds per phase (the latency.py spans),
+throughput and LLM calls per opportunity. Needs Chrome (--chrome) or
+`playwright install chromium`.
+
+    python benchmark_e2e.py --opportunities 20 --think 1.5 --page-delay 0.2 --json before.json
+"""
+
+import argparse
+import ast
+import asyncio
+import html
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from browser_sessions import add_session_hook, remove_session_hook
+from got import ArbitrageBettingSystem
+from llm_cache import set_chat_model_factory
+from metrics import METRICS
+
+
+MOCK_BOOK = "bet9ja"
+MOCK_BOOK_URL_PATTERN = re.compile(r"^https?://(sports\.)?bet9ja\.com(/|$)")
+MOCK_BALANCE = 250000.00
+
+# Units per 1 USD, a fixed snapshot so stake calculation never calls the rate API
+OFFLINE_RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "NGN": 1530.0, "RUB": 81.5, "TRY": 32.4}
+
+BET_TYPE_PICKS = {"DNB1": "1", "DNB2": "2"}
+
+# ==================== MOCK BOOK ====================
+
+MOCK_PAGE_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Bet9ja (benchmark mock)</title>
+<style>
+  .alert-success {{ display: none; }}
+  .betslip {{ position: fixed; right: 0; top: 0; width: 320px; }}
+</style>
+</head>
+<body>
+<header>
+  <div class="myaccount__details">
+    <div class="myaccount__heading">Withdrawable balance</div>
+    <div class="txt-cut">₦ <span style="all: unset">{balance}</span></div>
+  </div>
+</header>
+<main>{market}</main>
+<aside class="betslip">
+  <div class="betslip__body" id="slip"></div>
+  <div>Potential win: <span class="betslip__potential-win" id="potential-win">0.00</span></div>
+  <button id="betslip_buttons_placebet" class="btn btn-green-l"><span>Place Bet</span></button>
+  <div class="alert-success" id="placed"></div>
+</aside>
+<script>
+  const slip = document.getElementById('slip');
+  const placed = document.getElementById('placed');
+  let pick = null;
+
+  document.querySelectorAll('button.odds').forEach(button => button.addEventListener('click', () => {{
+    pick = {{ event: button.dataset.event, selection: button.dataset.pick, odd: parseFloat(button.dataset.odd) }};
+    slip.innerHTML = `
+      <div class="betslip__match">
+        <input type="checkbox" class="betslip__cb-input" checked>
+        <strong>${{button.dataset.title}}</strong>
+        <div class="betslip__match-odds"><span>${{button.dataset.pick}}</span> <span class="txt-primary">${{button.dataset.odd}}</span></div>
+        <input type="number" class="input" placeholder="stake">
+      </div>`;
+    slip.querySelector('input[type="number"]').addEventListener('input', event => {{
+      const stake = parseFloat(event.target.value) || 0;
+      document.getElementById('potential-win').textContent = (stake * pick.odd).toFixed(2);
+    }});
+  }}));
+
+  document.getElementById('betslip_buttons_placebet').addEventListener('click', async () => {{
+    const input = slip.querySelector('input[type="number"]');
+    if (!pick || !input || !(parseFloat(input.value) > 0)) return;
+    const response = await fetch('/api/place', {{
+      method: 'POST',
+      headers: {{ 'Content-Type': 'application/json' }},
+      body: JSON.stringify({{ ...pick, stake: parseFloat(input.value) }})
+    }});
+    const ticket = await response.json();
+    slip.innerHTML = '';
+    pick = null;
+    placed.textContent = `Bet placed, ticket ${{ticket.ticket}}`;
+    placed.style.display = 'block';
+  }});
+</script>
+</body>
+</html>
+"""
+
+MOCK_MARKET_HTML = """
+<section class="market">
+  <h1>{title}</h1>
+  <div class="market__title">1-2</div>
+  <button class="odds" data-event="{event}" data-title="{title}" data-pick="1" data-odd="{odd1}">1 {odd1}</button>
+  <button class="odds" data-event="{event}" data-title="{title}" data-pick="2" data-odd="{odd2}">2 {odd2}</button>
+</section>
+"""
+
+
+class _MockBookHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        book = self.server.book
+        time.sleep(book.page_delay)
+        url = urlsplit(self.path)
+        if url.path in ("/", ""):
+            self._send(200, "text/html; charset=utf-8", book.render_page(""))
+        elif url.path.startswith("/event/"):
+            self._send(200, "text/html; charset=utf-8", book.render_page(url.path[len("/event/"):], parse_qs(url.query)))
+        else:
+            self._send(404, "text/plain", "Not found")
+
+    def do_POST(self):
+        book = self.server.book
+        if urlsplit(self.path).path != "/api/place":
+            self._send(404, "text/plain", "Not found")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        bet = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(book.place_delay)
+        ticket = book.record_bet(bet)
+        self._send(200, "application/json", json.dumps({"status": "accepted", "ticket": ticket}))
+
+    def _send(self, status: int, content_type: str, body: str):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockBookServer:
+    """
+    Local Bet9ja-style book for the benchmark.
+
+    Parameters:
+        balance (float): NGN balance shown in the account header.
+        page_delay (float): Seconds added to every page load (network/server time).
+        place_delay (float): Seconds the book takes to accept a bet.
+        odds_drift (float): Fraction the event page odds are shortened by compared
+            to the scraped odds, to exercise the odds gate (0 = unchanged).
+    """
+
+    def __init__(self, balance: float = MOCK_BALANCE, page_delay: float = 0.0,
+                 place_delay: float = 0.0, odds_drift: float = 0.0):
+        self.balance = balance
+        self.page_delay = page_delay
+        self.place_delay = place_delay
+        self.odds_drift = odds_drift
+        self.placed_bets: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.url = ""
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _MockBookHandler)
+        self._server.book = self
+        threading.Thread(target=self._server.serve_forever, name="mock-book", daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        print(f"🏟️ Mock book serving on {self.url}")
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def local_url(self, url: str) -> str:
+        """The mock book URL serving a bet9ja.com / sports.bet9ja.com URL"""
+        parts = urlsplit(url)
+        return f"{self.url}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+
+    def render_page(self, event: str, query: Optional[Dict[str, List[str]]] = None) -> str:
+        market = ""
+        if event:
+            query = query or {}
+            title = f"{query.get('home', ['Home'])[0]} - {query.get('away', ['Away'])[0]}"
+            odds = [float(query.get(key, ["2.00"])[0]) * (1 - self.odds_drift) for key in ("o1", "o2")]
+            market = MOCK_MARKET_HTML.format(
+                event=html.escape(event), title=html.escape(title), odd1=f"{odds[0]:.2f}", odd2=f"{odds[1]:.2f}"
+            )
+        return MOCK_PAGE_HTML.format(balance=f"{self.balance:,.2f}", market=market)
+
+    def record_bet(self, bet: Dict[str, Any]) -> str:
+        with self._lock:
+            self.placed_bets.append(bet)
+            return f"MOCK-{len(self.placed_bets):06d}"
+
+
+# ==================== SCRIPTED LLM ====================
+
+SCRIPT_MARKER = "scripted step"
+
+_ELEMENT_PATTERN = re.compile(r"\[?(\d+)\]?(?:\[:\])?<button[^>]*>\s*([12])\s+(\d+[.,]\d+)")
+
+
+def _message_text(message) -> str:
+    """Text of a message, including the tool calls of earlier model outputs"""
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    tool_calls = getattr(message, "tool_calls", None)
+    return f"{content} {tool_calls}" if tool_calls else str(content)
+
+
+def _last_match(pattern: str, text: str, default: str = "") -> str:
+    matches = re.findall(pattern, text)
+    return matches[-1] if matches else default
+
+
+def _done(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"done": {"success": True, "data": data}}]
+
+
+def agent_script(text: str, step: int, book: str = MOCK_BOOK):
+    """
+    Actions a good model would take at this step of a book agent's task.
+
+    Parameters:
+        text (str): Everything the agent sent (task, page state, earlier action results).
+        step (int): Number of steps the agent already took.
+        book (str): Book key used in the controller action names.
+
+    Returns:
+        tuple: (list of actions, next goal)
+    """
+    if "final bet placer" in text:
+        if step == 0:
+            stake = float(_last_match(r"Your stake amount is (\d+(?:\.\d+)?)", text, "0"))
+            return [{f"fill_{book}_stake_amount": {"stake": stake}}], "Enter the stake"
+        if step == 1:
+            return [{f"click_{book}_place_bet": {}}], "Place the bet"
+        placed = "'success': True" in _last_match(r"Place bet result: (\{[^\n]*\})", text)
+        return _done({"is_place_bet": placed, "error_message": "" if placed else "Place bet failed"}), "Report the result"
+
+    if "balance checker" in text:
+        if step == 0:
+            return [{"go_to_url": {"url": _last_match(r"Navigate to (https?://[^\s\"']+)", text)}}], "Open the book"
+        if step == 1:
+            return [{f"get_{book}_balance": {}}], "Read the balance"
+        balance = _last_match(r"'balance': '([^']+)'", text)
+        return _done({"is_logged_in": bool(balance), "balance": balance, "error_message": ""}), "Report the balance"
+
+    if "You will place a bet on" in text:
+        if step == 0:
+            return [{"go_to_url": {"url": _last_match(r"Go to the provided link: (\S+)", text)}}], "Open the event"
+        input_text = _last_match(r"based on this input data: (\{[^\n]*\})", text, "{}")
+        try:
+            input_data = ast.literal_eval(input_text)
+        except (ValueError, SyntaxError):
+            input_data = {}
+        if step == 1:
+            pick = BET_TYPE_PICKS.get(input_data.get("bet_type_bk", ""))
+            for index, label, _ in _ELEMENT_PATTERN.findall(text):
+                if label == pick:
+                    return [{"click_element_by_index": {"index": int(index)}}], f"Select {pick}"
+            return _done({"input_data": input_data, "error_message": f"Odds button {pick} not found"}), "Report the error"
+        return _done({"input_data": input_data, "error_message": ""}), "Report the selection"
+
+    if "betslip status" in text:
+        if step == 0:
+            return [{f"count_{book}_betslip_games": {}}], "Count the betslip games"
+        count = _last_match(r"'bet_count': (\d+)", text, "0")
+        return _done({
+            "url": _last_match(r"Current url: (\S+)", text),
+            "title": "Bet9ja",
+            "description": f"Sports betting site, the betslip holds {count} game(s)",
+            "main_sections": ["Sports", "Betslip", "My Account"],
+            "is_betting_site": True,
+        }), "Report the betslip"
+
+    return _done({}), "Unknown task"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Stand-in for the agents' LLM: replies with agent_script() actions after
+    think_seconds, as a browser-use AgentOutput tool call (and as JSON content for
+    agents that parse raw output). Token usage is estimated at 4 characters per token.
+    """
+
+    model: str = "scripted"
+    think_seconds: float = 1.0
+    tool_name: str = "AgentOutput"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "think_seconds": self.think_seconds}
+
+    def bind_tools(self, tools, **kwargs):
+        if not tools:
+            return self
+        return self.model_copy(update={"tool_name": convert_to_openai_tool(tools[0])["function"]["name"]})
+
+    def _reply(self, messages) -> ChatResult:
+        text = "\n".join(_message_text(message) for message in messages)
+        step = sum(1 for message in messages if isinstance(message, AIMessage) and SCRIPT_MARKER in _message_text(message))
+        actions, goal = agent_script(text, step)
+        output = {
+            "current_state": {
+                "evaluation_previous_goal": "Success" if step else "Unknown",
+                "memory": f"{SCRIPT_MARKER} {step + 1}",
+                "next_goal": goal,
+            },
+            "action": actions,
+        }
+        content = json.dumps(output, ensure_ascii=False)
+        input_tokens, output_tokens = len(text) // 4, len(content) // 4
+        message = AIMessage(
+            content=content,
+            tool_calls=[{"name": self.tool_name, "args": output, "id": f"call_step_{step + 1}"}],
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens,
+                            "total_tokens": input_tokens + output_tokens},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.think_seconds)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.think_seconds)
+        return self._reply(messages)
+
+
+# ==================== BENCHMARK ====================
+
+def synthetic_opportunities(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """DNB1 vs DNB2 opportunities with a 0.5-3% edge, both legs on the mock book"""
+    rng = random.Random(seed)
+    opportunities = []
+    for i in range(count):
+        margin = rng.uniform(0.005, 0.03)
+        odd1 = round(rng.uniform(1.7, 2.5), 2)
+        # Round the second odd down so the arb never rounds away
+        odd2 = int(100 / (1 - margin - 1 / odd1)) / 100
+        team1, team2 = f"Home FC {i}", f"Away United {i}"
+        link = (f"https://sports.bet9ja.com/event/{100000 + i}"
+                f"?home={quote(team1)}&away={quote(team2)}&o1={odd1:.2f}&o2={odd2:.2f}")
+        opportunities.append({
+            "profit": f"{(1 - 1 / odd1 - 1 / odd2) * 100:.2f}%",
+            "sport": "Football",
+            "event_time": "Jan 01, 18:00",
+            "bookmaker1": MOCK_BOOK,
+            "team1_bk1": team1,
+            "team2_bk1": team2,
+            "league_bk1": "Benchmark League",
+            "bet_type_bk1": "DNB1",
+            "odd_bk1": f"{odd1:.2f}",
+            "link_bk1": link,
+            "bookmaker2": MOCK_BOOK,
+            "team1_bk2": team1,
+            "team2_bk2": team2,
+            "league_bk2": "Benchmark League",
+            "bet_type_bk2": "DNB2",
+            "odd_bk2": f"{odd2:.2f}",
+            "link_bk2": link,
+        })
+    return opportunities
+
+
+def percentile_table(timings: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/mean seconds of every phase over the runs it appeared in"""
+    phases: Dict[str, List[float]] = {}
+    for run in timings:
+        for phase, seconds in run.items():
+            phases.setdefault(phase, []).append(seconds)
+    return {
+        phase: {
+            "n": len(values),
+            "p50": round(float(np.percentile(values, 50)), 3),
+            "p95": round(float(np.percentile(values, 95)), 3),
+            "mean": round(float(np.mean(values)), 3),
+        }
+        for phase, values in phases.items()
+    }
+
+
+def write_benchmark_config(workdir: str, executable_path: str, headless: bool):
+    """config.json for the scratch directory: the repo config with throwaway profiles"""
+    config = {}
+    if os.path.exists("config.json"):
+        with open("config.json", "r", encoding="utf-8") as f:
+            config = json.load(f)
+    config["executables"] = {
+        key: {"executable_path": executable_path, "user_data_dir": os.path.join(workdir, f"profile_{key}")}
+        for key in ("path1", "path2")
+    }
+    config.setdefault("browser", {})["headless"] = headless
+    config["browser"]["headless_blocked_bookmakers"] = []
+    book = config.setdefault("bookmakers", {}).setdefault(MOCK_BOOK, {})
+    book.update({"enabled": True, "username": "", "password": "", "headless": headless})
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+
+async def default_chrome_path() -> str:
+    """Chromium installed by `playwright install chromium`"""
+    from playwright.async_api import async_playwright
+    async with async_playwright() as playwright:
+        return playwright.chromium.executable_path
+
+
+async def run_benchmark(opportunities: int = 10, think_seconds: float = 1.0, page_delay: float = 0.1,
+                        place_delay: float = 0.5, odds_drift: float = 0.0, executable_path: str = "",
+                        headless: bool = True, keep_workdir: bool = False) -> Dict[str, Any]:
+    """
+    Execute synthetic opportunities against the mock book and measure them.
+
+    Parameters:
+        opportunities (int): Number of opportunities to execute, one after another.
+        think_seconds (float): Simulated LLM latency per agent step.
+        page_delay (float): Mock book latency per page load.
+        place_delay (float): Mock book latency to accept a bet.
+        odds_drift (float): Fraction the live odds are shortened by (odds gate).
+        executable_path (str): Chrome binary; Playwright's Chromium if empty.
+        headless (bool): Run the browsers headless.
+        keep_workdir (bool): Keep the scratch directory (conversations/, sessions/) for inspection.
+
+    Returns:
+        dict: Settings, per-phase percentiles, throughput and outcome counts.
+    """
+    executable_path = executable_path or await default_chrome_path()
+    book = MockBookServer(page_delay=page_delay, place_delay=place_delay, odds_drift=odds_drift)
+    book.start()
+
+    async def route_to_mock_book(browser_session, bookmaker):
+        async def handle(route):
+            response = await route.fetch(url=book.local_url(route.request.url))
+            await route.fulfill(response=response)
+        await browser_session.browser_context.route(MOCK_BOOK_URL_PATTERN, handle)
+
+    workdir = tempfile.mkdtemp(prefix="arb_benchmark_")
+    write_benchmark_config(workdir, executable_path, headless)
+    original_cwd = os.getcwd()
+    os.chdir(workdir)
+    set_chat_model_factory(lambda **kwargs: ScriptedChatModel(think_seconds=think_seconds, **kwargs))
+    add_session_hook(route_to_mock_book)
+
+    timings, outcomes = [], {"executed": 0, "success": 0, "legs_placed": 0, "aborted": 0}
+    llm_calls_before = sum(METRICS.series("arb_llm_calls_total").values())
+    try:
+        system = ArbitrageBettingSystem()
+        system.betting_bot.set_rate_snapshot(OFFLINE_RATES)
+
+        started = time.perf_counter()
+        for number, opportunity in enumerate(synthetic_opportunities(opportunities), 1):
+            print(f"\n🏁 Benchmark opportunity {number}/{opportunities}")
+            opportunity["seen_at"] = time.time()
+            result = await system.execute_arbitrage(opportunity)
+            timings.append(result.get("timings", {}))
+            outcomes["executed"] += 1
+            outcomes["success"] += bool(result.get("success"))
+            for key in ("bookmaker1", "bookmaker2"):
+                summary = ((result.get("bet_results") or {}).get(key, {}).get("result") or {}).get("workflow_summary", {})
+                outcomes["legs_placed"] += bool(summary.get("bet_placed"))
+                outcomes["aborted"] += bool(summary.get("aborted_by_odds_gate"))
+        wall_seconds = time.perf_counter() - started
+    finally:
+        remove_session_hook(route_to_mock_book)
+        set_chat_model_factory(None)
+        os.chdir(original_cwd)
+        book.stop()
+        if not keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    llm_calls = sum(METRICS.series("arb_llm_calls_total").values()) - llm_calls_before
+    return {
+        "settings": {
+            "opportunities": opportunities, "think_seconds": think_seconds, "page_delay": page_delay,
+            "place_delay": place_delay, "odds_drift": odds_drift, "headless": headless,
+        },
+        "wall_seconds": round(wall_seconds, 2),
+        "opportunities_per_minute": round(opportunities / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "llm_calls_per_opportunity": round(llm_calls / opportunities, 2) if opportunities else 0.0,
+        "outcomes": {**outcomes, "bets_accepted_by_book": len(book.placed_bets)},
+        "phases": percentile_table(timings),
+        "workdir": workdir if keep_workdir else None,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    outcomes = report["outcomes"]
+    print("\n" + "=" * 60)
+    print(f"📊 Benchmark: {report['settings']['opportunities']} opportunities in {report['wall_seconds']}s "
+          f"({report['opportunities_per_minute']} opportunities/min)")
+    print(f"✅ Successful: {outcomes['success']}/{outcomes['executed']}, legs placed: {outcomes['legs_placed']}, "
+          f"odds gate aborts: {outcomes['aborted']}, bets accepted by the book: {outcomes['bets_accepted_by_book']}")
+    print(f"🧠 LLM calls per opportunity: {report['llm_calls_per_opportunity']}")
+    print("=" * 60)
+    print(f"{'phase':<36}{'n':>5}{'p50':>10}{'p95':>10}{'mean':>10}")
+    for phase, stats in sorted(report["phases"].items(), key=lambda item: -item[1]["p50"]):
+        print(f"{phase:<36}{stats['n']:>5}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['mean']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the arbitrage executor")
+    parser.add_argument("--opportunities", "-n", type=int, default=10, help="Opportunities to execute")
+    parser.add_argument("--think", type=float, default=1.0, help="Scripted LLM seconds per agent step")
+    parser.add_argument("--page-delay", type=float, default=0.1, help="Mock book seconds per page load")
+    parser.add_argument("--place-delay", type=float, default=0.5, help="Mock book seconds to accept a bet")
+    parser.add_argument("--odds-drift", type=float, default=0.0, help="Fraction the live odds are shortened by")
+    parser.add_argument("--chrome", default="", help="Chrome executable (default: Playwright's Chromium)")
+    parser.add_argument("--headed", action="store_true", help="Show the browser windows")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    parser.add_argument("--json", default="", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(
+        opportunities=args.opportunities, think_seconds=args.think, page_delay=args.page_delay,
+        place_delay=args.place_delay, odds_drift=args.odds_drift, executable_path=args.chrome,
+        headless=not args.headed, keep_workdir=args.keep,
+    ))
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Micro-benchmarks for the pure-Python hot paths.
+
+Times the functions every cycle and every stake calculation go through, on
+synthetic data sets of 10 to 100k rows:
+
+    calculate_arbitrage_stakes            BettingBot, one odds pair per row
+    calculate_arbitrage_from_known_stake  BettingBot, one odds pair + known stake per row
+    extract_numeric_balance               ArbitrageBettingSystem, one balance text per row
+    filter_opportunities                  f.py, Opportunity models
+    currency_converter                    BettingBot, offline rate snapshot (no API calls)
+
+Each case has baselines next to it, the replacement it can be judged against:
+the NumPy stake engine for the stake math, memoized balance texts, the columnar
+raw-row filter and a plain float multiply for the conversion.
+
+Results can be saved and compared to track regressions over time:
+
+    python benchmark_micro.py --save micro_baseline.json
+    python benchmark_micro.py --compare micro_baseline.json --tolerance 0.2
+
+--compare exits with status 1 if a case got slower than the tolerance allows.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmark_e2e import OFFLINE_RATES
+from f import Opportunity, filter_opportunities, filter_raw_opportunities
+from got import ArbitrageBettingSystem
+from money import _parse_text
+from stake_engine import batch_arbitrage_stakes, batch_stakes_from_known_stake
+
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+DEFAULT_REPEATS = 5
+
+SPORTS = ["Football", "Tennis", "Basketball", "Baseball", "Ice Hockey"]
+BOOKMAKERS = ["sportybet", "leon", "marathonbet", "zenitbet", "vbet", "sports888", "bet9ja", "nairabet"]
+MARKET_PAIRS = [("DNB1", "DNB2"), ("DNB2", "DNB1"), ("1", "X2"), ("H1(-1.5)", "H2(+1.5)"), ("Over", "Under")]
+BALANCE_FORMATS = ["₦{:,.2f}", "₦ {:,.2f}", "${:,.2f}", "{:,.2f} EUR", "€{:.2f}", "{:.2f} ₽", "£{:,.2f}"]
+CURRENCY_PAIRS = [("NGN", "USD"), ("USD", "NGN"), ("RUB", "USD"), ("EUR", "USD"), ("USD", "GBP")]
+
+
+# ==================== SYNTHETIC DATA ====================
+
+def synthetic_odds(count: int, seed: int = 1) -> np.ndarray:
+    """(count, 2) odds pairs, about two thirds of them arbitrages"""
+    rng = np.random.default_rng(seed)
+    odd1 = rng.uniform(1.4, 3.5, count)
+    margin = rng.uniform(-0.02, 0.04, count)
+    odd2 = 1 / np.clip(1 - margin - 1 / odd1, 0.05, None)
+    return np.round(np.column_stack([odd1, odd2]), 2)
+
+
+def synthetic_rows(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """Scraped rows shaped like arb_opportunities.jsonl, with a realistic share of rejects"""
+    rng = random.Random(seed)
+    odds = synthetic_odds(count, seed)
+    rows = []
+    for i in range(count):
+        bet1, bet2 = rng.choice(MARKET_PAIRS)
+        bookmaker1, bookmaker2 = rng.sample(BOOKMAKERS, 2)
+        team1 = "Unknown" if rng.random() < 0.05 else f"Team {rng.randrange(5000)}"
+        team2 = f"Team {rng.randrange(5000)}"
+        rows.append({
+            "profit": f"{rng.uniform(0.1, 4.0):.2f}%",
+            "sport": rng.choice(SPORTS),
+            "event_time": f"Jul {rng.randrange(1, 29):02d}, {rng.randrange(24):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            "bookmaker1": bookmaker1,
+            "team1_bk1": team1,
+            "team2_bk1": team2,
+            "league_bk1": f"League {rng.randrange(300)}",
+            "bet_type_bk1": bet1,
+            "odd_bk1": f"{odds[i, 0]:.2f}",
+            "link_bk1": f"https://{bookmaker1}.example/event/{i}",
+            "bookmaker2": bookmaker2,
+            "team1_bk2": team1,
+            "team2_bk2": team2,
+            "league_bk2": f"League {rng.randrange(300)}",
+            "bet_type_bk2": bet2,
+            "odd_bk2": f"{odds[i, 1]:.2f}",
+            "link_bk2": f"https://{bookmaker2}.example/event/{i}",
+            "detailed_page": False,
+            "detailed_page_url": "",
+            "matchup": f"{team1} vs {team2}",
+            "odd_specific": "" if rng.random() < 0.7 else "(2.5)",
+        })
+    return rows
+
+
+def synthetic_balances(count: int, seed: int = 1, distinct: Optional[int] = None) -> List[str]:
+    """Balance texts in the formats the balance checkers return; distinct limits the unique texts"""
+    rng = random.Random(seed)
+    pool_size = distinct or count
+    pool = [rng.choice(BALANCE_FORMATS).format(rng.uniform(0, 2_000_000)) for _ in range(pool_size)]
+    return [pool[i % pool_size] for i in range(count)]
+
+
+# ==================== CASES ====================
+
+class Case:
+    """
+    One benchmark: setup(size) builds the data (not timed), run(data) is timed.
+
+    Parameters:
+        name (str): Case name, "<function>" or "<function>/<baseline>".
+        setup (Callable[[int], Any]): Builds the input for a row count.
+        run (Callable[[Any], Any]): The timed call.
+        baseline_of (str): Name of the case this baseline is compared to.
+    """
+
+    def __init__(self, name: str, setup: Callable[[int], Any], run: Callable[[Any], Any],
+                 baseline_of: Optional[str] = None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.baseline_of = baseline_of
+
+
+def build_cases() -> List[Case]:
+    system = ArbitrageBettingSystem()
+    bot = system.betting_bot
+    bot.set_rate_snapshot(OFFLINE_RATES)
+
+    def stake_rows(size):
+        return synthetic_odds(size)
+
+    def known_stake_rows(size):
+        odds = synthetic_odds(size)
+        return odds, np.round(np.random.default_rng(2).uniform(5, 500, size), 2)
+
+    def opportunity_models(size):
+        return [Opportunity(**row) for row in synthetic_rows(size)]
+
+    def conversions(size):
+        rng = random.Random(3)
+        return [(round(rng.uniform(1, 100_000), 2), *rng.choice(CURRENCY_PAIRS)) for _ in range(size)]
+
+    def float_conversions(size):
+        rows = conversions(size)
+        amounts = np.array([row[0] for row in rows])
+        rates = np.array([OFFLINE_RATES[to] / OFFLINE_RATES[source] for _, source, to in rows])
+        return amounts, rates
+
+    def cold_balances(balances):
+        # Every text parsed from scratch, as on the first cycle after a start
+        _parse_text.cache_clear()
+        return [system.extract_numeric_balance(balance) for balance in balances]
+
+    return [
+        Case("calculate_arbitrage_stakes", stake_rows,
+             lambda odds: [bot.calculate_arbitrage_stakes(odd1, odd2, 100.0) for odd1, odd2 in odds.tolist()]),
+        Case("calculate_arbitrage_stakes/numpy_batch", stake_rows,
+             lambda odds: batch_arbitrage_stakes(odds, 100.0),
+             baseline_of="calculate_arbitrage_stakes"),
+
+        Case("calculate_arbitrage_from_known_stake", known_stake_rows,
+             lambda data: [bot.calculate_arbitrage_from_known_stake(odd1, odd2, stake1=stake)
+                           for (odd1, odd2), stake in zip(data[0].tolist(), data[1].tolist())]),
+        Case("calculate_arbitrage_from_known_stake/numpy_batch", known_stake_rows,
+             lambda data: batch_stakes_from_known_stake(data[0], 0, data[1]),
+             baseline_of="calculate_arbitrage_from_known_stake"),
+
+        Case("extract_numeric_balance", synthetic_balances, cold_balances),
+        Case("extract_numeric_balance/memoized_texts", lambda size: synthetic_balances(size, distinct=16),
+             lambda balances: [system.extract_numeric_balance(balance) for balance in balances],
+             baseline_of="extract_numeric_balance"),
+
+        Case("filter_opportunities", opportunity_models,
+             lambda opportunities: filter_opportunities(opportunities)),
+        Case("filter_opportunities/raw_rows", synthetic_rows,
+             lambda rows: filter_raw_opportunities(rows),
+             baseline_of="filter_opportunities"),
+
+        Case("currency_converter", conversions,
+             lambda rows: [bot.currency_converter(amount, source, to) for amount, source, to in rows]),
+        Case("currency_converter/float_multiply", float_conversions,
+             lambda data: np.round(data[0] * data[1], 2),
+             baseline_of="currency_converter"),
+    ]
+
+
+# ==================== RUNNER ====================
+
+def time_case(case: Case, size: int, repeats: int) -> Dict[str, float]:
+    """Median and best seconds of repeats runs (after one warm-up run)"""
+    data = case.setup(size)
+    case.run(data)
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        case.run(data)
+        samples.append(time.perf_counter() - started)
+    median = statistics.median(samples)
+    return {
+        "size": size,
+        "median_seconds": median,
+        "min_seconds": min(samples),
+        "us_per_row": median / size * 1e6,
+        "rows_per_second": size / median if median else float("inf"),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeats: int = DEFAULT_REPEATS, only: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run every case at every size.
+
+    Parameters:
+        sizes (Sequence[int]): Row counts.
+        repeats (int): Timed runs per case and size (fewer for the 100k sets, which take seconds).
+        only (str): Only run cases whose name contains this text.
+
+    Returns:
+        dict: {"created", "sizes", "baselines": {baseline: case}, "results": {case: {size: timings}}}
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    baselines: Dict[str, str] = {}
+    for case in build_cases():
+        if only and only not in case.name:
+            continue
+        if case.baseline_of:
+            baselines[case.name] = case.baseline_of
+        for size in sizes:
+            case_repeats = repeats if size < 100_000 else max(1, repeats // 2)
+            timings = time_case(case, size, case_repeats)
+            results.setdefault(case.name, {})[str(size)] = timings
+            print(f"⏱️ {case.name:<52}{size:>8} rows {timings['median_seconds'] * 1000:>10.2f} ms "
+                  f"{timings['us_per_row']:>9.2f} µs/row")
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "sizes": list(sizes),
+        "baselines": baselines,
+        "results": results,
+    }
+
+
+def print_baseline_ratios(report: Dict[str, Any]):
+    """How much faster each baseline is than the function it stands next to"""
+    print("\n📊 Baselines (speed-up over the current implementation)")
+    results = report["results"]
+    for name, target in report["baselines"].items():
+        by_size = results.get(name, {})
+        if target not in results:
+            continue
+        ratios = [
+            f"{size}: {results[target][size]['median_seconds'] / timings['median_seconds']:.1f}x"
+            for size, timings in by_size.items()
+            if size in results[target] and timings["median_seconds"]
+        ]
+        print(f"  {name:<52}{', '.join(ratios)}")
+
+
+def compare_reports(current: Dict[str, Any], saved: Dict[str, Any], tolerance: float) -> List[str]:
+    """Cases and sizes whose median got slower than saved * (1 + tolerance)"""
+    regressions = []
+    print(f"\n🔍 Compared to the run of {saved.get('created', '?')} (tolerance {tolerance:.0%})")
+    for name, by_size in current["results"].items():
+        for size, timings in by_size.items():
+            before = saved.get("results", {}).get(name, {}).get(size)
+            if not before:
+                continue
+            change = timings["median_seconds"] / before["median_seconds"] - 1
+            marker = "❌" if change > tolerance else "✅"
+            print(f"  {marker} {name:<52}{size:>8} rows {change:>+8.1%}")
+            if change > tolerance:
+                regressions.append(f"{name} @ {size} rows: {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for stake math, filtering and currency conversion")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma separated row counts")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Timed runs per case and size")
+    parser.add_argument("--only", default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--save", default="", help="Save the results to this JSON file")
+    parser.add_argument("--compare", default="", help="Compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slow-down before a case counts as a regression")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_benchmarks(sizes, args.repeats, args.only)
+    print_baseline_ratios(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        regressions = compare_reports(report, saved, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
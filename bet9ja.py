@@ -1,13 +1,18 @@
-from langchain_anthropic import ChatAnthropic
+from llm_cache import chat_model
 from browser_use import Agent, BrowserSession, Controller, ActionResult
 from dotenv import load_dotenv  
 import asyncio
 import os
-import json
-from pathlib import Path
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
+from odds_gate import odds_check_ready, odds_gate_abort_result, read_betslip_odds
+from browser_sessions import browser_session_options, save_storage_state, session_storage_state
+from dom_balance import read_balance_from_dom
+from latency import span, timed
+from agent_usage import run_agent
+from agent_trace import evaluate_js, traced_action
+from journal import JOURNAL, new_run_id
 
 load_dotenv()   
 
@@ -42,11 +47,12 @@ controller5 = Controller(output_model=Placer)
 # ==================== BET9JA CONTROLLER ACTIONS ====================
 
 @controller4.action('Login with Bet9ja credentials')
+@traced_action
 async def login_with_bet9ja_credentials(browser, username: str, password: str) -> ActionResult:
     """Login to Bet9ja with provided credentials"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (credentials) => {
             const { username, password } = credentials;
             try {
@@ -166,69 +172,74 @@ async def login_with_bet9ja_credentials(browser, username: str, password: str) -
     return ActionResult(extracted_content=f"Bet9ja Login result: {result}")
 
 @controller4.action('Ask human for help with issues')
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
-@controller4.action('Get Bet9ja balance')
-async def get_bet9ja_balance(browser) -> ActionResult:
-    """Get current balance from Bet9ja account"""
-    page = await browser.get_current_page()
-    
-    result = await page.evaluate("""
-        async () => {
-            try {
-                // Look for balance elements in My Account dropdown
-                const balanceElement = document.querySelector('.myaccount__details .txt-cut span[style*="unset"]') ||
-                                     document.querySelector('.myaccount__details .txt-cut');
-                
-                const withdrawableText = document.querySelector('.myaccount__heading');
-                
-                if (!balanceElement) {
-                    return {
-                        success: false,
-                        is_logged_in: false,
-                        error: 'Balance element not found - user might not be logged in'
-                    };
-                }
-                
-                const balanceText = balanceElement.parentElement ? 
-                                  balanceElement.parentElement.textContent.trim() : 
-                                  balanceElement.textContent.trim();
-                
-                // Check if balance contains Nigerian Naira symbol
-                if (!balanceText.includes('₦')) {
-                    return {
-                        success: false,
-                        is_logged_in: false,
-                        error: 'Balance does not contain ₦ symbol - user might not be logged in'
-                    };
-                }
-                
+BET9JA_BALANCE_JS = """
+    async () => {
+        try {
+            // Look for balance elements in My Account dropdown
+            const balanceElement = document.querySelector('.myaccount__details .txt-cut span[style*="unset"]') ||
+                                 document.querySelector('.myaccount__details .txt-cut');
+            
+            const withdrawableText = document.querySelector('.myaccount__heading');
+            
+            if (!balanceElement) {
                 return {
-                    success: true,
-                    is_logged_in: true,
-                    balance: balanceText,
-                    has_withdrawable_section: !!withdrawableText
+                    success: false,
+                    is_logged_in: false,
+                    error: 'Balance element not found - user might not be logged in'
                 };
-                
-            } catch (error) {
+            }
+            
+            const balanceText = balanceElement.parentElement ? 
+                              balanceElement.parentElement.textContent.trim() : 
+                              balanceElement.textContent.trim();
+            
+            // Check if balance contains Nigerian Naira symbol
+            if (!balanceText.includes('₦')) {
                 return {
                     success: false,
-                    error: error.message
+                    is_logged_in: false,
+                    error: 'Balance does not contain ₦ symbol - user might not be logged in'
                 };
             }
+            
+            return {
+                success: true,
+                is_logged_in: true,
+                balance: balanceText,
+                has_withdrawable_section: !!withdrawableText
+            };
+            
+        } catch (error) {
+            return {
+                success: false,
+                error: error.message
+            };
         }
-    """)
+    }
+"""
+
+@controller4.action('Get Bet9ja balance')
+@traced_action
+async def get_bet9ja_balance(browser) -> ActionResult:
+    """Get current balance from Bet9ja account"""
+    page = await browser.get_current_page()
+    
+    result = await evaluate_js(page, BET9JA_BALANCE_JS)
     
     return ActionResult(extracted_content=f"Bet9ja Balance result: {result}")
 
 @controller3.action('Count Bet9ja betslip games')
+@traced_action
 async def count_bet9ja_betslip_games(browser) -> ActionResult:
     """Count number of games in Bet9ja betslip"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         () => {
             try {
                 // Look for betslip items using various selectors
@@ -278,11 +289,13 @@ async def count_bet9ja_betslip_games(browser) -> ActionResult:
     return ActionResult(extracted_content=f"Bet9ja Betslip count: {result}")
 
 @controller5.action('Fill Bet9ja stake amount')
+@traced_action
+@timed("stake_fill")
 async def fill_bet9ja_stake_amount(browser, stake: float) -> ActionResult:
     """Fill stake amount in Bet9ja betslip"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (stakeData) => {
             const { stakeAmount } = stakeData;
             try {
@@ -332,11 +345,13 @@ async def fill_bet9ja_stake_amount(browser, stake: float) -> ActionResult:
     return ActionResult(extracted_content=f"Bet9ja Stake fill result: {result}")
 
 @controller5.action('Click Bet9ja place bet button')
+@traced_action
+@timed("place_click")
 async def click_bet9ja_place_bet(browser) -> ActionResult:
     """Click the Place Bet button in Bet9ja"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             try {
                 // Look for place bet button
@@ -415,31 +430,40 @@ async def click_bet9ja_place_bet(browser) -> ActionResult:
 
 # ==================== MAIN AUTOMATION FUNCTIONS ====================
 
-async def bet9ja_balance_checker(executable_path, user_data_dir, username, password):
+async def bet9ja_balance_checker(executable_path, user_data_dir, username, password, browser_session=None):
     """Check Bet9ja balance"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"bet9ja_balance_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting Bet9ja balance check...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("bet9ja"),
+                keep_alive=True,
+                storage_state=session_storage_state("bet9ja", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
-        # Agent 4: Balance Checker
-        agent4 = Agent(
-            task=f"""You are a Bet9ja balance checker. Follow these exact steps:
+        # Read the balance straight from the page; the agent only runs if that fails
+        balance = None
+        dom_balance = await read_balance_from_dom(browser_session, "Bet9ja", "https://bet9ja.com", BET9JA_BALANCE_JS)
+        if dom_balance:
+            balance = Balance(is_logged_in=True, balance=dom_balance)
+            await save_storage_state(browser_session, "bet9ja", user_data_dir)
+            print("✅ Bet9ja balance check completed!")
+        else:
+            # Agent 4: Balance Checker (fallback)
+            agent4 = Agent(
+                task=f"""You are a Bet9ja balance checker. Follow these exact steps:
 
 STEP 1: Navigate to Bet9ja
 - Navigate to https://bet9ja.com
@@ -473,24 +497,25 @@ Expected output format:
 - balance: actual amount with currency (e.g., " 0.00")
 - currency : "NGN"
 - error_message: any issues encountered""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
-            browser_session=browser_session,
-            sensitive_data={
-                "username": username,
-                "password": password
-            },
-            controller=controller4,
-        )
+                llm=chat_model("claude-3-5-sonnet-20241022", cached=True),
+                browser_session=browser_session,
+                sensitive_data={
+                    "username": username,
+                    "password": password
+                },
+                controller=controller4,
+            )
         
-        history4 = await agent4.run()
-        result4 = history4.final_result()
-        balance = None
+            history4 = await run_agent(agent4, "bet9ja", "balance")
+            result4 = history4.final_result()
         
-        if result4:
-            balance = Balance.model_validate_json(result4)
-            print("✅ Bet9ja balance check completed!")
-        else:
-            print("❌ Bet9ja balance check failed")
+            if result4:
+                balance = Balance.model_validate_json(result4)
+                if balance.is_logged_in:
+                    await save_storage_state(browser_session, "bet9ja", user_data_dir)
+                print("✅ Bet9ja balance check completed!")
+            else:
+                print("❌ Bet9ja balance check failed")
         
         # Save results
         combined_results = {
@@ -499,9 +524,8 @@ Expected output format:
             "balance": balance.model_dump() if balance else None
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("balance", "bet9ja", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return balance
         
@@ -510,32 +534,34 @@ Expected output format:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
-async def bet9ja_bet_placer(input_data: dict, executable_path: str, user_data_dir: str):
+async def bet9ja_bet_placer(input_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None):
     """Place bet on Bet9ja"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"bet9ja_bet_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting Bet9ja bet placement...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("bet9ja"),
+                keep_alive=True,
+                storage_state=session_storage_state("bet9ja", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
         # Agent 2: Bet Placement
         agent2 = Agent(
@@ -560,12 +586,13 @@ Your output should include:
 - The input data you processed
 - Success/failure status
 - Any errors encountered""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
+            llm=chat_model("claude-3-5-sonnet-20241022"),
             browser_session=browser_session,
             controller=controller
         )
         
-        history2 = await agent2.run()
+        with span("navigation_selection"):
+            history2 = await run_agent(agent2, "bet9ja", "select")
         result2 = history2.final_result()
         bet_result = None
         
@@ -588,12 +615,13 @@ Your task:
 5. Describe what you see in the betslip
 
 Previous bet placement result: {bet_result.input_data if bet_result else 'No result'}""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
+            llm=chat_model("claude-3-5-sonnet-20241022", cached=True),
             browser_session=browser_session,
             controller=controller3,
         )
         
-        history3 = await agent3.run()
+        with span("betslip_verification"):
+            history3 = await run_agent(agent3, "bet9ja", "verify")
         result3 = history3.final_result()
         site_analysis = None
         
@@ -605,12 +633,23 @@ Previous bet placement result: {bet_result.input_data if bet_result else 'No res
 
         # Agent 5: Bet Placer
         stake_amount = input_data.get('stake_amount', 100)
+        
+        # Re-verify the live betslip odds right before committing the stake
+        if odds_check is not None:
+            await odds_check_ready(odds_check)
+            with span("odds_gate_read"):
+                live_odd = await read_betslip_odds(browser_session, "bet9ja")
+            stake_amount = await odds_check(live_odd)
+            if stake_amount is None:
+                print("🛑 Odds gate aborted Bet9ja bet placement")
+                return odds_gate_abort_result("Bet9ja", input_data, live_odd)
+        
         agent5 = Agent(
-            task=f"""You are the final bet placer for Bet9ja. Your stake amount is the given stake amount.
+            task=f"""You are the final bet placer for Bet9ja. Your stake amount is {stake_amount}.
 
 STEPS:
 1. Visually check the betslip has exactly 1 game
-2. If betslip is not empty, use 'Fill Bet9ja stake amount' with the given stake amount
+2. If betslip is not empty, use 'Fill Bet9ja stake amount' with stake={stake_amount}
 3. Wait 2 seconds for the potential returns to calculate
 -make sure stakes amount matches given stake amount, if it does not match visually input the stake.(this is very important)
 4. Use 'Click Bet9ja place bet button' to place the bet
@@ -619,12 +658,13 @@ STEPS:
 Expected final result:
 - is_place_bet: true/false
 - error_message: any issues encountered""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
+            llm=chat_model("claude-3-5-sonnet-20241022"),
             browser_session=browser_session,
             controller=controller5,
         )
         
-        history5 = await agent5.run()
+        with span("stake_fill_click"):
+            history5 = await run_agent(agent5, "bet9ja", "place")
         result5 = history5.final_result()
         placer_result = None
         
@@ -649,9 +689,8 @@ Expected final result:
             }
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("bet", "bet9ja", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return combined_results
         
@@ -660,8 +699,9 @@ Expected final result:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
@@ -0,0 +1,149 @@
+"""
+Browser sessions and saved login state per bookmaker and Chrome profile.
+
+The pipelined executor in got.py opens one session per leg with
+open_browser_session(), passes it to the balance checker and then to the bet
+placer, and closes it once the leg is done.
+
+Every session (including the ones the book modules open themselves) starts
+from the cookies/localStorage of sessions/<bookmaker>_<profile>.json. The
+session is given a working copy of that file (session_storage_state), because
+browser_use saves cookie changes back to its storage_state file, logged out or
+not. Only save_storage_state writes the saved state, after a confirmed login,
+and it stamps <bookmaker>_<profile>.validated with the time. session_keeper.py
+refreshes the states whose last validation is missing or getting old, so
+executing an arb does not have to log in.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+from typing import Any, Dict
+
+from browser_use import BrowserSession
+
+from config_manager import ConfigManager
+from metrics import METRICS
+
+
+SESSIONS_DIR = "sessions"
+
+
+def storage_state_path(bookmaker: str, user_data_dir: str) -> str:
+    """Saved login state file of a bookmaker on one Chrome profile"""
+    profile_key = hashlib.sha1((user_data_dir or "default").encode("utf-8")).hexdigest()[:8]
+    return os.path.join(SESSIONS_DIR, f"{bookmaker.lower()}_{profile_key}.json")
+
+
+def _validated_marker_path(bookmaker: str, user_data_dir: str) -> str:
+    return storage_state_path(bookmaker, user_data_dir)[:-len(".json")] + ".validated"
+
+
+def session_storage_state(bookmaker: str, user_data_dir: str) -> str:
+    """
+    storage_state file for a live BrowserSession: a copy of the saved login state.
+
+    browser_use writes every cookie change back to the session's storage_state file,
+    so the saved state is never handed to a session directly.
+    """
+    saved = storage_state_path(bookmaker, user_data_dir)
+    working_copy = saved[:-len(".json")] + ".live.json"
+    try:
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        shutil.copyfile(saved, working_copy)
+    except FileNotFoundError:
+        # Nothing saved yet: start from an empty state
+        if os.path.exists(working_copy):
+            os.remove(working_copy)
+    return working_copy
+
+
+def storage_state_age(bookmaker: str, user_data_dir: str) -> float:
+    """Seconds since the login state was last validated by a confirmed login (infinity if never)"""
+    try:
+        with open(_validated_marker_path(bookmaker, user_data_dir), "r", encoding="utf-8") as f:
+            return time.time() - float(f.read().strip())
+    except (OSError, ValueError):
+        return float("inf")
+
+
+async def save_storage_state(browser_session: BrowserSession, bookmaker: str, user_data_dir: str) -> bool:
+    """Export the session's cookies and storage after a confirmed login"""
+    path = storage_state_path(bookmaker, user_data_dir)
+    try:
+        os.makedirs(SESSIONS_DIR, exist_ok=True)
+        state: Dict[str, Any] = await browser_session.export_storage_state(path)
+        with open(_validated_marker_path(bookmaker, user_data_dir), "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+        print(f"🍪 Saved {bookmaker} login state ({len(state.get('cookies', []))} cookies) to {path}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not save {bookmaker} login state: {e}")
+        return False
+
+
+_config = None
+
+
+def browser_session_options(bookmaker: str) -> Dict[str, Any]:
+    """
+    Headless mode and fingerprint settings for a bookmaker's BrowserSession, from the
+    "browser" section of config.json. browser_use runs headless Chrome in the new
+    headless mode (--headless=new). The user agent and viewport are only overridden
+    when headless, to hide the "HeadlessChrome" user agent and the default 800x600
+    window; headed sessions keep the real profile's fingerprint.
+    """
+    global _config
+    if _config is None:
+        _config = ConfigManager()
+
+    settings = _config.get_browser_settings(bookmaker)
+    options: Dict[str, Any] = {"headless": bool(settings["headless"])}
+    if options["headless"]:
+        if settings.get("user_agent"):
+            options["user_agent"] = settings["user_agent"]
+        if settings.get("viewport"):
+            options["viewport"] = settings["viewport"]
+    return options
+
+
+# Coroutines run on every session open_browser_session() starts: hook(browser_session, bookmaker)
+_session_hooks = []
+
+
+def add_session_hook(hook):
+    """Run hook(browser_session, bookmaker) after every executor session starts (e.g. request routing)"""
+    _session_hooks.append(hook)
+
+
+def remove_session_hook(hook):
+    if hook in _session_hooks:
+        _session_hooks.remove(hook)
+
+
+async def open_browser_session(bookmaker: str, executable_path: str, user_data_dir: str) -> BrowserSession:
+    """Start a kept-alive browser session for a bookmaker on a Chrome profile"""
+    browser_session = BrowserSession(
+        executable_path=executable_path,
+        user_data_dir=user_data_dir,
+        keep_alive=True,
+        storage_state=session_storage_state(bookmaker, user_data_dir),
+        **browser_session_options(bookmaker),
+    )
+    await browser_session.start()
+    METRICS.inc("arb_browser_sessions_alive")
+    for hook in _session_hooks:
+        await hook(browser_session, bookmaker)
+    print(f"✅ Browser session for {bookmaker} created successfully")
+    return browser_session
+
+
+async def close_browser_session(browser_session: BrowserSession):
+    """Close a session opened with open_browser_session, ignoring cleanup errors"""
+    METRICS.inc("arb_browser_sessions_alive", -1)
+    try:
+        await browser_session.close()
+        print("🧹 Browser session closed successfully")
+    except Exception as cleanup_error:
+        print(f"⚠️ Cleanup warning: {cleanup_error}")
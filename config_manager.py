@@ -97,6 +97,15 @@ class ConfigManager:
         else:
             print(f"⚠️ Bookmaker {bookmaker_name} not found in config")
     
+    def get_stake_rules(self, bookmaker_name: str) -> Dict:
+        """Get stake granularity and limits for a bookmaker, in its own currency"""
+        bookmaker = self.config.get("bookmakers", {}).get(bookmaker_name.lower(), {})
+        return {
+            "stake_step": bookmaker.get("stake_step") or 0.01,
+            "min_stake": bookmaker.get("min_stake") or 0,
+            "max_stake": bookmaker.get("max_stake")
+        }
+    
     def enable_bookmaker(self, bookmaker_name: str):
         """Enable a bookmaker"""
         if bookmaker_name in self.config.get("bookmakers", {}):
@@ -138,6 +147,84 @@ class ConfigManager:
         
         self.config["scraper_settings"][key] = value
     
+    # Filter rule methods
+    def get_filter_rules(self) -> Dict:
+        """Get the opportunity filter rules used by f.py"""
+        return self.config.get("filter_rules", {})
+    
+    def set_filter_rule(self, key: str, value):
+        """Set an opportunity filter rule"""
+        if "filter_rules" not in self.config:
+            self.config["filter_rules"] = {}
+        
+        self.config["filter_rules"][key] = value
+    
+    def get_browser_settings(self, bookmaker_name: Optional[str] = None) -> Dict:
+        """
+        Get browser launch settings (headless mode and fingerprint), with a bookmaker's
+        own "headless"/"user_agent"/"viewport" keys overriding the global ones.
+        Bookmakers listed in headless_blocked_bookmakers always run headed.
+        """
+        browser = self.config.get("browser", {})
+        settings = {
+            "headless": browser.get("headless", False),
+            "user_agent": browser.get("user_agent"),
+            "viewport": browser.get("viewport")
+        }
+        
+        if bookmaker_name:
+            bookmaker = self.config.get("bookmakers", {}).get(bookmaker_name.lower(), {})
+            for key in settings:
+                if bookmaker.get(key) is not None:
+                    settings[key] = bookmaker[key]
+            if bookmaker_name.lower() in browser.get("headless_blocked_bookmakers", []):
+                settings["headless"] = False
+        
+        return settings
+    
+    def get_scraper_headless(self):
+        """Headless mode for the breaking-bet scraper: False, True or "new" """
+        return self.config.get("browser", {}).get("scraper_headless", False)
+    
+    def get_bankroll_settings(self) -> Dict:
+        """Get the bankroll allocation limits used by the allocator and got.py"""
+        return self.config.get("bankroll", {})
+    
+    def set_bankroll_setting(self, key: str, value):
+        """Set a bankroll allocation limit"""
+        if "bankroll" not in self.config:
+            self.config["bankroll"] = {}
+        
+        self.config["bankroll"][key] = value
+    
+    def get_odds_gate_settings(self) -> Dict:
+        """Get the live betslip odds gate settings (largest plausible odd move)"""
+        return self.config.get("odds_gate", {})
+    
+    def get_metrics_settings(self) -> Dict:
+        """Get the metrics endpoint settings (enabled, host, port, textfile)"""
+        return self.config.get("metrics", {})
+    
+    def get_llm_usage_settings(self) -> Dict:
+        """Get the LLM cost accounting settings (model prices, per-opportunity budget)"""
+        return self.config.get("llm_usage", {})
+    
+    def get_journal_settings(self) -> Dict:
+        """Get the run journal settings (directory, segment size, segments kept)"""
+        return self.config.get("journal", {})
+    
+    def get_profiling_settings(self) -> Dict:
+        """Get the cycle profiler settings (enabled, sample fraction, interval, output directory)"""
+        return self.config.get("profiling", {})
+    
+    def get_tracing_settings(self) -> Dict:
+        """Get the agent step timeline settings (instrument_waits)"""
+        return self.config.get("tracing", {})
+    
+    def get_dashboard_settings(self) -> Dict:
+        """Get the live dashboard settings (refresh interval, stall threshold, outcomes kept)"""
+        return self.config.get("dashboard", {})
+    
     # Utility methods
     def print_status(self):
         """Print current configuration status"""
@@ -0,0 +1,164 @@
+"""
+Live terminal dashboard of the opportunity manager.
+
+The "dashboard" command of mainrunner.py's command interface redraws this view
+every refresh_seconds until Ctrl+C. It only reads state the process already
+keeps in memory, so the manager loop is not slowed down:
+
+    cycle      phase of ArbitrageOpportunityManager and how long it has been in it,
+               flagged STALLED? past stall_seconds (idle waiting excluded)
+    queue      selected opportunities still waiting in the current cycle
+    in flight  executions in progress per Chrome profile (lifecycle.in_flight())
+    latency    p50/p90 of every execution phase (latency.LATENCY)
+    balances   balance cache per book, with its age and whether it is still fresh
+    outcomes   the latest execution outcomes and their reaction time
+
+Settings come from the "dashboard" section of config.json.
+"""
+
+import os
+import time
+from typing import Any, Dict, List
+
+from latency import LATENCY
+from lifecycle import in_flight
+from metrics import METRICS
+
+
+DEFAULT_DASHBOARD_SETTINGS = {
+    "refresh_seconds": 1.0,
+    # A phase running longer than this is flagged as a possible stall
+    "stall_seconds": 600,
+    # Execution outcomes kept for the dashboard
+    "recent_outcomes": 10,
+}
+
+# Phases in which time passing is expected, never flagged as stalled
+IDLE_PHASES = ("stopped", "waiting", "cycle done")
+
+# Chrome profile (config "executables" key) running each leg
+PROFILES = (("path1", 0, "leg1_placed"), ("path2", 1, "leg2_placed"))
+
+OUTCOME_ICONS = {"captured": "✅", "one_leg": "⚠️", "odds_gone": "📉", "failed": "❌"}
+
+CLEAR_SCREEN = "\033[H\033[2J"
+
+
+def _age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f}m{seconds % 60:02.0f}s"
+    return f"{seconds // 3600:.0f}h{seconds % 3600 // 60:02.0f}m"
+
+
+def _leg_state(lifecycle, placed_event: str) -> str:
+    if lifecycle.timestamps.get(placed_event) is not None:
+        return "placed"
+    if lifecycle.timestamps.get("balance_done") is not None:
+        return "placing"
+    return "checking balance"
+
+
+def render_dashboard(manager, settings: Dict[str, Any] = None) -> str:
+    """
+    Render the dashboard of a running manager as text.
+
+    Parameters:
+        manager: The ArbitrageOpportunityManager.
+        settings (Dict[str, Any]): Dashboard settings (DEFAULT_DASHBOARD_SETTINGS keys).
+
+    Returns:
+        str: The dashboard, one line per row.
+    """
+    settings = {**DEFAULT_DASHBOARD_SETTINGS, **(settings or {})}
+    now = time.time()
+    lines: List[str] = []
+
+    # Cycle phase
+    in_phase = now - manager.phase_started
+    stalled = manager.phase not in IDLE_PHASES and in_phase > settings["stall_seconds"]
+    last_cycle = METRICS.get("arb_cycle_duration_seconds")
+    lines.append(
+        f"🎛️  Arbitrage Opportunity Manager — {'RUNNING' if manager.is_switched_on() else 'STOPPED'}"
+        f"   {time.strftime('%H:%M:%S', time.localtime(now))}"
+    )
+    lines.append(
+        f"🔄 Cycle {METRICS.get('arb_cycles_total'):.0f}: {manager.phase} for {_age(in_phase)}"
+        + ("   ⚠️ STALLED?" if stalled else "")
+        + (f"   (last cycle {_age(last_cycle)})" if last_cycle else "")
+    )
+    lines.append(f"📥 Queue: {manager.queue_depth} waiting")
+
+    # Executions in progress, per Chrome profile
+    lines.append("")
+    lines.append("🏃 In flight")
+    executions = in_flight()
+    if not executions:
+        lines.append("   none")
+    for lifecycle in executions:
+        running = _age(now - lifecycle.timestamps["started"])
+        for profile, leg, placed_event in PROFILES:
+            lines.append(
+                f"   {profile:<6} {lifecycle.bookmakers[leg] or '?':<12} {lifecycle.matchup[:32]:<32} "
+                f"{_leg_state(lifecycle, placed_event):<16} {running}"
+            )
+
+    # Phase latency
+    lines.append("")
+    lines.append("⏱️ Latency                  p50      p90    count")
+    snapshot = LATENCY.snapshot()
+    if not snapshot:
+        lines.append("   no executions yet")
+    for phase, stats in sorted(snapshot.items(), key=lambda item: -(item[1]["p50"] or 0)):
+        lines.append(f"   {phase[:22]:<22} {stats['p50']:>7.2f}s {stats['p90']:>7.2f}s {stats['count']:>7d}")
+
+    # Balance cache (read directly: BalanceCache.get_usd() would count as a lookup)
+    balance_cache = manager.arbitrage_system.balance_cache
+    lookups = balance_cache.hits + balance_cache.misses
+    lines.append("")
+    lines.append(
+        "💰 Balance cache" + (f" ({balance_cache.hits / lookups * 100:.0f}% hit rate)" if lookups else "")
+    )
+    balances = dict(balance_cache.balances)
+    if not balances:
+        lines.append("   empty")
+    for bookmaker, entry in sorted(balances.items()):
+        age = now - entry.get("updated_at", 0)
+        state = "fresh" if age <= balance_cache.ttl_seconds else "stale"
+        lines.append(f"   {bookmaker:<12} ${entry.get('balance_usd', 0):>10,.2f}   {_age(age):>7} ago   {state}")
+
+    # Recent outcomes
+    lines.append("")
+    lines.append("🎯 Recent outcomes")
+    recent = list(manager.recent_outcomes)
+    if not recent:
+        lines.append("   none yet")
+    for outcome in reversed(recent):
+        finished = outcome.get("finished") or now
+        reaction = ""
+        if outcome.get("first_seen") and outcome.get("picked"):
+            reaction = f"reacted in {_age(outcome['picked'] - outcome['first_seen'])}"
+        lines.append(
+            f"   {time.strftime('%H:%M:%S', time.localtime(finished))} "
+            f"{OUTCOME_ICONS.get(outcome.get('outcome'), '❔')} {outcome.get('outcome') or '?':<10} "
+            f"{outcome.get('bookmaker_pair', ''):<24} {reaction}"
+        )
+
+    lines.append("")
+    lines.append(f"Refreshing every {settings['refresh_seconds']}s — Ctrl+C to return to the command prompt")
+    return "\n".join(lines)
+
+
+def run_dashboard(manager, settings: Dict[str, Any] = None):
+    """Redraw the dashboard until Ctrl+C"""
+    settings = {**DEFAULT_DASHBOARD_SETTINGS, **(settings or {})}
+    if os.name == "nt":
+        # Turns on ANSI escape codes in the Windows console
+        os.system("")
+    try:
+        while True:
+            print(CLEAR_SCREEN + render_dashboard(manager, settings), flush=True)
+            time.sleep(float(settings["refresh_seconds"]))
+    except KeyboardInterrupt:
+        print()
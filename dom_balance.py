@@ -0,0 +1,62 @@
+"""
+Direct balance reads from the bookmaker page, without an LLM.
+
+Every book module keeps the JavaScript that finds its balance element in a
+*_BALANCE_JS constant (the same script its "Get ... balance" controller action
+runs). The balance checkers call read_balance_from_dom() first: it opens the
+site, runs that script until the header has rendered, and returns the balance
+text. The balance agent is only started when this fails, e.g. when the saved
+login has expired, a captcha is shown or the layout changed.
+
+Every script returns {success, is_logged_in, balance, error}.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+DOM_BALANCE_TIMEOUT_SECONDS = 10
+DOM_BALANCE_POLL_SECONDS = 0.5
+
+
+async def read_balance_from_dom(browser_session, platform: str, url: str, balance_js: str,
+                                timeout: float = DOM_BALANCE_TIMEOUT_SECONDS) -> Optional[str]:
+    """
+    Navigate to the bookmaker and read the balance with its balance script.
+
+    The script is retried while the page still looks logged out (the header is
+    rendered after the page load on most books). A page that shows a logged-in
+    header without a readable balance is not retried, since some scripts open
+    the account menu to read it.
+
+    Parameters:
+        browser_session: Started BrowserSession.
+        platform (str): Bookmaker name for log messages.
+        url (str): Page that shows the balance.
+        balance_js (str): The book's *_BALANCE_JS script.
+        timeout (float): Seconds to wait for a balance before giving up.
+
+    Returns:
+        Optional[str]: The balance text with its currency, or None to fall back to the agent.
+    """
+    started = time.perf_counter()
+    try:
+        page = await browser_session.get_current_page()
+        await page.goto(url, wait_until="domcontentloaded")
+
+        result = {}
+        while True:
+            result = await page.evaluate(balance_js) or {}
+            if result.get("success") and result.get("balance"):
+                print(f"⚡ {platform} balance read from the page in {time.perf_counter() - started:.1f}s: {result['balance']}")
+                return str(result["balance"]).strip()
+            if result.get("is_logged_in") or time.perf_counter() - started >= timeout:
+                break
+            await asyncio.sleep(DOM_BALANCE_POLL_SECONDS)
+    except Exception as e:
+        print(f"⚠️ {platform} direct balance read failed: {e}")
+        return None
+
+    print(f"⚠️ {platform} direct balance read failed: {result.get('error', 'no balance found')} - falling back to the balance agent")
+    return None
@@ -1,7 +1,18 @@
-import json
 import os
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Iterable, List, Optional
+from config_manager import ConfigManager
+from filter_rules import CompiledFilterRules, compile_filter_rules
+from opportunity_io import (
+    ARB_OPPORTUNITIES_FILE,
+    FILTERED_OPPORTUNITIES_FILE,
+    AtomicJsonlWriter,
+    iter_jsonl,
+    iter_jsonl_batches,
+    publish_jsonl,
+    publish_manifest,
+)
+from opportunity_store import OpportunityStore, opportunity_fingerprint
 
 
 class Opportunity(BaseModel):
@@ -29,88 +40,140 @@ class Opportunity(BaseModel):
     verified: bool = False  # Default to False if not provided
 
 
-def load_opportunities(file_path: str) -> List[Opportunity]:
+# Rows filtered per batch while streaming arb_opportunities.jsonl
+FILTER_BATCH_SIZE = 5000
+
+
+def load_raw_opportunities(file_path: str) -> List[Dict[str, Any]]:
     """
-    Load arbitrage opportunities from a JSON file.
+    Load raw scraped rows from a JSONL file without building models.
 
     Parameters:
-        file_path (str): Path to the JSON file.
+        file_path (str): Path to the JSONL file.
 
     Returns:
-        List[Opportunity]: A list of opportunities.
+        List[Dict[str, Any]]: The scraped rows as plain dictionaries.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as json_file:
-            data = json.load(json_file)
-            return [Opportunity(**item) for item in data]
+        return list(iter_jsonl(file_path))
     except FileNotFoundError:
         print(f"Error: '{file_path}' file not found.")
         return []
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
-        return []
 
 
-def filter_opportunities(opportunities: List[Opportunity]) -> List[Opportunity]:
+def load_opportunities(file_path: str) -> List[Opportunity]:
+    """
+    Load arbitrage opportunities from a JSONL file.
+
+    Parameters:
+        file_path (str): Path to the JSONL file.
+
+    Returns:
+        List[Opportunity]: A list of opportunities.
+    """
+    rows = load_raw_opportunities(file_path)
+    return validate_opportunities(rows, [True] * len(rows))
+
+
+def build_columns(rows: List[Dict[str, Any]], fields: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Pivot the given fields of each row into normalized (stripped, lowercased) columns.
+
+    Parameters:
+        rows (List[Dict[str, Any]]): Raw scraped rows.
+        fields (Iterable[str]): Fields the compiled rules read.
+
+    Returns:
+        Dict[str, List[str]]: One list per field, aligned with rows.
+    """
+    return {
+        field: [str(row.get(field) or "").strip().lower() for row in rows]
+        for field in fields
+    }
+
+
+def build_filter_mask(rows: List[Dict[str, Any]], rules: CompiledFilterRules) -> List[bool]:
+    """
+    Evaluate the compiled filter rules over the rows as a boolean mask.
+
+    Parameters:
+        rows (List[Dict[str, Any]]): Raw scraped rows.
+        rules (CompiledFilterRules): Rules compiled from the filter_rules config.
+
+    Returns:
+        List[bool]: True for every row that passes all rules.
+    """
+    return rules.evaluate(build_columns(rows, rules.required_fields), len(rows))
+
+
+def validate_opportunities(rows: List[Dict[str, Any]], mask: List[bool]) -> List[Opportunity]:
     """
-    Filter opportunities to include only DNB1 vs DNB2 bet types, ensure odd_specific is empty,
-    and exclude opportunities with "Unknown" values in key fields.
+    Build Opportunity models for the rows selected by mask, skipping rows that fail validation.
+
+    Parameters:
+        rows (List[Dict[str, Any]]): Raw scraped rows.
+        mask (List[bool]): Which rows to validate.
+
+    Returns:
+        List[Opportunity]: Validated opportunities.
+    """
+    validated = []
+    invalid = 0
+    for row, keep in zip(rows, mask):
+        if not keep:
+            continue
+        try:
+            validated.append(Opportunity(**row))
+        except ValidationError:
+            invalid += 1
+
+    if invalid:
+        print(f"⚠️ Skipped {invalid} rows that failed schema validation")
+    return validated
+
+
+def filter_raw_opportunities(rows: List[Dict[str, Any]], rules: Optional[CompiledFilterRules] = None) -> List[Opportunity]:
+    """
+    Columnar filter path: mask the raw rows first and validate only the survivors.
+
+    Parameters:
+        rows (List[Dict[str, Any]]): Raw scraped rows.
+        rules (CompiledFilterRules): Compiled rules; defaults to the original DNB filter.
+
+    Returns:
+        List[Opportunity]: Filtered opportunities.
+    """
+    rules = rules or compile_filter_rules()
+    return validate_opportunities(rows, build_filter_mask(rows, rules))
+
+
+def filter_opportunities(opportunities: List[Opportunity], rules: Optional[CompiledFilterRules] = None) -> List[Opportunity]:
+    """
+    Filter opportunities with the compiled filter rules. With the default rules this keeps only
+    DNB1 vs DNB2 bet types with an empty odd_specific and no "Unknown" values in key fields.
 
     Parameters:
         opportunities (List[Opportunity]): List of opportunities.
+        rules (CompiledFilterRules): Compiled rules; defaults to the original DNB filter.
 
     Returns:
         List[Opportunity]: Filtered opportunities.
     """
-    filtered = []
-    for opp in opportunities:
-        # Normalize bet types to lowercase for comparison
-        bet_type_bk1 = opp.bet_type_bk1.lower()
-        bet_type_bk2 = opp.bet_type_bk2.lower()
-
-        # Check for "Unknown" values in key fields
-        unknown_fields = []
-        if opp.team1_bk1.lower() == "unknown":
-            unknown_fields.append("team1_bk1")
-        if opp.team2_bk1.lower() == "unknown":
-            unknown_fields.append("team2_bk1")
-        if opp.team1_bk2.lower() == "unknown":
-            unknown_fields.append("team1_bk2")
-        if opp.team2_bk2.lower() == "unknown":
-            unknown_fields.append("team2_bk2")
-        if opp.link_bk1.lower() == "unknown":
-            unknown_fields.append("link_bk1")
-        if opp.link_bk2.lower() == "unknown":
-            unknown_fields.append("link_bk2")
-
-        # Debugging: Print the bet types, odd_specific, and unknown fields being checked
-        print(f"Checking opportunity: bk1={bet_type_bk1}, bk2={bet_type_bk2}, odd_specific='{opp.odd_specific}', unknown_fields={unknown_fields}")
-
-        # Check for DNB1 vs DNB2 combinations, odd_specific is empty, and no unknown fields
-        if (
-            ((bet_type_bk1 == "dnb1" and bet_type_bk2 == "dnb2") or 
-             (bet_type_bk1 == "dnb2" and bet_type_bk2 == "dnb1")) and
-            opp.odd_specific.strip() == "" and
-            len(unknown_fields) == 0  # No unknown fields
-        ):
-            filtered.append(opp)
-        elif unknown_fields:
-            print(f"  -> Filtered out due to unknown fields: {unknown_fields}")
-
-    return filtered
+    rules = rules or compile_filter_rules()
+    mask = build_filter_mask([opp.dict() for opp in opportunities], rules)
+    return [opp for opp, keep in zip(opportunities, mask) if keep]
 
 
 def save_filtered_opportunities(filtered_opportunities: List[Opportunity], output_file: str):
     """
-    Save filtered opportunities to a JSON file.
+    Atomically save filtered opportunities to a JSONL file and publish a new generation.
 
     Parameters:
         filtered_opportunities (List[Opportunity]): List of filtered opportunities.
-        output_file (str): Path to the output JSON file.
+        output_file (str): Path to the output JSONL file.
     """
     try:
-        with open(output_file, "w", encoding="utf-8") as json_file:
-            json.dump([opp.dict() for opp in filtered_opportunities], json_file, ensure_ascii=False, indent=4)
+        publish_jsonl(output_file, (opp.dict() for opp in filtered_opportunities))
         print(f"Filtered opportunities saved to {output_file}")
     except Exception as e:
         print(f"Error saving filtered opportunities: {e}")
@@ -118,74 +181,92 @@ def save_filtered_opportunities(filtered_opportunities: List[Opportunity], outpu
 
 def clear_filtered_opportunities_file(output_file: str):
     """
-    Clear the filtered opportunities file by writing an empty array.
+    Clear the filtered opportunities file by publishing an empty generation.
     
     Parameters:
-        output_file (str): Path to the output JSON file.
+        output_file (str): Path to the output JSONL file.
     """
     try:
-        with open(output_file, "w", encoding="utf-8") as json_file:
-            json.dump([], json_file, ensure_ascii=False, indent=4)
+        publish_jsonl(output_file, [])
         print(f"✅ Cleared filtered opportunities file: {output_file}")
     except Exception as e:
         print(f"❌ Error clearing filtered opportunities file: {e}")
 
 
+def print_opportunity(opp: Opportunity):
+    """Print the details of a filtered opportunity"""
+    print("\n--------------------------------")
+    print(f"Profit: {opp.profit}")
+    print(f"Sport: {opp.sport}")
+    print(f"Event Time: {opp.event_time}")
+    print(f"Bookmaker 1: {opp.bookmaker1}")
+    print(f"Team 1 (Bookmaker 1): {opp.team1_bk1}")
+    print(f"Team 2 (Bookmaker 1): {opp.team2_bk1}")
+    print(f"League (Bookmaker 1): {opp.league_bk1}")
+    print(f"Bet Type (Bookmaker 1): {opp.bet_type_bk1}")
+    print(f"Odd (Bookmaker 1): {opp.odd_bk1}")
+    print(f"Link (Bookmaker 1): {opp.link_bk1}")
+    print(f"Bookmaker 2: {opp.bookmaker2}")
+    print(f"Team 1 (Bookmaker 2): {opp.team1_bk2}")
+    print(f"Team 2 (Bookmaker 2): {opp.team2_bk2}")
+    print(f"League (Bookmaker 2): {opp.league_bk2}")
+    print(f"Bet Type (Bookmaker 2): {opp.bet_type_bk2}")
+    print(f"Odd (Bookmaker 2): {opp.odd_bk2}")
+    print(f"Link (Bookmaker 2): {opp.link_bk2}")
+    print(f"Matchup: {opp.matchup}")
+    print(f"Detailed Page URL: {opp.detailed_page_url}")
+
+
 def main():
-    # Load opportunities from arb_opportunities.json
-    file_path = os.path.join(os.getcwd(), "arb_opportunities.json")
-    opportunities = load_opportunities(file_path)
+    # Stream opportunities from arb_opportunities.jsonl
+    file_path = os.path.join(os.getcwd(), ARB_OPPORTUNITIES_FILE)
 
     # Define output file path
-    output_file = os.path.join(os.getcwd(), "filtered_opportunities.json")
+    output_file = os.path.join(os.getcwd(), FILTERED_OPPORTUNITIES_FILE)
 
-    if not opportunities:
-        print("No opportunities found.")
-        
-        # Clear the filtered opportunities file when no source opportunities exist
-        print("🧹 Clearing filtered_opportunities.json file (no source opportunities)...")
+    # Filter opportunities with the rules from config.json
+    rules = compile_filter_rules(ConfigManager().get_filter_rules())
+
+    total_rows = 0
+    filtered_fingerprints = []
+    try:
+        # Survivors are appended as each batch is filtered; the file is only
+        # published (atomically) once every batch has been processed
+        with AtomicJsonlWriter(output_file) as writer:
+            for batch in iter_jsonl_batches(file_path, FILTER_BATCH_SIZE):
+                total_rows += len(batch)
+                for opp in filter_raw_opportunities(batch, rules):
+                    print_opportunity(opp)
+                    row = opp.dict()
+                    writer.write(row)
+                    filtered_fingerprints.append(opportunity_fingerprint(row))
+    except FileNotFoundError:
+        print(f"Error: '{file_path}' file not found.")
         clear_filtered_opportunities_file(output_file)
-        
         return
 
-    # Filter opportunities
-    filtered_opportunities = filter_opportunities(opportunities)
+    manifest = publish_manifest(output_file, writer.count, len(set(filtered_fingerprints)))
+
+    # Tag the survivors in the opportunity store so mainrunner can query them
+    store = OpportunityStore()
+    store.mark_filtered(filtered_fingerprints, manifest["generation"])
+    store.close()
 
-    if not filtered_opportunities:
+    if not total_rows:
+        print("No opportunities found.")
+        print(f"🧹 Cleared {FILTERED_OPPORTUNITIES_FILE} file (no source opportunities)")
+        return
+
+    print(f"🔎 {writer.count} of {total_rows} rows passed the filter rules")
+    rules.print_report()
+
+    if not writer.count:
         print("No opportunities match the specified filters.")
-        
-        # Clear the filtered opportunities file when no opportunities pass the filter
-        print("🧹 Clearing filtered_opportunities.json file (no matching opportunities)...")
-        clear_filtered_opportunities_file(output_file)
-        
+        print(f"🧹 Cleared {FILTERED_OPPORTUNITIES_FILE} file (no matching opportunities)")
         return
 
-    # Print filtered opportunities
-    for opp in filtered_opportunities:
-        print("\n--------------------------------")
-        print(f"Profit: {opp.profit}")
-        print(f"Sport: {opp.sport}")
-        print(f"Event Time: {opp.event_time}")
-        print(f"Bookmaker 1: {opp.bookmaker1}")
-        print(f"Team 1 (Bookmaker 1): {opp.team1_bk1}")
-        print(f"Team 2 (Bookmaker 1): {opp.team2_bk1}")
-        print(f"League (Bookmaker 1): {opp.league_bk1}")
-        print(f"Bet Type (Bookmaker 1): {opp.bet_type_bk1}")
-        print(f"Odd (Bookmaker 1): {opp.odd_bk1}")
-        print(f"Link (Bookmaker 1): {opp.link_bk1}")
-        print(f"Bookmaker 2: {opp.bookmaker2}")
-        print(f"Team 1 (Bookmaker 2): {opp.team1_bk2}")
-        print(f"Team 2 (Bookmaker 2): {opp.team2_bk2}")
-        print(f"League (Bookmaker 2): {opp.league_bk2}")
-        print(f"Bet Type (Bookmaker 2): {opp.bet_type_bk2}")
-        print(f"Odd (Bookmaker 2): {opp.odd_bk2}")
-        print(f"Link (Bookmaker 2): {opp.link_bk2}")
-        print(f"Matchup: {opp.matchup}")
-        print(f"Detailed Page URL: {opp.detailed_page_url}")
-
-    # Save filtered opportunities to a JSON file
-    save_filtered_opportunities(filtered_opportunities, output_file)
+    print(f"Filtered opportunities saved to {output_file} (generation {manifest['generation']})")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
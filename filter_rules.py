@@ -0,0 +1,222 @@
+"""
+Declarative filter rules for scraped arbitrage opportunities.
+
+The "filter_rules" section of config.json is compiled once into a chain of
+predicates. Each predicate only sees the rows that survived the previous ones,
+so cheap and highly selective rules run first and short-circuit the rest.
+"""
+
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Defaults reproduce the original hard-coded f.py filter
+DEFAULT_FILTER_RULES = {
+    "allowed_market_pairs": [["DNB1", "DNB2"]],
+    "require_empty_odd_specific": True,
+    "reject_unknown_fields": True,
+    "min_profit": None,
+    "sports_allow": [],
+    "sports_deny": [],
+    "leagues_allow": [],
+    "leagues_deny": [],
+    "max_hours_to_kickoff": None,
+    "bookmaker_pairs_allow": [],
+}
+
+UNKNOWN_CHECK_FIELDS = ("team1_bk1", "team2_bk1", "team1_bk2", "team2_bk2", "link_bk1", "link_bk2")
+
+_PROFIT_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_profit(value: str) -> Optional[float]:
+    """Parse a profit cell such as "1.23%" or "1.23" into a float"""
+    match = _PROFIT_RE.search(value.replace(",", "."))
+    return float(match.group()) if match else None
+
+
+def parse_event_time(value: str, now: datetime) -> Optional[datetime]:
+    """
+    Parse breaking-bet's "Jul 04, 10:35" event time. The year is not shown, so the
+    nearest occurrence around now is used.
+    """
+    try:
+        parsed = datetime.strptime(value.strip(), "%b %d, %H:%M")
+    except ValueError:
+        return None
+
+    event_time = parsed.replace(year=now.year)
+    if event_time < now - timedelta(days=180):
+        event_time = event_time.replace(year=now.year + 1)
+    return event_time
+
+
+class FilterRule:
+    """A single named predicate over one or more normalized columns"""
+
+    def __init__(self, name: str, fields: Sequence[str], test: Callable[..., bool], selectivity: float):
+        self.name = name
+        self.fields = tuple(fields)
+        self.test = test
+        # Expected share of rows rejected; refined from observed counts as batches run
+        self.selectivity = selectivity
+        self.evaluated = 0
+        self.rejected = 0
+
+    def apply(self, columns: Dict[str, List[str]], indices: List[int]) -> List[int]:
+        """Return the subset of indices that pass this rule"""
+        field_columns = [columns[field] for field in self.fields]
+        test = self.test
+        if len(field_columns) == 1:
+            column = field_columns[0]
+            survivors = [i for i in indices if test(column[i])]
+        else:
+            survivors = [i for i in indices if test(*(column[i] for column in field_columns))]
+
+        self.evaluated += len(indices)
+        self.rejected += len(indices) - len(survivors)
+        return survivors
+
+    def observed_selectivity(self) -> float:
+        if not self.evaluated:
+            return self.selectivity
+        return self.rejected / self.evaluated
+
+
+class CompiledFilterRules:
+    """Ordered predicate chain with per-rule rejection counts"""
+
+    def __init__(self, rules: List[FilterRule]):
+        self.rules = sorted(rules, key=lambda rule: rule.selectivity, reverse=True)
+
+    @property
+    def required_fields(self) -> Tuple[str, ...]:
+        fields = []
+        for rule in self.rules:
+            for field in rule.fields:
+                if field not in fields:
+                    fields.append(field)
+        return tuple(fields)
+
+    def evaluate(self, columns: Dict[str, List[str]], row_count: int) -> List[bool]:
+        """
+        Run the chain over normalized columns and return a boolean mask aligned with the rows.
+        Rules are re-ordered by observed selectivity afterwards so later batches benefit.
+        """
+        indices = list(range(row_count))
+        for rule in self.rules:
+            if not indices:
+                break
+            indices = rule.apply(columns, indices)
+
+        self.rules.sort(key=lambda rule: rule.observed_selectivity(), reverse=True)
+
+        mask = [False] * row_count
+        for i in indices:
+            mask[i] = True
+        return mask
+
+    def rejection_counts(self) -> Dict[str, int]:
+        return {rule.name: rule.rejected for rule in self.rules}
+
+    def print_report(self):
+        """Print how many rows each rule rejected"""
+        print("📋 Filter rule rejections:")
+        for rule in self.rules:
+            print(f"  {rule.name:<28} rejected {rule.rejected:>6} of {rule.evaluated:>6}")
+
+
+def _lower_set(values: Iterable) -> set:
+    return {str(value).strip().lower() for value in values or []}
+
+
+def _pair_set(pairs: Iterable) -> set:
+    return {tuple(sorted(str(value).strip().lower() for value in pair)) for pair in pairs or []}
+
+
+def compile_filter_rules(config: Optional[Dict] = None, now: Optional[datetime] = None) -> CompiledFilterRules:
+    """
+    Compile a filter_rules config section into a predicate chain.
+
+    Parameters:
+        config (Dict): Rules overriding DEFAULT_FILTER_RULES; missing keys keep their defaults.
+        now (datetime): Reference time for max_hours_to_kickoff (defaults to the current time).
+
+    Returns:
+        CompiledFilterRules: The compiled chain.
+    """
+    settings = dict(DEFAULT_FILTER_RULES)
+    settings.update(config or {})
+    now = now or datetime.now()
+    rules = []
+
+    market_pairs = _pair_set(settings["allowed_market_pairs"])
+    if market_pairs:
+        rules.append(FilterRule(
+            "allowed_market_pairs", ("bet_type_bk1", "bet_type_bk2"),
+            lambda bet1, bet2: (bet1, bet2) in market_pairs or (bet2, bet1) in market_pairs,
+            selectivity=0.9,
+        ))
+
+    if settings["require_empty_odd_specific"]:
+        rules.append(FilterRule("empty_odd_specific", ("odd_specific",), lambda value: not value, selectivity=0.5))
+
+    if settings["reject_unknown_fields"]:
+        rules.append(FilterRule(
+            "no_unknown_fields", UNKNOWN_CHECK_FIELDS,
+            lambda *values: "unknown" not in values,
+            selectivity=0.1,
+        ))
+
+    if settings["min_profit"] is not None:
+        min_profit = float(settings["min_profit"])
+
+        def profit_ok(value):
+            profit = parse_profit(value)
+            return profit is not None and profit >= min_profit
+
+        rules.append(FilterRule("min_profit", ("profit",), profit_ok, selectivity=0.3))
+
+    sports_allow = _lower_set(settings["sports_allow"])
+    if sports_allow:
+        rules.append(FilterRule("sports_allow", ("sport",), lambda sport: sport in sports_allow, selectivity=0.6))
+
+    sports_deny = _lower_set(settings["sports_deny"])
+    if sports_deny:
+        rules.append(FilterRule("sports_deny", ("sport",), lambda sport: sport not in sports_deny, selectivity=0.2))
+
+    leagues_allow = _lower_set(settings["leagues_allow"])
+    if leagues_allow:
+        rules.append(FilterRule(
+            "leagues_allow", ("league_bk1", "league_bk2"),
+            lambda league1, league2: any(term in league1 or term in league2 for term in leagues_allow),
+            selectivity=0.6,
+        ))
+
+    leagues_deny = _lower_set(settings["leagues_deny"])
+    if leagues_deny:
+        rules.append(FilterRule(
+            "leagues_deny", ("league_bk1", "league_bk2"),
+            lambda league1, league2: not any(term in league1 or term in league2 for term in leagues_deny),
+            selectivity=0.2,
+        ))
+
+    if settings["max_hours_to_kickoff"] is not None:
+        latest_kickoff = now + timedelta(hours=float(settings["max_hours_to_kickoff"]))
+
+        def kickoff_ok(value):
+            event_time = parse_event_time(value, now)
+            return event_time is not None and event_time <= latest_kickoff
+
+        rules.append(FilterRule("max_hours_to_kickoff", ("event_time",), kickoff_ok, selectivity=0.3))
+
+    bookmaker_pairs = _pair_set(settings["bookmaker_pairs_allow"])
+    if bookmaker_pairs:
+        rules.append(FilterRule(
+            "bookmaker_pairs_allow", ("bookmaker1", "bookmaker2"),
+            lambda bk1, bk2: (bk1, bk2) in bookmaker_pairs or (bk2, bk1) in bookmaker_pairs,
+            selectivity=0.4,
+        ))
+
+    return CompiledFilterRules(rules)
@@ -1,7 +1,20 @@
 import asyncio
-import re
+import math
+import time
+from decimal import Decimal
 from tools import BettingBot
 from config_manager import ConfigManager
+from bankroll_allocator import DEFAULT_BANKROLL_SETTINGS, BalanceCache
+from stake_engine import best_rounded_stakes
+from money import Money, parse_money, to_decimal
+from browser_sessions import close_browser_session, open_browser_session
+from latency import end_trace, record_span, set_leg, span, start_trace
+from agent_usage import DEFAULT_LLM_USAGE_SETTINGS, end_usage, set_model_prices, start_usage
+from agent_trace import configure_tracing, format_timeline
+from lifecycle import end_lifecycle, mark_leg_placed, mark_lifecycle, start_lifecycle
+from journal import JOURNAL, clear_journal_opportunity, set_journal_opportunity
+from opportunity_store import opportunity_fingerprint
+from odds_gate import DEFAULT_ODDS_GATE_SETTINGS, plausible_live_odd
 
 class ArbitrageBettingSystem:
     def __init__(self):
@@ -11,8 +24,57 @@ class ArbitrageBettingSystem:
         # Get Chrome profiles from config
         self.chrome_profiles = self.config.get_all_executable_configs()
         
+        # Bankroll limits (max stake per arb, per-event exposure, balance cache TTL)
+        self.bankroll_settings = dict(DEFAULT_BANKROLL_SETTINGS)
+        self.bankroll_settings.update(self.config.get_bankroll_settings())
+        
         # Default max stake in USD
-        self.default_max_stake_usd = 30
+        self.default_max_stake_usd = self.bankroll_settings["max_stake_per_arb_usd"]
+        
+        # Run both legs in parallel, each in one kept-alive browser session (see execute_arbitrage_pipelined)
+        self.pipelined_execution = True
+        
+        self.balance_tools = {
+            "sportybet": self.betting_bot.sporty_balance_checker,
+            "leon": self.betting_bot.leon_balance_checker_tool,
+            "marathonbet": self.betting_bot.marathonbet_balance_checker_tool,
+            "zenitbet": self.betting_bot.zenitbet_balance_checker_tool,
+            "vbet": self.betting_bot.vbet_balance_checker_tool,
+            "sports888": self.betting_bot.sports888_balance_checker_tool,
+            "bet9ja": self.betting_bot.bet9ja_balance_checker_tool,
+            "nairabet": self.betting_bot.nairabet_balance_checker_tool,
+        }
+        self.bet_placer_tools = {
+            "sportybet": self.betting_bot.sporty_bet_placer,
+            "leon": self.betting_bot.leon_bet_placer_tool,
+            "marathonbet": self.betting_bot.marathonbet_bet_placer_tool,
+            "zenitbet": self.betting_bot.zenitbet_bet_placer_tool,
+            "vbet": self.betting_bot.vbet_bet_placer_tool,
+            "sports888": self.betting_bot.sports888_bet_placer_tool,
+            "bet9ja": self.betting_bot.bet9ja_bet_placer_tool,
+            "nairabet": self.betting_bot.nairabet_bet_placer_tool,
+        }
+        
+        # Last known balance per book, shared with the allocator in mainrunner.py
+        self.balance_cache = BalanceCache(ttl_seconds=self.bankroll_settings["balance_cache_ttl_minutes"] * 60)
+        
+        # Minimum arbitrage edge (percent) the live betslip odds must still offer
+        self.min_edge_percent = 0.0
+        
+        # Live odds beyond this move from the scraped odd are taken as misreads
+        self.odds_gate_settings = dict(DEFAULT_ODDS_GATE_SETTINGS)
+        self.odds_gate_settings.update(self.config.get_odds_gate_settings())
+        
+        # LLM prices and the per-opportunity cost budget of the book agents
+        self.llm_usage_settings = dict(DEFAULT_LLM_USAGE_SETTINGS)
+        self.llm_usage_settings.update(self.config.get_llm_usage_settings())
+        set_model_prices(self.llm_usage_settings["prices_per_million"])
+        
+        # Agent step timeline: JS sleeps are only measured (by rewriting the scripts) when asked to
+        configure_tracing(**self.config.get_tracing_settings())
+        
+        # Balance checks and bets of the book modules go to the run journal
+        JOURNAL.configure(**self.config.get_journal_settings())
     
     def force_close_browser_sessions(self):
         """
@@ -35,32 +97,12 @@ class ArbitrageBettingSystem:
             print(f"⚠️ Warning during browser cleanup: {e}")
         
     def extract_numeric_balance(self, balance_input) -> float:
-        """Extract numeric value from balance string"""
-        if not balance_input:
-            return 0.0
-        
-        if isinstance(balance_input, (int, float)):
-            return float(balance_input)
+        """Extract numeric value from balance string (see money.parse_money for the formats handled)"""
+        return float(parse_money(balance_input).amount)
     
-    # If it's a string, process it
-    
-        
-        # Remove currency symbols and extract numeric value
-        if isinstance(balance_input, str):
-        # Remove currency symbols and extract numeric value
-           numeric_str = re.sub(r'[^\d.,]', '', balance_input)
-           numeric_str = numeric_str.replace(',', '.')
-        
-           try:
-            return float(numeric_str)
-           except ValueError:
-            return 0.0
-        
-   # Fallback for any other type
-        try:
-            return float(balance_input)
-        except (ValueError, TypeError):
-             return 0.0
+    def extract_balance_money(self, balance_result: dict) -> Money:
+        """Balance reported by a balance checker as Money; the currency is taken from the text if not reported"""
+        return parse_money(balance_result.get("balance"), balance_result.get("currency") or None)
     
     async def balance_checker(self, arbitrage_data: dict) -> dict:
         """
@@ -88,6 +130,8 @@ class ArbitrageBettingSystem:
         
         # Check bookmaker1 balance
         print(f"📊 Checking {bookmaker1} balance with Profile 1...")
+        set_leg("bookmaker1")
+        started = time.perf_counter()
         try:
             if bookmaker1 == "sportybet":
                 results["bookmaker1"]["balance_result"] = await self.betting_bot.sporty_balance_checker(
@@ -138,8 +182,12 @@ class ArbitrageBettingSystem:
                 "error_message": str(e)
             }
         
+        record_span("balance_check", time.perf_counter() - started)
+        
         # Check bookmaker2 balance
         print(f"📊 Checking {bookmaker2} balance with Profile 2...")
+        set_leg("bookmaker2")
+        started = time.perf_counter()
         try:
             if bookmaker2 == "sportybet":
                 results["bookmaker2"]["balance_result"] = await self.betting_bot.sporty_balance_checker(
@@ -190,6 +238,9 @@ class ArbitrageBettingSystem:
                 "error_message": str(e)
             }
         
+        record_span("balance_check", time.perf_counter() - started)
+        set_leg(None)
+        
         print("✅ Balance checking completed for both bookmakers")
         return results
     
@@ -203,31 +254,39 @@ class ArbitrageBettingSystem:
         bk1_balance_result = balance_results["bookmaker1"]["balance_result"]
         bk2_balance_result = balance_results["bookmaker2"]["balance_result"]
         
-        bk1_balance_numeric = self.extract_numeric_balance(bk1_balance_result["balance"])
-        bk2_balance_numeric = self.extract_numeric_balance(bk2_balance_result["balance"])
+        bk1_balance = self.extract_balance_money(bk1_balance_result)
+        bk2_balance = self.extract_balance_money(bk2_balance_result)
+        
+        bk1_balance_numeric = float(bk1_balance.amount)
+        bk2_balance_numeric = float(bk2_balance.amount)
         
-        bk1_currency = bk1_balance_result["currency"]
-        bk2_currency = bk2_balance_result["currency"]
+        bk1_currency = bk1_balance.currency
+        bk2_currency = bk2_balance.currency
         
         print(f"📊 Bookmaker1 ({arbitrage_data['bookmaker1']}): {bk1_balance_numeric} {bk1_currency}")
         print(f"📊 Bookmaker2 ({arbitrage_data['bookmaker2']}): {bk2_balance_numeric} {bk2_currency}")
         
         # Convert balances to USD
         try:
-            bk1_balance_usd = self.betting_bot.currency_converter(bk1_balance_numeric, bk1_currency, "USD")
-            bk2_balance_usd = self.betting_bot.currency_converter(bk2_balance_numeric, bk2_currency, "USD")
+            with span("currency_conversion"):
+                bk1_balance_usd = float(self.betting_bot.convert_money(bk1_balance, "USD").amount)
+                bk2_balance_usd = float(self.betting_bot.convert_money(bk2_balance, "USD").amount)
         except Exception as e:
             print(f"❌ Currency conversion error: {e}")
             return {"error": f"Currency conversion failed: {e}"}
         
         print(f"💵 Converted balances - BK1: ${bk1_balance_usd} USD, BK2: ${bk2_balance_usd} USD")
         
+        self.balance_cache.update(arbitrage_data["bookmaker1"], bk1_balance_usd, bk1_balance_numeric, bk1_currency)
+        self.balance_cache.update(arbitrage_data["bookmaker2"], bk2_balance_usd, bk2_balance_numeric, bk2_currency)
+        
         # Extract odds
         odd1 = float(arbitrage_data["odd_bk1"])
         odd2 = float(arbitrage_data["odd_bk2"])
         
-        # Initial stake calculation with default max stake
-        initial_stakes = self.betting_bot.calculate_arbitrage_stakes(odd1, odd2, self.default_max_stake_usd)
+        # Initial stake calculation with the allocator's stake, or the default max stake
+        max_stake_usd = float(arbitrage_data.get("allocated_stake_usd") or self.default_max_stake_usd)
+        initial_stakes = self.betting_bot.calculate_arbitrage_stakes(odd1, odd2, max_stake_usd)
         
         if "error" in initial_stakes:
             return {"error": initial_stakes["error"]}
@@ -238,7 +297,7 @@ class ArbitrageBettingSystem:
         print(f"📈 Initial stakes: BK1: ${stake1_usd} USD, BK2: ${stake2_usd} USD")
         
         # Check if stakes exceed available balances and recalculate if needed
-        max_available_stake = min(bk1_balance_usd, bk2_balance_usd, self.default_max_stake_usd)
+        max_available_stake = min(bk1_balance_usd, bk2_balance_usd, max_stake_usd)
         
         if stake1_usd > bk1_balance_usd or stake2_usd > bk2_balance_usd:
             print("⚠️ Stakes exceed available balances, recalculating...")
@@ -263,26 +322,63 @@ class ArbitrageBettingSystem:
             
             print(f"🔄 Adjusted stakes: BK1: ${stake1_usd} USD, BK2: ${stake2_usd} USD")
         
-        # Convert stakes back to bookmaker currencies
+        # Convert stakes back to bookmaker currencies (rates are cached from the balance conversion)
         try:
-            stake1_original_currency = self.betting_bot.currency_converter(stake1_usd, "USD", bk1_currency)
-            stake2_original_currency = self.betting_bot.currency_converter(stake2_usd, "USD", bk2_currency)
+            with span("currency_conversion"):
+                stake1_original_currency = float(self.betting_bot.convert_money(Money(to_decimal(stake1_usd), "USD"), bk1_currency).amount)
+                stake2_original_currency = float(self.betting_bot.convert_money(Money(to_decimal(stake2_usd), "USD"), bk2_currency).amount)
+                usd_rate1 = float(self.betting_bot.exchange_rate(bk1_currency, "USD"))
+                usd_rate2 = float(self.betting_bot.exchange_rate(bk2_currency, "USD"))
         except Exception as e:
             print(f"❌ Stake currency conversion error: {e}")
             return {"error": f"Stake currency conversion failed: {e}"}
         
+        # Round to what each book actually accepts, picking the pair with the best worst case
+        rules1 = self.config.get_stake_rules(arbitrage_data["bookmaker1"])
+        rules2 = self.config.get_stake_rules(arbitrage_data["bookmaker2"])
+        rounded = best_rounded_stakes(
+            [odd1, odd2],
+            [stake1_original_currency, stake2_original_currency],
+            [rules1["stake_step"], rules2["stake_step"]],
+            min_stakes=[rules1["min_stake"], rules2["min_stake"]],
+            max_stakes=[
+                min(rules1["max_stake"] or float("inf"), bk1_balance_numeric),
+                min(rules2["max_stake"] or float("inf"), bk2_balance_numeric)
+            ],
+            usd_rates=[usd_rate1, usd_rate2]
+        )
+        
+        if "error" in rounded:
+            return {"error": rounded["error"]}
+        
+        if rounded["worst_case_profit_usd"] < 0:
+            return {"error": f"Bookmaker stake limits leave a worst case of ${rounded['worst_case_profit_usd']} USD"}
+        
+        stake1_original_currency, stake2_original_currency = rounded["stakes"]
+        stake1_usd, stake2_usd = rounded["stakes_usd"]
+        initial_stakes["worst_case_profit_usd"] = rounded["worst_case_profit_usd"]
+        print(f"🎚️ Rounded stakes: BK1: {stake1_original_currency} {bk1_currency}, BK2: {stake2_original_currency} {bk2_currency} "
+              f"(worst case ${rounded['worst_case_profit_usd']} USD)")
+        
         result = {
             "bookmaker1": {
                 "stake_usd": round(stake1_usd, 2),
-                "stake_original_currency": round(stake1_original_currency, 2),
+                "stake_original_currency": float(Money(to_decimal(stake1_original_currency), bk1_currency).quantize().amount),
                 "currency": bk1_currency,
-                "balance_available": round(bk1_balance_numeric, 2)
+                "balance_available": round(bk1_balance_numeric, 2),
+                "stake_step": rules1["stake_step"],
+                # Limits for stakes re-sized by the odds gate, in the book's currency
+                "min_stake": rules1["min_stake"],
+                "max_stake": min(rules1["max_stake"] or float("inf"), bk1_balance_numeric)
             },
             "bookmaker2": {
                 "stake_usd": round(stake2_usd, 2),
-                "stake_original_currency": round(stake2_original_currency, 2),
+                "stake_original_currency": float(Money(to_decimal(stake2_original_currency), bk2_currency).quantize().amount),
                 "currency": bk2_currency,
-                "balance_available": round(bk2_balance_numeric, 2)
+                "balance_available": round(bk2_balance_numeric, 2),
+                "stake_step": rules2["stake_step"],
+                "min_stake": rules2["min_stake"],
+                "max_stake": min(rules2["max_stake"] or float("inf"), bk2_balance_numeric)
             },
             "arbitrage_info": initial_stakes
         }
@@ -290,6 +386,11 @@ class ArbitrageBettingSystem:
         print("✅ Stake calculation completed")
         return result
     
+    def stake_amount(self, stake_info: dict, bookmaker_key: str) -> Decimal:
+        """Stake for one leg as an exact 2-decimal amount in the bookmaker's currency"""
+        leg = stake_info[bookmaker_key]
+        return Money(to_decimal(leg["stake_original_currency"]), leg["currency"]).quantize().amount
+    
     def format_bet_data(self, arbitrage_data: dict, stake_info: dict, bookmaker_num: int) -> dict:
         """
         Format betting data for individual bookmaker
@@ -305,7 +406,7 @@ class ArbitrageBettingSystem:
                 "bet_type_bk": arbitrage_data["bet_type_bk1"],
                 "odd_bk": arbitrage_data["odd_bk1"],
                 "link_bk": arbitrage_data["link_bk1"],
-                "stake_amount": stake_info["bookmaker1"]["stake_original_currency"]
+                "stake_amount": self.stake_amount(stake_info, "bookmaker1")
             }
         else:
             return {
@@ -318,9 +419,124 @@ class ArbitrageBettingSystem:
                 "bet_type_bk": arbitrage_data["bet_type_bk2"],
                 "odd_bk": arbitrage_data["odd_bk2"],
                 "link_bk": arbitrage_data["link_bk2"],
-                "stake_amount": stake_info["bookmaker2"]["stake_original_currency"]
+                "stake_amount": self.stake_amount(stake_info, "bookmaker2")
             }
     
+    def _leg_stake(self, leg: dict, stake_usd: float) -> float:
+        """
+        A USD stake in the bookmaker's currency, on the book's stake step. Scales the
+        already converted stake instead of calling the currency API again, so the odds
+        gate stays fast.
+        """
+        if leg["stake_usd"] <= 0:
+            return leg["stake_original_currency"]
+        step = leg.get("stake_step", 0.01)
+        return round(round(leg["stake_original_currency"] * stake_usd / leg["stake_usd"] / step) * step, 2)
+    
+    def _stake_fits(self, leg: dict, stake: float) -> bool:
+        """Whether a stake in the book's currency is within its min/max stake and balance"""
+        return (leg.get("min_stake") or 0) <= stake <= leg.get("max_stake", float("inf"))
+    
+    def _rescale_stake(self, stake_info: dict, bookmaker_key: str, new_stake_usd: float) -> float:
+        """
+        Update a leg's stake in stake_info to new_stake_usd and return it in the
+        bookmaker's currency, clamped to the book's stake limits and balance.
+        """
+        leg = stake_info[bookmaker_key]
+        stake = self._leg_stake(leg, new_stake_usd)
+        if not self._stake_fits(leg, stake):
+            step = leg.get("stake_step", 0.01)
+            low = math.ceil((leg.get("min_stake") or 0) / step - 1e-9) * step
+            high = math.floor(leg.get("max_stake", float("inf")) / step + 1e-9) * step
+            clamped = round(min(max(stake, low), high), 2)
+            print(f"⚠️ {bookmaker_key} stake {stake} {leg.get('currency', '')} is outside the book's limits "
+                  f"or balance, clamped to {clamped}")
+            if leg["stake_original_currency"] > 0:
+                new_stake_usd = clamped * leg["stake_usd"] / leg["stake_original_currency"]
+            stake = clamped
+        leg["stake_original_currency"] = stake
+        leg["stake_usd"] = round(new_stake_usd, 2)
+        return stake
+    
+    def trusted_live_odd(self, live_odd, scraped_odd: float, bookmaker_key: str):
+        """
+        The live betslip odd if it is plausible next to the scraped one, else None
+        so the odds gate keeps the computed stake instead of acting on a misread.
+        """
+        if live_odd is None:
+            return None
+        if not plausible_live_odd(live_odd, scraped_odd, self.odds_gate_settings["max_odd_move_fraction"]):
+            print(f"⚠️ Live odd {live_odd} for {bookmaker_key} is implausible next to the scraped {scraped_odd}, "
+                  f"treating it as unreadable")
+            return None
+        return live_odd
+    
+    def recheck_first_leg(self, live_odd1, odd1: float, odd2: float, stake_info: dict):
+        """
+        Odds gate for the first leg: recompute the arbitrage with the live betslip odd.
+        
+        Returns the stake to place in the bookmaker's currency (exact 2-decimal amount), or None to abort.
+        """
+        live_odd1 = self.trusted_live_odd(live_odd1, odd1, "bookmaker1")
+        if live_odd1 is None:
+            print("⚠️ Live odd for bookmaker1 unavailable, keeping computed stake")
+            return self.stake_amount(stake_info, "bookmaker1")
+        
+        total_stake_usd = stake_info["bookmaker1"]["stake_usd"] + stake_info["bookmaker2"]["stake_usd"]
+        live_stakes = self.betting_bot.calculate_arbitrage_stakes(live_odd1, odd2, total_stake_usd)
+        
+        if "error" in live_stakes or live_stakes["actual_profit_percent"] < self.min_edge_percent:
+            print(f"🛑 Edge gone: bookmaker1 odd moved {odd1} → {live_odd1}")
+            return None
+        
+        # Leg 1 can still be aborted: do so if either re-sized stake would be rejected,
+        # rather than be left with a hedge the second book will not take
+        for key, stake_usd in (("bookmaker1", live_stakes["stake1"]), ("bookmaker2", live_stakes["stake2"])):
+            stake = self._leg_stake(stake_info[key], stake_usd)
+            if not self._stake_fits(stake_info[key], stake):
+                print(f"🛑 Re-sized {key} stake {stake} {stake_info[key].get('currency', '')} is outside the book's limits or balance")
+                return None
+        
+        if live_odd1 != odd1:
+            print(f"🔄 Bookmaker1 odd moved {odd1} → {live_odd1}, edge now {live_stakes['actual_profit_percent']}%")
+        
+        stake_info["arbitrage_info"] = live_stakes
+        self._rescale_stake(stake_info, "bookmaker2", live_stakes["stake2"])
+        self._rescale_stake(stake_info, "bookmaker1", live_stakes["stake1"])
+        return self.stake_amount(stake_info, "bookmaker1")
+    
+    def recheck_second_leg(self, live_odd2, odd1: float, odd2: float, stake_info: dict):
+        """
+        Odds gate for the second leg. The first leg is already placed, so this never
+        aborts: it re-sizes the hedge for the live odd, even if that locks in a loss.
+        The hedge is clamped to the book's stake limits and balance, which leaves part
+        of the first leg unhedged rather than having the bet rejected.
+        
+        Returns the stake to place in the bookmaker's currency (exact 2-decimal amount).
+        """
+        live_odd2 = self.trusted_live_odd(live_odd2, odd2, "bookmaker2")
+        if live_odd2 is None:
+            print("⚠️ Live odd for bookmaker2 unavailable, keeping computed stake")
+            return self.stake_amount(stake_info, "bookmaker2")
+        
+        if live_odd2 == odd2:
+            return self.stake_amount(stake_info, "bookmaker2")
+        
+        stake1_usd = stake_info["bookmaker1"]["stake_usd"]
+        hedge = self.betting_bot.calculate_arbitrage_from_known_stake(odd1, live_odd2, stake1=stake1_usd)
+        
+        if "error" in hedge:
+            # Equal payout on both outcomes at the live odd
+            stake2_usd = stake1_usd * odd1 / live_odd2
+            locked_loss = stake1_usd * odd1 - (stake1_usd + stake2_usd)
+            print(f"⚠️ Bookmaker2 odd moved {odd2} → {live_odd2}, hedging at a locked loss of ${abs(round(locked_loss, 2))} USD")
+        else:
+            stake2_usd = hedge["stake2"]
+            print(f"🔄 Bookmaker2 odd moved {odd2} → {live_odd2}, edge now {hedge['actual_profit_percent']}%")
+        
+        self._rescale_stake(stake_info, "bookmaker2", stake2_usd)
+        return self.stake_amount(stake_info, "bookmaker2")
+    
     async def bet_placer(self, arbitrage_data: dict, stake_info: dict) -> dict:
         """
         Place bets on both bookmakers sequentially
@@ -343,40 +559,63 @@ class ArbitrageBettingSystem:
         bet_data_bk1 = self.format_bet_data(arbitrage_data, stake_info, 1)
         bet_data_bk2 = self.format_bet_data(arbitrage_data, stake_info, 2)
         
+        # Odds gate callbacks, called by each book module with the live betslip odd
+        # right before the stake is typed in
+        odd1 = float(arbitrage_data["odd_bk1"])
+        odd2 = float(arbitrage_data["odd_bk2"])
+        live_odds = {"bookmaker1": None, "bookmaker2": None}
+        
+        async def check_leg1(live_odd):
+            live_odds["bookmaker1"] = self.trusted_live_odd(live_odd, odd1, "bookmaker1")
+            return self.recheck_first_leg(live_odds["bookmaker1"], odd1, odd2, stake_info)
+        
+        async def check_leg2(live_odd):
+            live_odds["bookmaker2"] = self.trusted_live_odd(live_odd, odd2, "bookmaker2")
+            return self.recheck_second_leg(live_odds["bookmaker2"], live_odds["bookmaker1"] or odd1, odd2, stake_info)
+        
         # Place bet on bookmaker1
         print(f"🎯 Placing bet on {bookmaker1}...")
+        set_leg("bookmaker1")
         try:
             if bookmaker1 == "sportybet":
                 results["bookmaker1"]["result"] = await self.betting_bot.sporty_bet_placer(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "leon":
                 results["bookmaker1"]["result"] = await self.betting_bot.leon_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "marathonbet":
                 results["bookmaker1"]["result"] = await self.betting_bot.marathonbet_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "zenitbet":
                 results["bookmaker1"]["result"] = await self.betting_bot.zenitbet_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "vbet":
                 results["bookmaker1"]["result"] = await self.betting_bot.vbet_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "sports888":
                 results["bookmaker1"]["result"] = await self.betting_bot.sports888_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "bet9ja":
                 results["bookmaker1"]["result"] = await self.betting_bot.bet9ja_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
             elif bookmaker1 == "nairabet":
                 results["bookmaker1"]["result"] = await self.betting_bot.nairabet_bet_placer_tool(
-                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", "")
+                    bet_data_bk1, profile1.get("executable_path", ""), profile1.get("user_data_dir", ""),
+                    odds_check=check_leg1
                 )
         except Exception as e:
             print(f"❌ Error placing bet on {bookmaker1}: {e}")
@@ -385,41 +624,61 @@ class ArbitrageBettingSystem:
             }
         
         print(f"✅ {bookmaker1} bet placement completed")
+        mark_leg_placed("bookmaker1", results["bookmaker1"]["result"])
+        
+        leg1_summary = (results["bookmaker1"]["result"] or {}).get("workflow_summary", {})
+        if leg1_summary.get("aborted_by_odds_gate"):
+            print(f"🛑 Skipping {bookmaker2}: the odds gate aborted the first leg")
+            results["bookmaker2"]["result"] = {
+                "workflow_summary": {"bet_placed": False, "skipped": True, "error": "First leg aborted by odds gate"}
+            }
+            results["live_odds"] = live_odds
+            set_leg(None)
+            return results
         
         # Place bet on bookmaker2
         print(f"🎯 Placing bet on {bookmaker2}...")
+        set_leg("bookmaker2")
         try:
             if bookmaker2 == "sportybet":
                 results["bookmaker2"]["result"] = await self.betting_bot.sporty_bet_placer(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "leon":
                 results["bookmaker2"]["result"] = await self.betting_bot.leon_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "marathonbet":
                 results["bookmaker2"]["result"] = await self.betting_bot.marathonbet_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "zenitbet":
                 results["bookmaker2"]["result"] = await self.betting_bot.zenitbet_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "vbet":
                 results["bookmaker2"]["result"] = await self.betting_bot.vbet_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "sports888":
                 results["bookmaker2"]["result"] = await self.betting_bot.sports888_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "bet9ja":
                 results["bookmaker2"]["result"] = await self.betting_bot.bet9ja_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
             elif bookmaker2 == "nairabet":
                 results["bookmaker2"]["result"] = await self.betting_bot.nairabet_bet_placer_tool(
-                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", "")
+                    bet_data_bk2, profile2.get("executable_path", ""), profile2.get("user_data_dir", ""),
+                    odds_check=check_leg2
                 )
         except Exception as e:
             print(f"❌ Error placing bet on {bookmaker2}: {e}")
@@ -428,13 +687,251 @@ class ArbitrageBettingSystem:
             }
         
         print(f"✅ {bookmaker2} bet placement completed")
+        mark_leg_placed("bookmaker2", results["bookmaker2"]["result"])
+        set_leg(None)
         print("🎉 All bets placement process completed!")
         
+        results["live_odds"] = live_odds
         return results
     
+    def arbitrage_result(self, arbitrage_data: dict, balance_results: dict, stake_info: dict, bet_results: dict) -> dict:
+        """
+        Final result of an executed arbitrage; also debits the cached balances of the placed legs
+        """
+        bets_placed = {}
+        for key in ("bookmaker1", "bookmaker2"):
+            leg_result = bet_results[key]["result"] or {}
+            bets_placed[key] = leg_result.get("workflow_summary", {}).get("bet_placed", False)
+            # Keep the cached balances in step with what was just staked
+            if bets_placed[key]:
+                self.balance_cache.debit(arbitrage_data[key], stake_info[key]["stake_usd"])
+        
+        return {
+            "success": True,
+            "balance_results": balance_results,
+            "stake_info": stake_info,
+            "bet_results": bet_results,
+            "summary": {
+                "arbitrage_profit": stake_info["arbitrage_info"]["actual_profit_percent"],
+                "total_stake_usd": round(stake_info["bookmaker1"]["stake_usd"] + stake_info["bookmaker2"]["stake_usd"], 2),
+                "bk1_bet_placed": bets_placed["bookmaker1"],
+                "bk2_bet_placed": bets_placed["bookmaker2"]
+            }
+        }
+    
     async def execute_arbitrage(self, arbitrage_data: dict) -> dict:
         """
-        Main function to execute the complete arbitrage betting process
+        Main function to execute the complete arbitrage betting process.
+        Every phase is timed (see latency.py); the seconds per phase are returned
+        in result["timings"] and the individual spans in result["spans"]. The LLM
+        usage of every agent run (see agent_usage.py) is returned in result["llm_usage"]
+        and its step timeline (see agent_trace.py) in result["agent_timeline"],
+        and the runs are journaled under result["fingerprint"] (see journal.py). The
+        lifecycle timestamps and outcome (see lifecycle.py) are in result["lifecycle"].
+        """
+        trace = start_trace(f"{arbitrage_data.get('bookmaker1')} vs {arbitrage_data.get('bookmaker2')}")
+        usage = start_usage()
+        fingerprint = arbitrage_data.get("fingerprint") or opportunity_fingerprint(arbitrage_data)
+        set_journal_opportunity(fingerprint)
+        lifecycle = start_lifecycle(arbitrage_data, fingerprint)
+        if arbitrage_data.get("seen_at"):
+            record_span("scrape_age", max(0.0, time.time() - float(arbitrage_data["seen_at"])))
+        
+        try:
+            with span("total"):
+                if self.pipelined_execution:
+                    result = await self.execute_arbitrage_pipelined(arbitrage_data)
+                else:
+                    result = await self.execute_arbitrage_sequential(arbitrage_data)
+        finally:
+            end_trace()
+            end_usage()
+            clear_journal_opportunity()
+            end_lifecycle()
+        
+        result["fingerprint"] = fingerprint
+        lifecycle.finish(result)
+        result["lifecycle"] = lifecycle.as_dict()
+        print(f"🧭 Lifecycle: {lifecycle.format()}")
+        result["timings"] = trace.totals()
+        result["spans"] = trace.spans
+        result["llm_usage"] = usage.summary()
+        print(f"⏱️ Phase timings: {trace.format()}")
+        print(f"🧠 LLM usage: {usage.format()}")
+        
+        # Where each leg's agent seconds went, step by step
+        traces = [run.trace for run in usage.runs if run.trace is not None]
+        result["agent_timeline"] = [trace.as_dict() for trace in traces]
+        if traces:
+            print(format_timeline(traces))
+        
+        budget = self.llm_usage_settings.get("budget_per_opportunity_usd")
+        if budget is not None and usage.cost_usd > float(budget):
+            print(f"⚠️ LLM cost ${usage.cost_usd:.4f} is over the ${float(budget):.4f} budget per opportunity")
+        return result
+    
+    async def execute_arbitrage_pipelined(self, arbitrage_data: dict) -> dict:
+        """
+        Pipelined arbitrage execution. Each leg keeps one browser session open on its
+        profile and runs balance check → open link_bk → select the odds → verify the
+        betslip without waiting for anything else, both legs in parallel. Only the
+        stake entry waits: for the stake calculation (needs both balances) and, on the
+        second leg, for the first leg to be placed.
+        """
+        print("🚀 Starting Arbitrage Betting Automation (pipelined)...")
+        print(f"📊 Processing: {arbitrage_data['sport']} - {arbitrage_data['team1_bk1']} vs {arbitrage_data['team2_bk1']}")
+        print(f"🏪 Bookmakers: {arbitrage_data['bookmaker1']} vs {arbitrage_data['bookmaker2']}")
+        
+        legs = ("bookmaker1", "bookmaker2")
+        profiles = {"bookmaker1": self.chrome_profiles.get("path1", {}), "bookmaker2": self.chrome_profiles.get("path2", {})}
+        odd1 = float(arbitrage_data["odd_bk1"])
+        odd2 = float(arbitrage_data["odd_bk2"])
+        
+        balance_results = {key: {"name": arbitrage_data[key].lower(), "balance_result": None} for key in legs}
+        bet_results = {key: {"name": arbitrage_data[key].lower(), "result": None} for key in legs}
+        balances_checked = {key: asyncio.Event() for key in legs}
+        leg_finished = {key: asyncio.Event() for key in legs}
+        stake_ready = asyncio.get_running_loop().create_future()
+        live_odds = {key: None for key in legs}
+        abort_reasons = {}
+        
+        # The betslip selection does not depend on the stake, so the legs start with a placeholder
+        pending_stake_info = {key: {"stake_original_currency": 0, "currency": "USD"} for key in legs}
+        
+        async def calculate_stakes():
+            await asyncio.gather(*(balances_checked[key].wait() for key in legs))
+            mark_lifecycle("balance_done")
+            try:
+                if not all((balance_results[key]["balance_result"] or {}).get("is_logged_in") for key in legs):
+                    stake_info = {"error": "One or both bookmakers are not logged in"}
+                else:
+                    print("✅ Phase 1 completed: Balance checking successful")
+                    print("💰 Phase 2: Stake Calculation...")
+                    with span("stake_calculation"):
+                        stake_info = self.stake_calculation(arbitrage_data, balance_results)
+            except Exception as e:
+                stake_info = {"error": f"Stake calculation failed: {e}"}
+            stake_ready.set_result(stake_info)
+        
+        def make_odds_check(key):
+            waited = False
+            
+            async def ready():
+                # The book module awaits this before reading the betslip odd, so the
+                # odd it passes to odds_check is read after these waits
+                nonlocal waited
+                if waited:
+                    return
+                with span("stake_wait"):
+                    stake_info = await stake_ready
+                # Never stake the second leg before the first one is confirmed
+                if key == "bookmaker2" and "error" not in stake_info:
+                    with span("leg1_wait"):
+                        await leg_finished["bookmaker1"].wait()
+                waited = True
+            
+            async def odds_check(live_odd):
+                await ready()
+                stake_info = stake_ready.result()
+                if "error" in stake_info:
+                    abort_reasons[key] = stake_info["error"]
+                    return None
+                
+                live_odds[key] = self.trusted_live_odd(live_odd, odd1 if key == "bookmaker1" else odd2, key)
+                if key == "bookmaker1":
+                    return self.recheck_first_leg(live_odds["bookmaker1"], odd1, odd2, stake_info)
+                
+                leg1_result = bet_results["bookmaker1"]["result"] or {}
+                if not leg1_result.get("workflow_summary", {}).get("bet_placed"):
+                    abort_reasons[key] = "First leg was not placed"
+                    return None
+                return self.recheck_second_leg(live_odds["bookmaker2"], live_odds["bookmaker1"] or odd1, odd2, stake_info)
+            
+            odds_check.ready = ready
+            return odds_check
+        
+        async def run_leg(key, bookmaker_num):
+            bookmaker = arbitrage_data[key].lower()
+            profile = profiles[key]
+            executable_path = profile.get("executable_path", "")
+            user_data_dir = profile.get("user_data_dir", "")
+            browser_session = None
+            # Spans recorded in this task (and the book module it calls) belong to this leg
+            set_leg(key)
+            
+            print(f"📊 Checking {bookmaker} balance with Profile {bookmaker_num}...")
+            try:
+                if bookmaker not in self.balance_tools:
+                    raise ValueError(f"Unknown bookmaker: {bookmaker}")
+                with span("browser_open"):
+                    browser_session = await open_browser_session(bookmaker, executable_path, user_data_dir)
+                with span("balance_check"):
+                    balance_results[key]["balance_result"] = await self.balance_tools[bookmaker](
+                        executable_path, user_data_dir, "", "", browser_session=browser_session
+                    )
+            except Exception as e:
+                print(f"❌ Error checking {bookmaker} balance: {e}")
+                balance_results[key]["balance_result"] = {
+                    "is_logged_in": False,
+                    "balance": "0.00",
+                    "currency": "USD",
+                    "error_message": str(e)
+                }
+            finally:
+                balances_checked[key].set()
+            
+            try:
+                if browser_session is not None and (balance_results[key]["balance_result"] or {}).get("is_logged_in"):
+                    print(f"🎯 Pre-selecting {bookmaker} odds while stakes are calculated...")
+                    bet_data = self.format_bet_data(arbitrage_data, pending_stake_info, bookmaker_num)
+                    bet_results[key]["result"] = await self.bet_placer_tools[bookmaker](
+                        bet_data, executable_path, user_data_dir,
+                        odds_check=make_odds_check(key), browser_session=browser_session
+                    )
+                    mark_leg_placed(key, bet_results[key]["result"])
+            except Exception as e:
+                print(f"❌ Error placing bet on {bookmaker}: {e}")
+                bet_results[key]["result"] = {
+                    "workflow_summary": {"error": str(e), "bet_placed": False}
+                }
+            finally:
+                leg_finished[key].set()
+                if browser_session is not None:
+                    await close_browser_session(browser_session)
+            
+            print(f"✅ {bookmaker} leg completed")
+        
+        try:
+            await asyncio.gather(calculate_stakes(), run_leg("bookmaker1", 1), run_leg("bookmaker2", 2))
+        except Exception as e:
+            print(f"❌ Critical error in arbitrage execution: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+        
+        for key, reason in abort_reasons.items():
+            summary = (bet_results[key]["result"] or {}).get("workflow_summary")
+            if summary is not None:
+                summary["error"] = reason
+        bet_results["live_odds"] = live_odds
+        
+        stake_info = stake_ready.result()
+        if "error" in stake_info:
+            return {
+                "success": False,
+                "error": stake_info["error"],
+                "balance_results": balance_results,
+                "bet_results": bet_results
+            }
+        
+        print("🎉 All bets placement process completed!")
+        return self.arbitrage_result(arbitrage_data, balance_results, stake_info, bet_results)
+    
+    async def execute_arbitrage_sequential(self, arbitrage_data: dict) -> dict:
+        """
+        Sequential arbitrage execution: balance check, close all browsers, stake
+        calculation, then each leg in a fresh browser session
         """
         print("🚀 Starting Arbitrage Betting Automation...")
         print(f"📊 Processing: {arbitrage_data['sport']} - {arbitrage_data['team1_bk1']} vs {arbitrage_data['team2_bk1']}")
@@ -444,6 +941,7 @@ class ArbitrageBettingSystem:
             # Step 1: Check balances
             print("🔍 Phase 1: Balance Checking...")
             balance_results = await self.balance_checker(arbitrage_data)
+            mark_lifecycle("balance_done")
             
             # Verify both bookmakers are logged in
             bk1_logged_in = balance_results["bookmaker1"]["balance_result"]["is_logged_in"]
@@ -464,7 +962,8 @@ class ArbitrageBettingSystem:
             
             # Step 2: Calculate stakes
             print("💰 Phase 2: Stake Calculation...")
-            stake_info = self.stake_calculation(arbitrage_data, balance_results)
+            with span("stake_calculation"):
+                stake_info = self.stake_calculation(arbitrage_data, balance_results)
             
             if "error" in stake_info:
                 return {
@@ -481,19 +980,7 @@ class ArbitrageBettingSystem:
             
             print("✅ Phase 3 completed: Bet placement attempted")
             
-            # Final result
-            return {
-                "success": True,
-                "balance_results": balance_results,
-                "stake_info": stake_info,
-                "bet_results": bet_results,
-                "summary": {
-                    "arbitrage_profit": stake_info["arbitrage_info"]["actual_profit_percent"],
-                    "total_stake_usd": round(stake_info["bookmaker1"]["stake_usd"] + stake_info["bookmaker2"]["stake_usd"], 2),
-                    "bk1_bet_placed": bet_results["bookmaker1"]["result"]["workflow_summary"].get("bet_placed", False),
-                    "bk2_bet_placed": bet_results["bookmaker2"]["result"]["workflow_summary"].get("bet_placed", False)
-                }
-            }
+            return self.arbitrage_result(arbitrage_data, balance_results, stake_info, bet_results)
             
         except Exception as e:
             print(f"❌ Critical error in arbitrage execution: {e}")
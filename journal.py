@@ -0,0 +1,410 @@
+"""
+Run journal: every balance check and bet placement of the book modules, in one
+rotating, compressed JSONL log.
+
+Each run gets a unique run id and is appended by a background writer thread, so
+the agents never wait for disk I/O:
+
+    journal/runs-20250101-120000-0001.jsonl.gz   segments (one gzip member per batch)
+    journal/index.jsonl                          run id -> segment, by opportunity fingerprint
+
+An entry looks like
+    {"run_id": ..., "ts": ..., "kind": "balance" | "bet", "bookmaker": "bet9ja",
+     "fingerprint": <opportunity fingerprint or null>, "data": {...}}
+
+got.py sets the fingerprint of the opportunity it is executing (see
+set_journal_opportunity), so every run of one arb can be found with
+
+    python journal.py --fingerprint <fingerprint>
+
+Every process writes to a segment of its own, rolled once it is larger than
+max_segment_bytes; only the newest max_segments are kept (the "journal" section
+of config.json).
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+
+DEFAULT_JOURNAL_SETTINGS = {
+    "enabled": True,
+    "directory": "journal",
+    "max_segment_bytes": 8 * 1024 * 1024,
+    "max_segments": 20,
+    # How long the writer waits to batch entries into one gzip member
+    "flush_interval_seconds": 1.0,
+}
+
+INDEX_FILE = "index.jsonl"
+SEGMENT_PREFIX = "runs-"
+SEGMENT_SUFFIX = ".jsonl.gz"
+GZIP_MAGIC = b"\x1f\x8b\x08"
+
+_STOP = object()
+
+_current_fingerprint: ContextVar[Optional[str]] = ContextVar("journal_fingerprint", default=None)
+
+
+def _gzip_members(data: bytes, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Decompressed content of every intact gzip member in data.
+
+    A member that is truncated or fails its CRC is skipped and reading resumes at
+    the next gzip header, so one bad batch does not hide the batches after it.
+    """
+    view = memoryview(data)
+    position = 0
+    while True:
+        start = data.find(GZIP_MAGIC, position)
+        if start == -1:
+            return
+        decompressor = zlib.decompressobj(wbits=31)
+        parts = []
+        offset = start
+        try:
+            while not decompressor.eof and offset < len(data):
+                chunk = view[offset:offset + chunk_size]
+                parts.append(decompressor.decompress(chunk))
+                offset += len(chunk)
+        except zlib.error:
+            position = start + 1
+            continue
+        if not decompressor.eof:
+            position = start + 1
+            continue
+        yield b"".join(parts)
+        position = offset - len(decompressor.unused_data)
+
+
+def new_run_id() -> str:
+    """Unique, time-sortable run id, e.g. 20250101T120000-3f9a1c2e"""
+    return f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def set_journal_opportunity(fingerprint: Optional[str]):
+    """Tag the runs journaled by the current task with an opportunity fingerprint"""
+    _current_fingerprint.set(fingerprint)
+
+
+def clear_journal_opportunity():
+    _current_fingerprint.set(None)
+
+
+class RunJournal:
+    """Append-only journal of agent runs with a background writer"""
+
+    def __init__(self, directory: str = DEFAULT_JOURNAL_SETTINGS["directory"], **settings):
+        self.settings = dict(DEFAULT_JOURNAL_SETTINGS)
+        self.configure(directory=directory, **settings)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._segment: Optional[str] = None
+        self._sequence = 0
+
+    def configure(self, **settings):
+        """Apply the "journal" settings of config.json (before the first write)"""
+        self.settings.update({key: value for key, value in settings.items() if value is not None})
+        self.directory = self.settings["directory"]
+        self.enabled = bool(self.settings["enabled"])
+
+    # ------------------------------------------------------------------ writing
+
+    def record(self, kind: str, bookmaker: str, data: Dict[str, Any], run_id: Optional[str] = None,
+               fingerprint: Optional[str] = None) -> str:
+        """
+        Queue a run for the journal.
+
+        Parameters:
+            kind (str): "balance" or "bet".
+            bookmaker (str): Book key, e.g. "bet9ja".
+            data (Dict[str, Any]): The results of the run (JSON serializable).
+            run_id (str): Id from new_run_id(); a new one is made when omitted.
+            fingerprint (str): Opportunity fingerprint; defaults to the one set by got.py.
+
+        Returns:
+            str: The run id.
+        """
+        run_id = run_id or new_run_id()
+        if not self.enabled:
+            return run_id
+
+        entry = {
+            "run_id": run_id,
+            "ts": time.time(),
+            "kind": kind,
+            "bookmaker": bookmaker,
+            "fingerprint": fingerprint or _current_fingerprint.get(),
+            "data": data,
+        }
+        self._ensure_writer()
+        self._queue.put(entry)
+        return run_id
+
+    def flush(self):
+        """Block until every queued entry is on disk"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._writer, name="run-journal", daemon=True)
+                self._thread.start()
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Give concurrent runs a moment to land in the same gzip member
+            deadline = time.monotonic() + float(self.settings["flush_interval_seconds"])
+            while item is not _STOP:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            entries = [entry for entry in batch if entry is not _STOP]
+            try:
+                if entries:
+                    self._write_batch(entries)
+            except Exception as e:
+                print(f"⚠️ Run journal write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(entries) != len(batch):
+                return
+
+    def _write_batch(self, entries: List[Dict[str, Any]]):
+        segment = self._current_segment()
+        lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry in entries)
+        # Each batch is a complete gzip member: a crash never corrupts earlier batches,
+        # and a reader skips a member left truncated
+        with open(os.path.join(self.directory, segment), "ab") as f:
+            f.write(gzip.compress(lines.encode("utf-8"), mtime=0))
+
+        index_lines = "".join(
+            json.dumps({
+                "run_id": entry["run_id"],
+                "fingerprint": entry["fingerprint"],
+                "segment": segment,
+                "ts": entry["ts"],
+                "kind": entry["kind"],
+                "bookmaker": entry["bookmaker"],
+            }) + "\n"
+            for entry in entries
+        )
+        with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(index_lines)
+
+    def _current_segment(self) -> str:
+        # A writer never appends to a segment of an earlier process: that one may end
+        # in a member truncated by a crash
+        path = os.path.join(self.directory, self._segment) if self._segment else None
+        if path is None or (os.path.exists(path) and os.path.getsize(path) >= int(self.settings["max_segment_bytes"])):
+            self._segment = self._new_segment()
+            self._prune()
+        return self._segment
+
+    def _new_segment(self) -> str:
+        while True:
+            self._sequence += 1
+            segment = f"{SEGMENT_PREFIX}{datetime.now():%Y%m%d-%H%M%S}-{self._sequence:04d}{SEGMENT_SUFFIX}"
+            if not os.path.exists(os.path.join(self.directory, segment)):
+                return segment
+
+    def _prune(self):
+        """Drop the oldest segments beyond max_segments and their index entries"""
+        segments = self.segments()
+        expired = segments[:max(0, len(segments) - int(self.settings["max_segments"]) + 1)]
+        if not expired:
+            return
+        for segment in expired:
+            os.remove(os.path.join(self.directory, segment))
+
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        kept = [entry for entry in self.index() if entry.get("segment") not in expired]
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in kept)
+        os.replace(temp_path, index_path)
+        print(f"🗑️ Run journal: dropped {len(expired)} old segment(s)")
+
+    # ------------------------------------------------------------------ reading
+
+    def segments(self) -> List[str]:
+        """Segment file names, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def index(self) -> List[Dict[str, Any]]:
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # Partially written last line
+                    continue
+        return entries
+
+    def iter_segment(self, segment: str) -> Iterator[Dict[str, Any]]:
+        """Entries of one segment; a truncated or corrupt member (crash mid-write) is skipped"""
+        try:
+            with open(os.path.join(self.directory, segment), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Pruned while we were reading
+            return
+        for member in _gzip_members(data):
+            for line in member.decode("utf-8", errors="replace").splitlines():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def query(self, fingerprint: Optional[str] = None, run_id: Optional[str] = None,
+              bookmaker: Optional[str] = None, kind: Optional[str] = None,
+              since: Optional[float] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Journaled runs matching every given filter, oldest first.
+
+        Lookups by fingerprint or run id only open the segments the index points to;
+        the other filters scan every segment.
+
+        Parameters:
+            fingerprint (str): Opportunity fingerprint (opportunity_store.opportunity_fingerprint).
+            run_id (str): A single run.
+            bookmaker (str): Book key.
+            kind (str): "balance" or "bet".
+            since (float): Epoch seconds.
+            limit (int): Return only the newest `limit` runs.
+
+        Returns:
+            List[Dict[str, Any]]: Journal entries.
+        """
+        self.flush()
+        segments = self.segments()
+        if fingerprint or run_id:
+            wanted = {
+                entry["segment"] for entry in self.index()
+                if (not fingerprint or entry.get("fingerprint") == fingerprint)
+                and (not run_id or entry.get("run_id") == run_id)
+            }
+            segments = [segment for segment in segments if segment in wanted]
+
+        matches = []
+        for segment in segments:
+            for entry in self.iter_segment(segment):
+                if fingerprint and entry.get("fingerprint") != fingerprint:
+                    continue
+                if run_id and entry.get("run_id") != run_id:
+                    continue
+                if bookmaker and entry.get("bookmaker") != bookmaker:
+                    continue
+                if kind and entry.get("kind") != kind:
+                    continue
+                if since and entry.get("ts", 0) < since:
+                    continue
+                matches.append(entry)
+        return matches[-limit:] if limit else matches
+
+    def stats(self) -> Dict[str, Any]:
+        """Segments, indexed runs and size on disk"""
+        segments = self.segments()
+        return {
+            "directory": self.directory,
+            "segments": len(segments),
+            "runs": len(self.index()),
+            "bytes": sum(os.path.getsize(os.path.join(self.directory, segment)) for segment in segments),
+        }
+
+
+# One journal per process, shared by every book module
+JOURNAL = RunJournal()
+atexit.register(JOURNAL.close)
+
+
+def _summary_line(entry: Dict[str, Any]) -> str:
+    data = entry.get("data") or {}
+    when = datetime.fromtimestamp(entry.get("ts", 0)).strftime("%Y-%m-%d %H:%M:%S")
+    if entry.get("kind") == "balance":
+        balance = data.get("balance") or {}
+        outcome = f"balance {balance.get('balance', '?')} logged_in={balance.get('is_logged_in')}"
+    else:
+        summary = data.get("workflow_summary") or {}
+        placed = summary.get("bet_placed", summary.get("place_bet_completed"))
+        outcome = f"placed={placed} stake={summary.get('stake_amount', '?')}"
+    return (f"{when}  {entry.get('run_id')}  {entry.get('kind'):<7} {entry.get('bookmaker'):<12} "
+            f"{outcome}  [{entry.get('fingerprint') or '-'}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the run journal")
+    parser.add_argument("--dir", default=None, help="Journal directory (default: config.json or ./journal)")
+    parser.add_argument("--fingerprint", help="Runs of one opportunity")
+    parser.add_argument("--run-id", help="A single run")
+    parser.add_argument("--bookmaker", help="Book key, e.g. bet9ja")
+    parser.add_argument("--kind", choices=["balance", "bet"])
+    parser.add_argument("--since-hours", type=float, help="Only runs from the last N hours")
+    parser.add_argument("--limit", type=int, default=50, help="Newest N runs (0 = all)")
+    parser.add_argument("--full", action="store_true", help="Print whole entries as JSON lines")
+    parser.add_argument("--stats", action="store_true", help="Print journal size and exit")
+    args = parser.parse_args()
+
+    directory = args.dir
+    if directory is None:
+        try:
+            from config_manager import ConfigManager
+            directory = ConfigManager().get_journal_settings().get("directory")
+        except Exception:
+            directory = None
+    journal = RunJournal(directory or DEFAULT_JOURNAL_SETTINGS["directory"])
+
+    if args.stats:
+        print(f"📒 {journal.stats()}")
+        return
+
+    entries = journal.query(
+        fingerprint=args.fingerprint,
+        run_id=args.run_id,
+        bookmaker=args.bookmaker,
+        kind=args.kind,
+        since=time.time() - args.since_hours * 3600 if args.since_hours else None,
+        limit=args.limit or None,
+    )
+    for entry in entries:
+        print(json.dumps(entry, ensure_ascii=False) if args.full else _summary_line(entry))
+    if not args.full:
+        print(f"📒 {len(entries)} run(s)")
+
+
+if __name__ == "__main__":
+    main()
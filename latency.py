@@ -0,0 +1,215 @@
+"""
+Per-phase latency spans for arbitrage execution.
+
+got.py opens a trace for every opportunity it executes. Code anywhere below it
+(got.py itself, the book modules, their controller actions) times a phase with
+
+    with span("balance_check"):
+        ...
+
+or the @timed("stake_fill") decorator. Each span is added to the current
+opportunity's trace and to a process-wide histogram of that phase (LATENCY), so
+mainrunner.py can report where the seconds between "arb seen" and "both legs
+placed" go.
+
+The current trace and leg live in context variables: both legs of a pipelined
+execution run in their own asyncio task, so a span always lands on the leg that
+recorded it.
+
+Phases:
+    scrape_age            time from the last scrape sighting to execution start
+    browser_open          starting a leg's browser session
+    balance_check         balance read (direct DOM read or agent fallback)
+    stake_calculation     stake sizing, rounding and conversion
+    currency_conversion   balance and stake currency conversion
+    navigation_selection  betslip agent: open the event and add the selection
+    betslip_verification  betslip verification agent
+    stake_wait / leg1_wait  pipelined legs waiting for the stakes / the first leg
+    odds_gate_read        live betslip odds read
+    stake_fill_click      placement agent: enter the stake and confirm
+    stake_fill / place_click  the stake-fill and place-bet controller actions
+    total                 whole execute_arbitrage call
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+# Histogram bucket upper bounds in seconds (Prometheus style, +Inf is implicit)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, seconds: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile estimate, interpolated inside the bucket it falls in"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "min": round(self.min, 3) if self.min is not None else None,
+            "max": round(self.max, 3) if self.max is not None else None,
+            "p50": round(self.quantile(0.5), 3) if self.count else None,
+            "p90": round(self.quantile(0.9), 3) if self.count else None,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.bucket_counts)),
+        }
+
+
+class LatencyStore:
+    """Histograms of every phase, shared by the whole process"""
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            if phase not in self.histograms:
+                self.histograms[phase] = Histogram()
+            self.histograms[phase].observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {phase: histogram.snapshot() for phase, histogram in self.histograms.items()}
+
+
+LATENCY = LatencyStore()
+
+
+class OpportunityTrace:
+    """Spans recorded while executing one opportunity"""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add(self, phase: str, seconds: float, leg: Optional[str] = None):
+        self.spans.append({
+            "phase": phase,
+            "leg": leg,
+            "start": round(time.perf_counter() - seconds - self.started, 3),
+            "seconds": round(seconds, 3),
+        })
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds per phase ("phase" or "phase.leg"), summed over repeated spans"""
+        totals: Dict[str, float] = {}
+        for item in self.spans:
+            name = f"{item['phase']}.{item['leg']}" if item["leg"] else item["phase"]
+            totals[name] = round(totals.get(name, 0.0) + item["seconds"], 3)
+        return totals
+
+    def format(self) -> str:
+        """One log line, slowest phase first"""
+        totals = sorted(self.totals().items(), key=lambda item: -item[1])
+        return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in totals)
+
+
+_current_trace: ContextVar[Optional[OpportunityTrace]] = ContextVar("latency_trace", default=None)
+_current_leg: ContextVar[Optional[str]] = ContextVar("latency_leg", default=None)
+
+
+def start_trace(label: str = "") -> OpportunityTrace:
+    """Start the trace of an opportunity in the current task"""
+    trace = OpportunityTrace(label)
+    _current_trace.set(trace)
+    _current_leg.set(None)
+    return trace
+
+
+def end_trace():
+    _current_trace.set(None)
+    _current_leg.set(None)
+
+
+def set_leg(leg: Optional[str]):
+    """Attribute the following spans of this task to a leg ("bookmaker1"/"bookmaker2")"""
+    _current_leg.set(leg)
+
+
+def record_span(phase: str, seconds: float, leg: Optional[str] = None):
+    """Record an already measured duration"""
+    LATENCY.observe(phase, seconds)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(phase, seconds, leg or _current_leg.get())
+
+
+@contextmanager
+def span(phase: str, leg: Optional[str] = None):
+    """Time the enclosed block as one span of a phase"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(phase, time.perf_counter() - started, leg)
+
+
+def timed(phase: str):
+    """Decorator version of span() for async functions such as controller actions"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(phase):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def demo_leg(leg, delay):
+        set_leg(leg)
+        with span("balance_check"):
+            await asyncio.sleep(delay)
+
+    async def demo():
+        trace = start_trace("demo")
+        record_span("scrape_age", 4.2)
+        await asyncio.gather(demo_leg("bookmaker1", 0.05), demo_leg("bookmaker2", 0.02))
+        with span("stake_calculation"):
+            time.sleep(0.01)
+        print(f"⏱️ {trace.format()}")
+        print(f"📊 {LATENCY.snapshot()['balance_check']}")
+
+    asyncio.run(demo())
@@ -0,0 +1,306 @@
+"""
+Lifecycle of an opportunity from its first sighting to the outcome of its execution.
+
+Timestamps (epoch seconds) are collected as the opportunity flows through the system:
+
+    first_seen    first scrape sighting on breaking-bet   (arb_scraper.py → opportunity store)
+    last_seen     latest scrape sighting                   (arb_scraper.py → opportunity store)
+    filtered      tagged as passing the filter rules       (f.py → opportunity store)
+    picked        selected for execution                   (mainrunner.py)
+    started       execute_arbitrage started                (got.py)
+    balance_done  both balances known                      (got.py)
+    leg1_placed   first leg placed                         (got.py)
+    leg2_placed   second leg placed                        (got.py)
+    finished      execution finished, with the outcome     (got.py)
+
+Outcomes:
+    captured   both legs placed
+    one_leg    only one leg placed (open exposure)
+    odds_gone  the odds gate aborted: the arb was gone by the time we got there
+    failed     nothing placed for any other reason (login, errors)
+
+got.py returns the lifecycle in result["lifecycle"], mainrunner.py stores it in
+the executions table of the opportunity store and logs capture_report(): the
+capture rate against the reaction time (picked - first_seen), which is the KPI
+the latency work is measured by.
+
+    python lifecycle.py --since-hours 24
+"""
+
+import argparse
+import json
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+
+LIFECYCLE_EVENTS = (
+    "first_seen", "last_seen", "filtered", "picked", "started",
+    "balance_done", "leg1_placed", "leg2_placed", "finished",
+)
+
+OUTCOMES = ("captured", "one_leg", "odds_gone", "failed")
+
+# Reaction time buckets (upper bounds in seconds, the last bucket is open-ended)
+REACTION_BUCKETS = (30, 60, 120, 300, 600, 1800)
+
+# (name, from event, to event) of the stage durations in the report
+STAGES = (
+    ("scrape_to_filter", "last_seen", "filtered"),
+    ("filter_to_pick", "filtered", "picked"),
+    ("pick_to_start", "picked", "started"),
+    ("start_to_balance", "started", "balance_done"),
+    ("balance_to_leg1", "balance_done", "leg1_placed"),
+    ("leg1_to_leg2", "leg1_placed", "leg2_placed"),
+    ("seen_to_captured", "first_seen", "leg2_placed"),
+)
+
+
+class OpportunityLifecycle:
+    """Lifecycle timestamps and outcome of one execution"""
+
+    def __init__(self, fingerprint: str, bookmaker_pair: str = "", timestamps: Optional[Dict[str, float]] = None):
+        self.fingerprint = fingerprint
+        self.bookmaker_pair = bookmaker_pair
+        # Books of leg 1 and leg 2 and the matchup, for the live dashboard
+        self.bookmakers = ("", "")
+        self.matchup = ""
+        self.timestamps: Dict[str, Optional[float]] = {event: None for event in LIFECYCLE_EVENTS}
+        self.timestamps.update({event: value for event, value in (timestamps or {}).items() if event in self.timestamps})
+        self.outcome: Optional[str] = None
+
+    @classmethod
+    def from_opportunity(cls, opportunity: Dict[str, Any], fingerprint: str) -> "OpportunityLifecycle":
+        """Lifecycle with the timestamps the opportunity carries from the store and mainrunner"""
+        books = tuple(str(opportunity.get(key) or "").strip().lower() for key in ("bookmaker1", "bookmaker2"))
+        lifecycle = cls(fingerprint, "|".join(sorted(books)), {
+            "first_seen": _to_float(opportunity.get("first_seen")),
+            "last_seen": _to_float(opportunity.get("seen_at")),
+            "filtered": _to_float(opportunity.get("filtered_at")),
+            "picked": _to_float(opportunity.get("picked_at")),
+        })
+        lifecycle.bookmakers = books
+        lifecycle.matchup = f"{opportunity.get('team1_bk1') or '?'} vs {opportunity.get('team2_bk1') or '?'}"
+        return lifecycle
+
+    def mark(self, event: str, at: Optional[float] = None):
+        """Stamp an event; the first stamp wins"""
+        if self.timestamps.get(event) is None:
+            self.timestamps[event] = at or time.time()
+
+    def finish(self, result: Dict[str, Any]) -> str:
+        """Stamp "finished" and derive the outcome from an execute_arbitrage result"""
+        self.mark("finished")
+        bet_results = result.get("bet_results") or {}
+        summaries = [((bet_results.get(key) or {}).get("result") or {}).get("workflow_summary") or {}
+                     for key in ("bookmaker1", "bookmaker2")]
+        placed = sum(1 for summary in summaries if summary.get("bet_placed"))
+        if placed == 2:
+            self.outcome = "captured"
+        elif placed == 1:
+            self.outcome = "one_leg"
+        elif any(summary.get("aborted_by_odds_gate") for summary in summaries):
+            self.outcome = "odds_gone"
+        else:
+            self.outcome = "failed"
+        return self.outcome
+
+    def stage(self) -> str:
+        """Latest event stamped so far"""
+        stamped = [(at, event) for event, at in self.timestamps.items() if at is not None]
+        return max(stamped)[1] if stamped else "new"
+
+    def reaction_seconds(self) -> Optional[float]:
+        """Seconds from the first sighting to being picked for execution"""
+        return _elapsed(self.timestamps, "first_seen", "picked")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "bookmaker_pair": self.bookmaker_pair,
+            **self.timestamps,
+            "outcome": self.outcome,
+        }
+
+    def format(self) -> str:
+        """One log line: seconds of each stage that has both ends"""
+        stages = []
+        for name, start, end in STAGES:
+            seconds = _elapsed(self.timestamps, start, end)
+            if seconds is not None:
+                stages.append(f"{name} {seconds:.1f}s")
+        return f"{self.outcome or 'in progress'}" + (f" ({', '.join(stages)})" if stages else "")
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _elapsed(timestamps: Dict[str, Any], start: str, end: str) -> Optional[float]:
+    if timestamps.get(start) is None or timestamps.get(end) is None:
+        return None
+    return max(0.0, timestamps[end] - timestamps[start])
+
+
+_current_lifecycle: ContextVar[Optional[OpportunityLifecycle]] = ContextVar("lifecycle", default=None)
+
+# Lifecycles of the executions in progress, read by the live dashboard
+_in_flight: Dict[int, OpportunityLifecycle] = {}
+_in_flight_lock = threading.Lock()
+
+
+def start_lifecycle(opportunity: Dict[str, Any], fingerprint: str) -> OpportunityLifecycle:
+    """Start the lifecycle of the opportunity executed by the current task"""
+    lifecycle = OpportunityLifecycle.from_opportunity(opportunity, fingerprint)
+    lifecycle.mark("started")
+    _current_lifecycle.set(lifecycle)
+    with _in_flight_lock:
+        _in_flight[id(lifecycle)] = lifecycle
+    return lifecycle
+
+
+def end_lifecycle():
+    lifecycle = _current_lifecycle.get()
+    if lifecycle is not None:
+        with _in_flight_lock:
+            _in_flight.pop(id(lifecycle), None)
+    _current_lifecycle.set(None)
+
+
+def in_flight() -> List[OpportunityLifecycle]:
+    """Lifecycles of the executions in progress, oldest first"""
+    with _in_flight_lock:
+        return sorted(_in_flight.values(), key=lambda lifecycle: lifecycle.timestamps["started"] or 0)
+
+
+def mark_lifecycle(event: str):
+    """Stamp an event on the lifecycle in progress (no-op outside execute_arbitrage)"""
+    lifecycle = _current_lifecycle.get()
+    if lifecycle is not None:
+        lifecycle.mark(event)
+
+
+def mark_leg_placed(key: str, leg_result: Optional[Dict[str, Any]]):
+    """Stamp leg1_placed/leg2_placed if the leg of "bookmaker1"/"bookmaker2" was placed"""
+    if ((leg_result or {}).get("workflow_summary") or {}).get("bet_placed"):
+        mark_lifecycle("leg1_placed" if key == "bookmaker1" else "leg2_placed")
+
+
+# ==================== REPORT ====================
+
+def _summarize(values: List[float]) -> Dict[str, Any]:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "median_seconds": round(values[len(values) // 2], 1),
+        "p90_seconds": round(values[min(len(values) - 1, int(len(values) * 0.9))], 1),
+    }
+
+
+def _bucket_label(index: int) -> str:
+    if index == 0:
+        return f"<{REACTION_BUCKETS[0]}s"
+    if index == len(REACTION_BUCKETS):
+        return f">={REACTION_BUCKETS[-1]}s"
+    return f"{REACTION_BUCKETS[index - 1]}-{REACTION_BUCKETS[index]}s"
+
+
+def capture_report(executions: List[Dict[str, Any]], filtered_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Capture rate against reaction time.
+
+    Parameters:
+        executions (List[Dict[str, Any]]): Lifecycle rows (OpportunityStore.executions()).
+        filtered_count (int): Opportunities that passed the filter in the same window,
+            so the ones never picked count as missed.
+
+    Returns:
+        Dict[str, Any]: Totals, outcomes, stage durations and capture rate per reaction time bucket.
+    """
+    outcomes = {outcome: 0 for outcome in OUTCOMES}
+    buckets = [{"bucket": _bucket_label(index), "attempts": 0, "captured": 0}
+               for index in range(len(REACTION_BUCKETS) + 1)]
+    stages: Dict[str, List[float]] = {name: [] for name, _, _ in STAGES}
+
+    for row in executions:
+        outcome = row.get("outcome") or "failed"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        for name, start, end in STAGES:
+            seconds = _elapsed(row, start, end)
+            if seconds is not None:
+                stages[name].append(seconds)
+
+        reaction = _elapsed(row, "first_seen", "picked")
+        if reaction is None:
+            continue
+        index = next((i for i, bound in enumerate(REACTION_BUCKETS) if reaction < bound), len(REACTION_BUCKETS))
+        buckets[index]["attempts"] += 1
+        buckets[index]["captured"] += outcome == "captured"
+
+    for bucket in buckets:
+        bucket["capture_rate"] = round(bucket["captured"] / bucket["attempts"], 3) if bucket["attempts"] else None
+
+    attempts = len(executions)
+    report = {
+        "attempts": attempts,
+        "captured": outcomes["captured"],
+        "capture_rate": round(outcomes["captured"] / attempts, 3) if attempts else None,
+        "outcomes": outcomes,
+        "reaction_time": _summarize([r for r in (_elapsed(row, "first_seen", "picked") for row in executions) if r is not None]),
+        "stages": {name: _summarize(values) for name, values in stages.items()},
+        "by_reaction_time": buckets,
+    }
+    if filtered_count is not None:
+        report["filtered"] = filtered_count
+        report["capture_rate_of_filtered"] = round(outcomes["captured"] / filtered_count, 3) if filtered_count else None
+    return report
+
+
+def format_capture_report(report: Dict[str, Any]) -> str:
+    """Multi-line text version of capture_report()"""
+    rate = report["capture_rate"]
+    lines = [
+        f"🎯 Capture rate {rate * 100:.0f}% ({report['captured']}/{report['attempts']} attempts)" if rate is not None
+        else "🎯 No executions yet",
+    ]
+    if report.get("capture_rate_of_filtered") is not None:
+        lines[0] += f", {report['capture_rate_of_filtered'] * 100:.0f}% of {report['filtered']} filtered"
+    lines.append("   outcomes: " + ", ".join(f"{name} {count}" for name, count in report["outcomes"].items()))
+    reaction = report["reaction_time"]
+    if reaction.get("count"):
+        lines.append(f"   reaction time (seen → picked): median {reaction['median_seconds']}s, p90 {reaction['p90_seconds']}s")
+    stages = [f"{name} {summary['median_seconds']}s" for name, summary in report["stages"].items() if summary.get("count")]
+    if stages:
+        lines.append("   median stages: " + ", ".join(stages))
+    for bucket in report["by_reaction_time"]:
+        if bucket["attempts"]:
+            bar = "█" * round(bucket["capture_rate"] * 20)
+            lines.append(f"   {bucket['bucket']:>10} {bucket['captured']:3d}/{bucket['attempts']:<3d} {bucket['capture_rate'] * 100:5.1f}% {bar}")
+    return "\n".join(lines)
+
+
+def main():
+    from opportunity_store import OpportunityStore
+
+    parser = argparse.ArgumentParser(description="Capture rate vs reaction time of executed opportunities")
+    parser.add_argument("--since-hours", type=float, default=None, help="Only executions of the last N hours")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    store = OpportunityStore()
+    try:
+        report = capture_report(store.executions(since), store.filtered_count(since))
+    finally:
+        store.close()
+    print(json.dumps(report, indent=2) if args.json else format_capture_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Response cache for the LLMs driving the bookmaker agents.
+
+The balance and betslip-verification agents send the same task template on
+pages that look the same from one cycle to the next, so most of their LLM
+calls are repeats. LRULLMCache sits in front of the ChatOpenAI/ChatAnthropic
+clients (langchain's per-model `cache=` hook) and answers a repeat from memory.
+
+The key is the model settings plus a hash of the prompt (task template + page
+state) after the parts that change on every call are normalized away: inline
+screenshots, timestamps and random tab/target ids. Everything the agent can act
+on (element text, balances, odds, stakes) is kept, so a page that really changed
+is a cache miss.
+
+The placing agents (betslip navigation and stake/confirm) are never cached:
+chat_model() only attaches the cache when asked to.
+
+Every model also gets an LLMUsageCounter callback, which counts the calls that
+actually reached the API (cache hits are tagged and skipped) and their tokens
+into the Prometheus metrics and the usage of the agent run in progress, and
+times every call on the agent's step timeline (agent_trace.py).
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_anthropic import ChatAnthropic
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import Generation
+from langchain_openai import ChatOpenAI
+
+from agent_trace import trace_llm_end, trace_llm_start
+from agent_usage import record_llm_call
+from metrics import METRICS
+
+
+LLM_CACHE_MAX_ENTRIES = 256
+
+_VOLATILE_PATTERNS = [
+    (re.compile(r"data:image/[a-zA-Z]+;base64,[A-Za-z0-9+/=]+"), "<screenshot>"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?"), "<time>"),
+    (re.compile(r"\b[0-9A-Fa-f]{32}\b"), "<id>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt text with screenshots, timestamps and random ids replaced by placeholders"""
+    for pattern, placeholder in _VOLATILE_PATTERNS:
+        prompt = pattern.sub(placeholder, prompt)
+    return prompt.strip()
+
+
+class LRULLMCache(BaseCache):
+    """In-memory LRU cache of LLM generations with hit-rate counters"""
+
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Sequence[Generation]]" = OrderedDict()
+        # langchain runs the sync cache methods in a thread pool for async calls
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(llm_string.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(normalize_prompt(prompt).encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            generations = self._entries.get(key)
+            if generations is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Tagged copies, so usage accounting can tell a hit from an API call
+        return [
+            generation.model_copy(update={"generation_info": {**(generation.generation_info or {}), "cache_hit": True}})
+            for generation in generations
+        ]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            self._entries[key] = return_val
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses, evictions, current size and hit rate (percent)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            }
+
+
+# One cache per process, shared by every book module
+LLM_CACHE = LRULLMCache()
+
+
+class LLMUsageCounter(BaseCallbackHandler):
+    """Counts a model's API calls and tokens into METRICS and the running agent's usage (agent_usage.py) and times them (agent_trace.py)"""
+
+    # Counting is cheap, no need for a thread pool hop on async calls
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any) -> None:
+        trace_llm_start(kwargs.get("run_id"))
+
+    def on_llm_start(self, serialized, prompts, **kwargs: Any) -> None:
+        trace_llm_start(kwargs.get("run_id"))
+
+    def on_llm_error(self, error, **kwargs: Any) -> None:
+        trace_llm_end(kwargs.get("run_id"))
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        cached = any(
+            (generation.generation_info or {}).get("cache_hit")
+            for generations in response.generations for generation in generations
+        )
+        trace_llm_end(kwargs.get("run_id"), cached)
+        for generations in response.generations:
+            for generation in generations:
+                if (generation.generation_info or {}).get("cache_hit"):
+                    record_llm_call(self.model, 0, 0, cache_hit=True)
+                    continue
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+                METRICS.inc("arb_llm_calls_total", model=self.model)
+                METRICS.inc("arb_llm_tokens_total", input_tokens, model=self.model, direction="input")
+                METRICS.inc("arb_llm_tokens_total", output_tokens, model=self.model, direction="output")
+                record_llm_call(self.model, input_tokens, output_tokens)
+
+
+# Offline runs (benchmark_e2e.py) replace the API clients with a scripted model
+_model_factory = None
+
+
+def set_chat_model_factory(factory):
+    """Build every chat model with factory(model=..., cache=..., callbacks=...); None restores the API clients"""
+    global _model_factory
+    _model_factory = factory
+
+
+def chat_model(model: str, cached: bool = False):
+    """
+    Chat model for a browser agent.
+
+    Parameters:
+        model (str): "gpt-..." models use ChatOpenAI, "claude-..." models ChatAnthropic.
+        cached (bool): Answer repeated prompts from LLM_CACHE. Only for read-only
+            agents (balance checks, betslip verification).
+
+    Returns:
+        The langchain chat model.
+    """
+    cache = LLM_CACHE if cached else False
+    callbacks = [LLMUsageCounter(model)]
+    if _model_factory is not None:
+        return _model_factory(model=model, cache=cache, callbacks=callbacks)
+    if model.startswith("claude"):
+        return ChatAnthropic(model=model, cache=cache, callbacks=callbacks)
+    return ChatOpenAI(model=model, cache=cache, callbacks=callbacks)
+
+
+if __name__ == "__main__":
+    from langchain_core.outputs import ChatGeneration
+    from langchain_core.messages import AIMessage
+
+    page = "Task: read the balance\n[12]<span>₦1,234.50</span> at 2025-01-01T10:00:00Z tab 0123456789abcdef0123456789abcdef"
+    LLM_CACHE.update(page, "gpt-4o", [ChatGeneration(message=AIMessage(content="₦1,234.50"))])
+    LLM_CACHE.lookup(page.replace("10:00:00", "10:05:12"), "gpt-4o")
+    LLM_CACHE.lookup(page.replace("1,234.50", "999.00"), "gpt-4o")
+    print(f"🧠 LLM cache stats: {LLM_CACHE.stats()}")
@@ -1,9 +1,9 @@
 import asyncio
-import json
 import time
 import subprocess
 import logging
 import os
+from collections import deque
 from typing import List, Dict, Optional
 from datetime import datetime
 import sys
@@ -11,6 +11,19 @@ import sys
 # Add the got.py directory to the path
 
 from got import ArbitrageBettingSystem
+from opportunity_io import ARB_OPPORTUNITIES_FILE, FILTERED_OPPORTUNITIES_FILE, GenerationWatcher, iter_jsonl
+from opportunity_store import DEFAULT_DB_FILE, OpportunityStore, opportunity_fingerprint
+from stake_engine import rank_opportunities
+from bankroll_allocator import allocate_bankroll
+from session_keeper import SessionKeeper
+from llm_cache import LLM_CACHE
+from latency import LATENCY
+from agent_usage import AGENT_USAGE
+from journal import JOURNAL
+from lifecycle import capture_report, format_capture_report
+from profiling import DEFAULT_PROFILING_SETTINGS, profile_cycle
+from dashboard import DEFAULT_DASHBOARD_SETTINGS, run_dashboard
+from metrics import DEFAULT_METRICS_SETTINGS, METRICS, start_metrics_server, write_textfile
 
 class ArbitrageOpportunityManager:
     """
@@ -27,9 +40,18 @@ class ArbitrageOpportunityManager:
         
         # File paths
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.filtered_opportunities_path = os.path.join(self.base_dir, "filtered_opportunities.json")
+        self.filtered_opportunities_path = os.path.join(self.base_dir, FILTERED_OPPORTUNITIES_FILE)
         self.arb_scraper_runner_path = os.path.join(self.base_dir, "arb_scraper_runner.py")
         
+        # Tracks which generation of filtered_opportunities.jsonl was last processed
+        self.filtered_watcher = GenerationWatcher(self.filtered_opportunities_path)
+        
+        # Opportunity history written by the scraper and tagged by f.py
+        self.store = OpportunityStore(os.path.join(self.base_dir, DEFAULT_DB_FILE))
+        
+        # Keeps every enabled book logged in on both profiles between cycles
+        self.session_keeper = SessionKeeper(self.arbitrage_system)
+        
         # Configuration
         self.max_opportunities_per_cycle = 3
         self.wait_time_minutes = 5
@@ -45,6 +67,73 @@ class ArbitrageOpportunityManager:
             ]
         )
         self.logger = logging.getLogger(__name__)
+        
+        # Prometheus-style metrics (HTTP endpoint and/or textfile)
+        self.metrics_settings = dict(DEFAULT_METRICS_SETTINGS)
+        self.metrics_settings.update(self.arbitrage_system.config.get_metrics_settings())
+        self.metrics_server = None
+        self.setup_metrics()
+        
+        # Opt-in sampling profiler for a fraction of the cycles (see profiling.py)
+        self.profiling_settings = dict(DEFAULT_PROFILING_SETTINGS)
+        self.profiling_settings.update(self.arbitrage_system.config.get_profiling_settings())
+        
+        # Live state shown by the dashboard (see dashboard.py)
+        self.dashboard_settings = dict(DEFAULT_DASHBOARD_SETTINGS)
+        self.dashboard_settings.update(self.arbitrage_system.config.get_dashboard_settings())
+        self.phase = "stopped"
+        self.phase_started = time.time()
+        self.queue_depth = 0
+        self.recent_outcomes = deque(maxlen=int(self.dashboard_settings["recent_outcomes"]))
+    
+    def set_phase(self, phase: str):
+        """Record what the manager is doing now, for the dashboard"""
+        self.phase = phase
+        self.phase_started = time.time()
+    
+    def setup_metrics(self):
+        """Register the on-demand metrics and start the /metrics endpoint if configured"""
+        METRICS.add_collector(self.collect_metrics)
+        if not self.metrics_settings.get("enabled") or not self.metrics_settings.get("port"):
+            return
+        try:
+            self.metrics_server = start_metrics_server(int(self.metrics_settings["port"]), self.metrics_settings.get("host", "127.0.0.1"))
+            self.logger.info(f"📈 Metrics at http://{self.metrics_settings.get('host', '127.0.0.1')}:{self.metrics_settings['port']}/metrics")
+        except OSError as e:
+            self.logger.warning(f"⚠️ Could not start metrics endpoint: {e}")
+    
+    def collect_metrics(self):
+        """Metrics computed at scrape time: cache hit rates and per-book success rates"""
+        llm_cache = LLM_CACHE.stats()
+        yield "arb_llm_cache_hit_ratio", {}, llm_cache["hit_rate"] / 100
+        yield "arb_llm_cache_entries", {}, llm_cache["size"]
+        
+        balance_cache = self.arbitrage_system.balance_cache
+        lookups = balance_cache.hits + balance_cache.misses
+        yield "arb_balance_cache_hit_ratio", {}, balance_cache.hits / lookups if lookups else None
+        yield "arb_balance_cache_books", {}, len(balance_cache.fresh_books())
+        
+        # Legs the odds gate aborted on purpose are not failures of the book
+        attempts = {}
+        for labels, count in METRICS.series("arb_bets_total").items():
+            labels = dict(labels)
+            if labels["result"] == "aborted":
+                continue
+            placed, total = attempts.get(labels["bookmaker"], (0, 0))
+            attempts[labels["bookmaker"]] = (placed + (count if labels["result"] == "placed" else 0), total + count)
+        for bookmaker, (placed, total) in attempts.items():
+            yield "arb_bet_success_ratio", {"bookmaker": bookmaker}, placed / total if total else None
+        
+        executed = sum(METRICS.series("arb_opportunities_executed_total").values())
+        if executed:
+            yield "arb_llm_calls_per_bet", {}, sum(METRICS.series("arb_llm_calls_total").values()) / executed
+    
+    def count_scraped_opportunities(self) -> int:
+        """Rows in the scraper's latest arb_opportunities.jsonl"""
+        try:
+            return sum(1 for _ in iter_jsonl(os.path.join(self.base_dir, ARB_OPPORTUNITIES_FILE)))
+        except Exception:
+            return 0
     
     def switch_on(self):
         """Start the opportunity manager"""
@@ -101,23 +190,38 @@ class ArbitrageOpportunityManager:
     
     def load_filtered_opportunities(self) -> List[Dict]:
         """
-        Load opportunities from filtered_opportunities.json
-        Returns list of opportunities or empty list if none found
+        Load opportunities from filtered_opportunities.jsonl
+        Returns list of opportunities or empty list if none found or if the
+        latest generation has already been processed
         """
         try:
-            if not os.path.exists(self.filtered_opportunities_path):
-                self.logger.warning(f"📂 File not found: {self.filtered_opportunities_path}")
+            manifest = self.filtered_watcher.latest()
+            if manifest is None:
+                self.logger.warning(f"📂 No published generation for: {self.filtered_opportunities_path}")
+                return []
+            
+            generation = manifest.get("generation", 0)
+            if not self.filtered_watcher.has_new_generation():
+                self.logger.info(f"📭 No new filtered generation (generation {generation} already processed)")
                 return []
             
-            with open(self.filtered_opportunities_path, 'r', encoding='utf-8') as f:
-                opportunities = json.load(f)
+            # Rows sharing a fingerprint are one row in the store: compare distinct
+            # fingerprints (older manifests only carry the row count)
+            expected_count = manifest.get("fingerprints", manifest.get("count", 0))
+            opportunities = self.store.load_filtered(generation) if expected_count else []
+            
+            if len(opportunities) != expected_count:
+                # Store not tagged yet (or out of sync): fall back to the JSONL file. f.py
+                # renames it into place before bumping the manifest, so it is complete
+                # and at least as new as the manifest
+                self.logger.info("📂 Store incomplete for this generation, reading the JSONL file")
+                opportunities = list(iter_jsonl(self.filtered_opportunities_path))
+            
+            self.filtered_watcher.mark_consumed(generation)
             
-            self.logger.info(f"📊 Loaded {len(opportunities)} filtered opportunities")
+            self.logger.info(f"📊 Loaded {len(opportunities)} filtered opportunities (generation {generation})")
             return opportunities
             
-        except json.JSONDecodeError as e:
-            self.logger.error(f"❌ JSON decode error: {e}")
-            return []
         except Exception as e:
             self.logger.error(f"❌ Error loading opportunities: {e}")
             return []
@@ -140,16 +244,47 @@ class ArbitrageOpportunityManager:
                 self.logger.warning(f"⚠️ Missing required field: {field}")
                 filtered_opportunity[field] = ""
         
+        # Stake handed out by the bankroll allocator, if any
+        if "allocated_stake_usd" in opportunity:
+            filtered_opportunity["allocated_stake_usd"] = opportunity["allocated_stake_usd"]
+        
+        # Time of the latest scrape sighting, for the scrape-age latency span
+        if "seen_at" in opportunity:
+            filtered_opportunity["seen_at"] = opportunity["seen_at"]
+        
+        # Key of the opportunity in the store and the run journal
+        filtered_opportunity["fingerprint"] = opportunity.get("fingerprint") or opportunity_fingerprint(opportunity)
+        
+        # Lifecycle timestamps from the store, and the time it was picked for execution
+        for field in ("first_seen", "filtered_at"):
+            if field in opportunity:
+                filtered_opportunity[field] = opportunity[field]
+        filtered_opportunity["picked_at"] = time.time()
+        
         return filtered_opportunity
     
     def select_opportunities(self, opportunities: List[Dict]) -> List[Dict]:
         """
         Select up to max_opportunities_per_cycle opportunities
-        If more than one opportunity exists, start with the first one
+        All opportunities are scored in one pass by the stake engine; the ones whose
+        odds no longer give an arbitrage are dropped and the rest are taken best
+        expected profit first
         """
         if not opportunities:
             return []
         
+        ranked = rank_opportunities(opportunities, self.arbitrage_system.default_max_stake_usd)
+        if len(ranked) < len(opportunities):
+            self.logger.info(f"🧮 Stake engine dropped {len(opportunities) - len(ranked)} opportunities without an arbitrage edge")
+        
+        # Spread the known bankroll across all arbs instead of sizing each one alone
+        balances = self.arbitrage_system.balance_cache.available()
+        opportunities = allocate_bankroll(ranked, balances, self.arbitrage_system.bankroll_settings)
+        if len(opportunities) < len(ranked):
+            self.logger.info(f"💼 Bankroll allocator funded {len(opportunities)} of {len(ranked)} opportunities (balances: {balances})")
+        if not opportunities:
+            return []
+        
         # If only one opportunity, take it
         if len(opportunities) == 1:
             self.logger.info("📋 Only 1 opportunity available, selecting it")
@@ -164,6 +299,68 @@ class ArbitrageOpportunityManager:
         # Filter required fields for each selected opportunity
         return [self.filter_required_fields(opp) for opp in selected]
     
+    def log_lifetime_summary(self):
+        """Log how long arbitrage opportunities stay visible, from the opportunity store"""
+        try:
+            overall = self.store.lifetime_summary()["overall"]
+            if overall["count"]:
+                self.logger.info(
+                    f"⏱️ Arb lifetimes: {overall['count']} seen, median {overall['median_seconds']}s, "
+                    f"p90 {overall['p90_seconds']}s, max {overall['max_seconds']}s"
+                )
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not compute arb lifetimes: {e}")
+    
+    def log_capture_report(self):
+        """Log the capture rate against the reaction time, from the recorded executions"""
+        try:
+            report = capture_report(self.store.executions(), self.store.filtered_count())
+            if report["attempts"]:
+                for line in format_capture_report(report).splitlines():
+                    self.logger.info(line)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not compute the capture rate: {e}")
+    
+    def log_latency_summary(self):
+        """Log the median and p90 of every execution phase timed so far"""
+        snapshot = LATENCY.snapshot()
+        if snapshot:
+            phases = sorted(snapshot.items(), key=lambda item: -(item[1]["p50"] or 0))
+            self.logger.info("⏱️ Phase latency (p50/p90): " + ", ".join(
+                f"{phase} {stats['p50']}s/{stats['p90']}s" for phase, stats in phases
+            ))
+    
+    def log_llm_cache_stats(self):
+        """Log the hit rate of the agents' LLM response cache"""
+        stats = LLM_CACHE.stats()
+        if stats["hits"] or stats["misses"]:
+            self.logger.info(
+                f"🧠 LLM cache: {stats['hit_rate']}% hit rate ({stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['size']} entries, {stats['evictions']} evicted)"
+            )
+    
+    def log_agent_usage_summary(self):
+        """Log the LLM usage and cost of the book agents per book and role so far"""
+        for bookmaker, roles in sorted(AGENT_USAGE.snapshot().items()):
+            self.logger.info(f"🧾 {bookmaker} agents: " + ", ".join(
+                f"{role} {stats['runs']} runs, {stats['avg_steps']} steps/{stats['avg_seconds']}s/${stats['avg_cost_usd']:.4f} per run"
+                for role, stats in sorted(roles.items())
+            ))
+    
+    async def refresh_sessions(self):
+        """Refresh the oldest saved bookmaker logins if any are missing or past the refresh interval"""
+        try:
+            stale = self.session_keeper.stale_sessions()
+            if not stale:
+                return
+            batch = min(len(stale), self.session_keeper.refreshes_per_run)
+            self.set_phase("refreshing logins")
+            self.logger.info(f"🍪 Refreshing {batch} of {len(stale)} stale bookmaker login(s)...")
+            refreshed = await self.session_keeper.refresh_stale(keep_running=lambda: self.is_running)
+            self.logger.info(f"🍪 {refreshed}/{batch} bookmaker logins refreshed")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Login refresh failed: {e}")
+    
     async def process_opportunity(self, opportunity: Dict, index: int) -> bool:
         """
         Process a single opportunity using got.py
@@ -178,6 +375,15 @@ class ArbitrageOpportunityManager:
             
             # Execute the arbitrage using got.py
             result = await self.arbitrage_system.execute_arbitrage(opportunity)
+            self.record_execution_metrics(opportunity, result)
+            self.record_lifecycle(result)
+            
+            if result.get("timings"):
+                self.logger.info(f"   Timings: {result['timings']}")
+            if result.get("llm_usage"):
+                self.logger.info(f"   LLM usage: {result['llm_usage']['total']}")
+            if result.get("fingerprint"):
+                self.logger.info(f"   Journal: python journal.py --fingerprint {result['fingerprint']}")
             
             if result.get('success', False):
                 self.logger.info(f"✅ Opportunity {index + 1} processed successfully!")
@@ -194,6 +400,41 @@ class ArbitrageOpportunityManager:
             self.logger.error(f"❌ Unexpected error processing opportunity {index + 1}: {e}")
             return False
     
+    def record_execution_metrics(self, opportunity: Dict, result: Dict):
+        """Count the executed opportunity and the outcome of each leg that was attempted"""
+        METRICS.inc("arb_opportunities_executed_total", result="success" if result.get("success") else "failed")
+        for key in ("bookmaker1", "bookmaker2"):
+            leg = (result.get("bet_results") or {}).get(key) or {}
+            summary = (leg.get("result") or {}).get("workflow_summary")
+            if summary is None:
+                continue
+            if summary.get("bet_placed"):
+                outcome = "placed"
+            elif summary.get("aborted_by_odds_gate") or summary.get("skipped"):
+                outcome = "aborted"
+            else:
+                outcome = "failed"
+            METRICS.inc("arb_bets_total", bookmaker=str(opportunity.get(key, "")).lower(), result=outcome)
+    
+    def record_lifecycle(self, result: Dict):
+        """Store the lifecycle timestamps and outcome of an execution"""
+        if not result.get("lifecycle"):
+            return
+        self.recent_outcomes.append(result["lifecycle"])
+        try:
+            self.store.record_execution(result["lifecycle"])
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not record the opportunity lifecycle: {e}")
+    
+    def write_metrics_textfile(self):
+        """Write the metrics for node_exporter's textfile collector, if configured"""
+        path = self.metrics_settings.get("textfile")
+        if self.metrics_settings.get("enabled") and path:
+            try:
+                write_textfile(path)
+            except Exception as e:
+                self.logger.warning(f"⚠️ Could not write metrics textfile: {e}")
+    
     async def process_opportunities_batch(self, opportunities: List[Dict]) -> Dict:
         """
         Process a batch of opportunities
@@ -206,6 +447,7 @@ class ArbitrageOpportunityManager:
         }
         
         for i, opportunity in enumerate(opportunities):
+            self.queue_depth = len(opportunities) - i - 1
             success = await self.process_opportunity(opportunity, i)
             
             if success:
@@ -237,35 +479,56 @@ class ArbitrageOpportunityManager:
             return False
         
         self.logger.info("🔄 Starting new cycle...")
+        METRICS.inc("arb_cycles_total")
+        cycle_started = time.time()
         
-        # Step 1: Run arb_scraper_runner
-        scraper_success = self.run_arb_scraper_runner()
-        if not scraper_success:
-            self.logger.warning("⚠️ Scraper run failed, but continuing to check for existing opportunities...")
-        
-        # Step 2: Load opportunities
-        opportunities = self.load_filtered_opportunities()
-        
-        # Step 3: Check if opportunities exist
-        if not opportunities:
-            self.logger.info("📭 No opportunities found")
-            return False
-        
-        # Step 4: Select and process opportunities
-        selected_opportunities = self.select_opportunities(opportunities)
-        
-        if not selected_opportunities:
-            self.logger.warning("⚠️ No valid opportunities selected")
-            return False
-        
-        # Step 5: Process the selected opportunities
-        self.logger.info(f"🎯 Processing {len(selected_opportunities)} opportunities...")
-        results = await self.process_opportunities_batch(selected_opportunities)
-        
-        # Log results
-        self.logger.info(f"📈 Cycle completed: {results['successful']} successful, {results['failed']} failed")
-        
-        return True  # Return True because we found and processed opportunities
+        try:
+            # Step 1: Run arb_scraper_runner
+            self.set_phase("scraping")
+            scraper_success = self.run_arb_scraper_runner()
+            if not scraper_success:
+                self.logger.warning("⚠️ Scraper run failed, but continuing to check for existing opportunities...")
+            else:
+                METRICS.inc("arb_opportunities_scraped_total", self.count_scraped_opportunities())
+            
+            # Step 2: Load opportunities
+            self.set_phase("loading opportunities")
+            opportunities = self.load_filtered_opportunities()
+            METRICS.inc("arb_opportunities_filtered_total", len(opportunities))
+            
+            # Step 3: Check if opportunities exist
+            if not opportunities:
+                self.logger.info("📭 No opportunities found")
+                return False
+            
+            # Step 4: Select and process opportunities
+            self.set_phase("selecting")
+            selected_opportunities = self.select_opportunities(opportunities)
+            METRICS.inc("arb_opportunities_selected_total", len(selected_opportunities))
+            
+            if not selected_opportunities:
+                self.logger.warning("⚠️ No valid opportunities selected")
+                return False
+            
+            # Step 5: Process the selected opportunities
+            self.logger.info(f"🎯 Processing {len(selected_opportunities)} opportunities...")
+            self.set_phase("executing")
+            results = await self.process_opportunities_batch(selected_opportunities)
+            
+            # Log results
+            self.logger.info(f"📈 Cycle completed: {results['successful']} successful, {results['failed']} failed")
+            self.log_lifetime_summary()
+            self.log_capture_report()
+            self.log_latency_summary()
+            self.log_llm_cache_stats()
+            self.log_agent_usage_summary()
+            
+            return True  # Return True because we found and processed opportunities
+        finally:
+            METRICS.set("arb_cycle_duration_seconds", round(time.time() - cycle_started, 3))
+            self.write_metrics_textfile()
+            self.queue_depth = 0
+            self.set_phase("cycle done")
     
     async def main_loop(self):
         """
@@ -277,12 +540,19 @@ class ArbitrageOpportunityManager:
             try:
                 cycle_start_time = datetime.now()
                 
-                # Run one cycle
-                opportunities_found = await self.run_cycle()
+                # Run one cycle (profiled if it falls in the sample fraction)
+                with profile_cycle("cycle", self.profiling_settings):
+                    opportunities_found = await self.run_cycle()
+                
+                # Refresh expiring logins between cycles, busy or not, so executing an
+                # arb never has to log in (a few per run, see SessionKeeper.refresh_stale)
+                if self.is_running:
+                    await self.refresh_sessions()
                 
                 if not opportunities_found:
                     # No opportunities found, wait 5 minutes before retrying
                     self.logger.info(f"⏳ No opportunities found. Waiting {self.wait_time_minutes} minutes before next run...")
+                    self.set_phase("waiting")
                     
                     # Wait in chunks so we can check is_running status
                     for _ in range(self.wait_time_seconds):
@@ -305,6 +575,8 @@ class ArbitrageOpportunityManager:
                 # Wait a bit before retrying
                 await asyncio.sleep(60)
         
+        JOURNAL.flush()
+        self.set_phase("stopped")
         self.logger.info("🔴 Arbitrage Opportunity Manager stopped")
 
 
@@ -362,8 +634,13 @@ class OpportunityManagerControl:
         status = "RUNNING" if self.manager.is_switched_on() else "STOPPED"
         thread_status = "ACTIVE" if self.loop_thread and self.loop_thread.is_alive() else "INACTIVE"
         print(f"Status: {status} (Thread: {thread_status})")
+        print(f"Phase: {self.manager.phase} for {time.time() - self.manager.phase_started:.0f}s, {self.manager.queue_depth} queued")
         return status
     
+    def dashboard(self):
+        """Show the live dashboard until Ctrl+C"""
+        run_dashboard(self.manager, self.manager.dashboard_settings)
+    
     async def run_single_cycle(self):
         """Run a single cycle for testing"""
         if self.manager.is_switched_on():
@@ -401,7 +678,7 @@ def run_command_interface():
     Run the command interface for manual control
     """
     print("Arbitrage Opportunity Manager")
-    print("Commands: 'on' to start, 'off' to stop, 'status' to check, 'single' for single cycle, 'quit' to exit")
+    print("Commands: 'on' to start, 'off' to stop, 'status' to check, 'dashboard' for the live view, 'single' for single cycle, 'quit' to exit")
     
     control = OpportunityManagerControl()
     
@@ -415,6 +692,8 @@ def run_command_interface():
                 control.switch_off()
             elif command == 'status':
                 control.status()
+            elif command == 'dashboard':
+                control.dashboard()
             elif command == 'single':
                 # Run single cycle in a new event loop
                 asyncio.run(control.run_single_cycle())
@@ -422,7 +701,7 @@ def run_command_interface():
                 control.switch_off()
                 break
             else:
-                print("Unknown command. Use: on, off, status, single, quit")
+                print("Unknown command. Use: on, off, status, dashboard, single, quit")
     except KeyboardInterrupt:
         print("\nShutting down...")
         control.switch_off()
@@ -0,0 +1,197 @@
+"""
+Prometheus-style metrics for the opportunity manager.
+
+Counters and gauges are kept in process (METRICS) and rendered in the
+Prometheus text exposition format, together with the per-phase latency
+histograms of latency.py. mainrunner.py serves them on a local HTTP port
+(/metrics) and/or writes them to a textfile for node_exporter's textfile
+collector, depending on the "metrics" section of config.json.
+
+Modules update the metrics they own directly (browser_sessions.py the live
+session gauge, llm_cache.py the LLM call and token counters); values that are
+cheaper to read on demand (cache hit rates) come from collectors registered
+with add_collector().
+"""
+
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from latency import LATENCY
+
+
+DEFAULT_METRICS_SETTINGS = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 9108,
+    "textfile": "",
+}
+
+# name -> (type, help)
+METRIC_DESCRIPTIONS = {
+    "arb_cycles_total": ("counter", "Cycles run by the opportunity manager"),
+    "arb_cycle_duration_seconds": ("gauge", "Duration of the last cycle"),
+    "arb_opportunities_scraped_total": ("counter", "Opportunities scraped from breaking-bet"),
+    "arb_opportunities_filtered_total": ("counter", "Opportunities that passed the filter"),
+    "arb_opportunities_selected_total": ("counter", "Opportunities selected for execution"),
+    "arb_opportunities_executed_total": ("counter", "Executed opportunities by result"),
+    "arb_bets_total": ("counter", "Bet legs by bookmaker and result"),
+    "arb_bet_success_ratio": ("gauge", "Share of attempted legs that were placed, per bookmaker (odds gate aborts excluded)"),
+    "arb_browser_sessions_alive": ("gauge", "Browser sessions currently open by the executor"),
+    "arb_llm_calls_total": ("counter", "LLM calls made by the book agents"),
+    "arb_llm_tokens_total": ("counter", "LLM tokens used by the book agents, by direction"),
+    "arb_llm_calls_per_bet": ("gauge", "LLM calls per executed opportunity"),
+    "arb_llm_cache_hit_ratio": ("gauge", "Hit ratio of the LLM response cache"),
+    "arb_llm_cache_entries": ("gauge", "Entries in the LLM response cache"),
+    "arb_balance_cache_hit_ratio": ("gauge", "Share of balance lookups answered by a fresh cached balance"),
+    "arb_balance_cache_books": ("gauge", "Books with a fresh cached balance"),
+    "arb_agent_runs_total": ("counter", "Browser agent runs by bookmaker and role"),
+    "arb_agent_steps_total": ("counter", "Browser agent steps by bookmaker and role"),
+    "arb_agent_seconds_total": ("counter", "Browser agent wall time by bookmaker and role"),
+    "arb_agent_tokens_total": ("counter", "LLM tokens of the browser agents by bookmaker, role and direction"),
+    "arb_agent_cost_usd_total": ("counter", "Estimated LLM cost of the browser agents (USD) by bookmaker and role"),
+    "arb_phase_latency_seconds": ("histogram", "Execution phase latency"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metrics:
+    """Thread-safe counters and gauges with labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[LabelKey, float]] = {}
+        self._collectors: List[Collector] = []
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = float(value)
+
+    def get(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def series(self, name: str) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values.get(name, {}))
+
+    def add_collector(self, collector: Collector):
+        """Register a callable returning (name, labels, value) samples computed at render time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    if value is not None:
+                        values.setdefault(name, {})[tuple(sorted(labels.items()))] = float(value)
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+
+        lines = []
+        for name in sorted(values):
+            kind, help_text = METRIC_DESCRIPTIONS.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(values[name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        lines.extend(self._render_latency())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_latency() -> List[str]:
+        name = "arb_phase_latency_seconds"
+        snapshot = LATENCY.snapshot()
+        if not snapshot:
+            return []
+
+        kind, help_text = METRIC_DESCRIPTIONS[name]
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for phase in sorted(snapshot):
+            histogram = snapshot[phase]
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f'{name}_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {histogram["count"]}')
+        return lines
+
+
+METRICS = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = METRICS.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep scrapes out of the console
+        pass
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+def write_textfile(path: str):
+    """Write the metrics atomically for node_exporter's textfile collector"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".metrics.", suffix=".tmp", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(METRICS.render())
+    os.replace(temp_path, path)
+
+
+if __name__ == "__main__":
+    METRICS.inc("arb_cycles_total")
+    METRICS.inc("arb_bets_total", bookmaker="bet9ja", result="placed")
+    METRICS.set("arb_browser_sessions_alive", 2)
+    LATENCY.observe("balance_check", 1.3)
+    print(METRICS.render())
@@ -0,0 +1,157 @@
+"""
+Exact money amounts for balances and stakes.
+
+Balances come back from the balance agents as free text ("₦1,234.50",
+"1 234,50 ₽", "$ 12.3", 1234.5). parse_money() turns them into a Money
+(Decimal amount + ISO currency) without guessing the locale from a single
+character. The last "." or "," is the decimal point, unless it is repeated
+("1.234.567") or is the only one, follows a 1-3 digit integer part other than 0
+and is followed by exactly 3 digits ("1,234"); every other separator is
+grouping. A space or apostrophe only groups when exactly 3 digits follow it, so
+neighbouring numbers ("500.00 Bonus 20.00") are never joined. Regexes are
+compiled once and parsed strings are memoized, since the same balance text is
+parsed on every cycle.
+"""
+
+import re
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal, InvalidOperation
+from functools import lru_cache
+from typing import NamedTuple, Optional, Union
+
+
+CENT = Decimal("0.01")
+
+CURRENCY_SYMBOLS = {
+    "₦": "NGN",
+    "₽": "RUB",
+    "руб": "RUB",
+    "€": "EUR",
+    "£": "GBP",
+    "₺": "TRY",
+    "₹": "INR",
+    "$": "USD",
+}
+
+# Grouped thousands ("1 234,50", "1.234.567,89") or a plain number ("1234.5", "0,500")
+_NUMBER_RE = re.compile(r"-?\d{1,3}(?:[\s'.,]\d{3})+(?:[.,]\d{1,2})?(?!\d)|-?\d+(?:[.,]\d+)?")
+# \s also covers the no-break and narrow no-break spaces used as thousands separators
+_GROUPING_RE = re.compile(r"[\s']")
+_ISO_CODE_RE = re.compile(r"\b([A-Z]{3})\b")
+
+
+class Money(NamedTuple):
+    """Decimal amount in a currency"""
+    amount: Decimal
+    currency: str
+
+    def quantize(self, exponent: Decimal = CENT, rounding: str = ROUND_HALF_UP) -> "Money":
+        return Money(self.amount.quantize(exponent, rounding=rounding), self.currency)
+
+    def floor(self, exponent: Decimal = CENT) -> "Money":
+        """Round down, for stakes that must never exceed a balance"""
+        return self.quantize(exponent, ROUND_DOWN)
+
+    def __float__(self) -> float:
+        return float(self.amount)
+
+    def __str__(self) -> str:
+        return f"{self.amount} {self.currency}"
+
+
+def to_decimal(value: Union[str, int, float, Decimal]) -> Decimal:
+    """Decimal from a number without binary float noise (2.1 -> Decimal('2.1'))"""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def _normalize_number(token: str) -> str:
+    """Turn a localized number token into a plain "1234.50" string"""
+    token = _GROUPING_RE.sub("", token).rstrip(".,")
+    last_dot = token.rfind(".")
+    last_comma = token.rfind(",")
+    decimal_at = max(last_dot, last_comma)
+
+    if decimal_at == -1:
+        return token
+
+    separator = token[decimal_at]
+    fraction = token[decimal_at + 1:]
+    other = "," if separator == "." else "."
+
+    # "1,234" / "1.234.567": a repeated separator, or a lone one followed by 3 digits
+    # after a 1-3 digit integer part, is grouping ("0.500" and "1234,567" are decimals)
+    if other not in token:
+        integer_part = token[:decimal_at].lstrip("-")
+        if token.count(separator) > 1 or (len(fraction) == 3 and integer_part[:1] not in ("", "0") and len(integer_part) <= 3):
+            return token.replace(separator, "")
+
+    integer = token[:decimal_at].replace(".", "").replace(",", "")
+    return f"{integer}.{fraction}"
+
+
+def detect_currency(text: str) -> Optional[str]:
+    """ISO currency code from a symbol or code in the text"""
+    code = _ISO_CODE_RE.search(text)
+    if code:
+        return code.group(1)
+    for symbol, currency in CURRENCY_SYMBOLS.items():
+        if symbol in text:
+            return currency
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _parse_text(text: str) -> Optional[Decimal]:
+    match = _NUMBER_RE.search(text)
+    if not match:
+        return None
+    try:
+        return Decimal(_normalize_number(match.group()))
+    except InvalidOperation:
+        return None
+
+
+def parse_money(value, currency: Optional[str] = None) -> Money:
+    """
+    Parse a balance or stake into Money.
+
+    Parameters:
+        value: Free text such as "₦1,234.50" or "1 234,50 ₽", or a number.
+        currency (str): Currency to use when the text does not show one (defaults to USD).
+
+    Returns:
+        Money: The parsed amount (0 if nothing numeric was found).
+    """
+    if isinstance(value, Money):
+        return value
+
+    fallback_currency = (currency or "USD").upper()
+    if value is None or value == "":
+        return Money(Decimal(0), fallback_currency)
+
+    if isinstance(value, (int, float, Decimal)):
+        return Money(to_decimal(value), fallback_currency)
+
+    text = str(value).strip()
+    amount = _parse_text(text)
+    return Money(amount if amount is not None else Decimal(0), (currency or detect_currency(text) or "USD").upper())
+
+
+if __name__ == "__main__":
+    samples = [
+        ("₦1,234.50", "1234.50"), ("1 234,50 ₽", "1234.50"), ("$ 12.3", "12.3"), ("1.234.567,89 EUR", "1234567.89"),
+        ("1,234", "1234"), ("12,5", "12.5"), (1234.5, "1234.5"), ("N/A", "0"),
+        # A zero integer part is never followed by a thousands separator
+        ("0.500", "0.500"), ("0,500", "0.500"),
+        # Neighbouring numbers are separate amounts
+        ("1 234,50 ₽ 12 bets", "1234.50"), ("Balance 500.00 Bonus 20.00", "500.00"),
+    ]
+    for sample, expected in samples:
+        money = parse_money(sample)
+        assert money.amount == Decimal(expected), f"{sample!r} parsed as {money.amount}, expected {expected}"
+        print(f"💱 {sample!r:>22} -> {money}")
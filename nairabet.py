@@ -1,13 +1,18 @@
-from langchain_openai import ChatOpenAI  
+from llm_cache import chat_model
 from browser_use import Agent, BrowserSession, Controller, ActionResult
 from dotenv import load_dotenv  
 import asyncio
 import os
-import json
-from pathlib import Path
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
+from odds_gate import odds_check_ready, odds_gate_abort_result, read_betslip_odds
+from browser_sessions import browser_session_options, save_storage_state, session_storage_state
+from dom_balance import read_balance_from_dom
+from latency import span, timed
+from agent_usage import run_agent
+from agent_trace import evaluate_js, traced_action
+from journal import JOURNAL, new_run_id
 
 load_dotenv()   
 
@@ -42,6 +47,7 @@ controller5 = Controller(output_model=Placer)
 # ==================== NAIRABET CONTROLLER ACTIONS ====================
 
 @controller4.action('Login with NairaBet credentials')
+@traced_action
 async def login_with_nairabet_credentials(browser, username: str, password: str) -> ActionResult:
     """Login to NairaBet with provided credentials"""
     page = await browser.get_current_page()
@@ -186,92 +192,97 @@ async def login_with_nairabet_credentials(browser, username: str, password: str)
         }}
     """
     
-    result = await page.evaluate(script)
+    result = await evaluate_js(page, script)
     
     return ActionResult(extracted_content=f"NairaBet Login result: {result}")
 
 @controller4.action('Ask human for help with issues')   
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
-@controller4.action('Get NairaBet balance')
-async def get_nairabet_balance(browser) -> ActionResult:
-    """Get current balance from NairaBet account"""
-    page = await browser.get_current_page()
-    
-    result = await page.evaluate("""
-        async () => {
-            try {
-                // First check if Account button is present (indicates logged in)
-                const accountButtons = document.querySelectorAll('button .header-button__label');
-                let accountButton = null;
-                for (let btn of accountButtons) {
-                    if (btn.textContent.includes('Account')) {
-                        accountButton = btn;
-                        break;
-                    }
+NAIRABET_BALANCE_JS = """
+    async () => {
+        try {
+            // First check if Account button is present (indicates logged in)
+            const accountButtons = document.querySelectorAll('button .header-button__label');
+            let accountButton = null;
+            for (let btn of accountButtons) {
+                if (btn.textContent.includes('Account')) {
+                    accountButton = btn;
+                    break;
                 }
-                
-                if (!accountButton) {
-                    return {
-                        success: false,
-                        is_logged_in: false,
-                        error: 'Account button not found - user might not be logged in'
-                    };
-                }
-                
-                // Click Account button to open balance menu
-                accountButton.closest('button').click();
-                await new Promise(resolve => setTimeout(resolve, 2000));
-                
-                // Look for balance elements in the user menu
-                const totalBalanceElement = document.querySelector('.money-details__value') ||
-                                          document.querySelector('[class*="balance"]');
-                
-                if (!totalBalanceElement) {
-                    return {
-                        success: false,
-                        is_logged_in: true,
-                        error: 'Balance element not found in account menu'
-                    };
-                }
-                
-                const balanceText = totalBalanceElement.textContent.trim();
-                
-                // Check if balance contains Nigerian Naira
-                if (!balanceText.includes('NGN')) {
-                    return {
-                        success: false,
-                        is_logged_in: true,
-                        error: 'Balance does not contain NGN currency'
-                    };
-                }
-                
+            }
+            
+            if (!accountButton) {
                 return {
-                    success: true,
+                    success: false,
+                    is_logged_in: false,
+                    error: 'Account button not found - user might not be logged in'
+                };
+            }
+            
+            // Click Account button to open balance menu
+            accountButton.closest('button').click();
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            
+            // Look for balance elements in the user menu
+            const totalBalanceElement = document.querySelector('.money-details__value') ||
+                                      document.querySelector('[class*="balance"]');
+            
+            if (!totalBalanceElement) {
+                return {
+                    success: false,
                     is_logged_in: true,
-                    balance: balanceText,
-                    message: 'Balance retrieved successfully'
+                    error: 'Balance element not found in account menu'
                 };
-                
-            } catch (error) {
+            }
+            
+            const balanceText = totalBalanceElement.textContent.trim();
+            
+            // Check if balance contains Nigerian Naira
+            if (!balanceText.includes('NGN')) {
                 return {
                     success: false,
-                    error: error.message
+                    is_logged_in: true,
+                    error: 'Balance does not contain NGN currency'
                 };
             }
+            
+            return {
+                success: true,
+                is_logged_in: true,
+                balance: balanceText,
+                message: 'Balance retrieved successfully'
+            };
+            
+        } catch (error) {
+            return {
+                success: false,
+                error: error.message
+            };
         }
-    """)
+    }
+"""
+
+@controller4.action('Get NairaBet balance')
+@traced_action
+async def get_nairabet_balance(browser) -> ActionResult:
+    """Get current balance from NairaBet account"""
+    page = await browser.get_current_page()
+    
+    result = await evaluate_js(page, NAIRABET_BALANCE_JS)
     
     return ActionResult(extracted_content=f"NairaBet Balance result: {result}")
 
 @controller3.action('Count NairaBet betslip games')
+@traced_action
 async def count_nairabet_betslip_games(browser) -> ActionResult:
     """Count number of games in NairaBet betslip"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         () => {
             try {
                 // Look for betslip content
@@ -320,6 +331,8 @@ async def count_nairabet_betslip_games(browser) -> ActionResult:
     return ActionResult(extracted_content=f"NairaBet Betslip count: {result}")
 
 @controller5.action('Fill NairaBet stake amount')
+@traced_action
+@timed("stake_fill")
 async def fill_nairabet_stake_amount(browser, stake: float = 100) -> ActionResult:
     """Fill stake amount in NairaBet betslip"""
     page = await browser.get_current_page()
@@ -375,16 +388,18 @@ async def fill_nairabet_stake_amount(browser, stake: float = 100) -> ActionResul
         }}
     """
     
-    result = await page.evaluate(script)
+    result = await evaluate_js(page, script)
     
     return ActionResult(extracted_content=f"NairaBet Stake fill result: {result}")
 
 @controller5.action('Click NairaBet place bet button')
+@traced_action
+@timed("place_click")
 async def click_nairabet_place_bet(browser) -> ActionResult:
     """Click the Place Bet button in NairaBet"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             try {
                 // Look for place bet button
@@ -460,31 +475,40 @@ async def click_nairabet_place_bet(browser) -> ActionResult:
 
 # ==================== MAIN AUTOMATION FUNCTIONS ====================
 
-async def nairabet_balance_checker(executable_path, user_data_dir, username, password):
+async def nairabet_balance_checker(executable_path, user_data_dir, username, password, browser_session=None):
     """Check NairaBet balance"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"nairabet_balance_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting NairaBet balance check...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("nairabet"),
+                keep_alive=True,
+                storage_state=session_storage_state("nairabet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
-        await browser_session.start()
-        print("✅ Browser session created successfully")
-        
-        # Agent 4: Balance Checker
-        agent4 = Agent(
-            task=f"""You are a NairaBet balance checker. Follow these exact steps:
+        # Read the balance straight from the page; the agent only runs if that fails
+        balance = None
+        dom_balance = await read_balance_from_dom(browser_session, "NairaBet", "https://www.nairabet.com", NAIRABET_BALANCE_JS)
+        if dom_balance:
+            balance = Balance(is_logged_in=True, balance=dom_balance)
+            await save_storage_state(browser_session, "nairabet", user_data_dir)
+            print("✅ NairaBet balance check completed!")
+        else:
+            # Agent 4: Balance Checker (fallback)
+            agent4 = Agent(
+                task=f"""You are a NairaBet balance checker. Follow these exact steps:
 
 STEP 1: Navigate to NairaBet
 - Navigate to https://www.nairabet.com
@@ -519,24 +543,25 @@ Expected output format:
 - balance: actual amount with currency (e.g., "69449.60 ")
 - currency: "NGN"
 - error_message: any issues encountered""",
-            llm=ChatOpenAI(model="gpt-4o"),
-            browser_session=browser_session,
-            sensitive_data={
-                "username": username,
-                "password": password
-            },
-            controller=controller4,
-        )
+                llm=chat_model("gpt-4o", cached=True),
+                browser_session=browser_session,
+                sensitive_data={
+                    "username": username,
+                    "password": password
+                },
+                controller=controller4,
+            )
         
-        history4 = await agent4.run()
-        result4 = history4.final_result()
-        balance = None
+            history4 = await run_agent(agent4, "nairabet", "balance")
+            result4 = history4.final_result()
         
-        if result4:
-            balance = Balance.model_validate_json(result4)
-            print("✅ NairaBet balance check completed!")
-        else:
-            print("❌ NairaBet balance check failed")
+            if result4:
+                balance = Balance.model_validate_json(result4)
+                if balance.is_logged_in:
+                    await save_storage_state(browser_session, "nairabet", user_data_dir)
+                print("✅ NairaBet balance check completed!")
+            else:
+                print("❌ NairaBet balance check failed")
         
         # Save results
         combined_results = {
@@ -545,9 +570,8 @@ Expected output format:
             "balance": balance.model_dump() if balance else None
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("balance", "nairabet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return balance
         
@@ -556,32 +580,34 @@ Expected output format:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
-async def nairabet_bet_placer(input_data: dict, executable_path: str, user_data_dir: str):
+async def nairabet_bet_placer(input_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None):
     """Place bet on NairaBet"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"nairabet_bet_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting NairaBet bet placement...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("nairabet"),
+                keep_alive=True,
+                storage_state=session_storage_state("nairabet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
         # Agent 2: Bet Placement
         agent2 = Agent(
@@ -605,12 +631,13 @@ Your output should include:
 - The input data you processed
 - Success/failure status
 - Any errors encountered""",
-            llm=ChatOpenAI(model="gpt-4o"),
+            llm=chat_model("gpt-4o"),
             browser_session=browser_session,
             controller=controller
         )
         
-        history2 = await agent2.run()
+        with span("navigation_selection"):
+            history2 = await run_agent(agent2, "nairabet", "select")
         result2 = history2.final_result()
         bet_result = None
         
@@ -633,12 +660,13 @@ Your task:
 5. Describe what you see in the betslip
 
 Previous bet placement result: {bet_result.input_data if bet_result else 'No result'}""",
-            llm=ChatOpenAI(model="gpt-4o"),
+            llm=chat_model("gpt-4o", cached=True),
             browser_session=browser_session,
             controller=controller3,
         )
         
-        history3 = await agent3.run()
+        with span("betslip_verification"):
+            history3 = await run_agent(agent3, "nairabet", "verify")
         result3 = history3.final_result()
         site_analysis = None
         
@@ -650,6 +678,17 @@ Previous bet placement result: {bet_result.input_data if bet_result else 'No res
 
         # Agent 5: Bet Placer
         stake_amount = input_data.get('stake_amount', 100)
+        
+        # Re-verify the live betslip odds right before committing the stake
+        if odds_check is not None:
+            await odds_check_ready(odds_check)
+            with span("odds_gate_read"):
+                live_odd = await read_betslip_odds(browser_session, "nairabet")
+            stake_amount = await odds_check(live_odd)
+            if stake_amount is None:
+                print("🛑 Odds gate aborted NairaBet bet placement")
+                return odds_gate_abort_result("NairaBet", input_data, live_odd)
+        
         agent5 = Agent(
             task=f"""You are the final bet placer for NairaBet. Your stake amount is {stake_amount}.
 
@@ -663,12 +702,13 @@ STEPS:
 Expected final result:
 - is_place_bet: true/false
 - error_message: any issues encountered""",
-            llm=ChatOpenAI(model="gpt-4o"),
+            llm=chat_model("gpt-4o"),
             browser_session=browser_session,
             controller=controller5,
         )
         
-        history5 = await agent5.run()
+        with span("stake_fill_click"):
+            history5 = await run_agent(agent5, "nairabet", "place")
         result5 = history5.final_result()
         placer_result = None
         
@@ -693,9 +733,8 @@ Expected final result:
             }
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("bet", "nairabet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return combined_results
         
@@ -704,8 +743,9 @@ Expected final result:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
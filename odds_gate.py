@@ -0,0 +1,114 @@
+"""
+Live betslip odds reader used as a pre-commit check before the stake is submitted.
+
+Each book module first awaits odds_check_ready(), which waits for whatever the
+odds_check callback it was given by got.py has to wait for (the stake
+calculation and, for the second leg, the first leg). Only then does it call
+read_betslip_odds() and hand the result to odds_check, which recomputes the
+arbitrage and returns the stake to place (or None to abort). The odd is thus
+read right before the stake is committed. The selectors mirror the ones used by
+the count_*_betslip_games controller actions.
+
+Only books with a known odds element are read; for the others read_betslip_odds()
+returns None and the computed stake is kept. A live odd that is not a valid
+decimal price, or that moved further from the scraped odd than the "odds_gate"
+max_odd_move_fraction of config.json, is treated as a misread the same way
+(see plausible_live_odd()).
+"""
+
+from typing import Optional
+
+
+DEFAULT_ODDS_GATE_SETTINGS = {
+    # A live odd further than this share of the scraped odd away from it is taken as a misread
+    "max_odd_move_fraction": 0.25,
+}
+
+# bookmaker -> (betslip item selector, odds element inside the item).
+# Books whose betslip odds element is not known are left out on purpose: scanning
+# the whole item text picks up handicaps, totals and stakes as odds.
+BETSLIP_ODDS_SELECTORS = {
+    "leon": ('[class*="slip-list-item__main"]', '[class*="slip-list-item__odd"]'),
+    "bet9ja": (".betslip__match", ".betslip__match-odds .txt-primary"),
+}
+
+READ_BETSLIP_ODDS_JS = """
+    (selectors) => {
+        const { itemSelector, oddSelector } = selectors;
+        const items = Array.from(document.querySelectorAll(itemSelector));
+        const odds = items.map(item => {
+            const oddElement = item.querySelector(oddSelector);
+            if (!oddElement) return null;
+            // Decimal odds such as 1.85 or 2,10
+            const match = oddElement.textContent.match(/\\d{1,3}[.,]\\d{2,3}/);
+            return match ? match[0].replace(',', '.') : null;
+        });
+        return { item_count: items.length, odds };
+    }
+"""
+
+
+async def odds_check_ready(odds_check):
+    """Wait until the odds_check callback can decide at once (its optional ready() coroutine)"""
+    ready = getattr(odds_check, "ready", None)
+    if ready is not None:
+        await ready()
+
+
+async def read_betslip_odds(browser_session, bookmaker: str) -> Optional[float]:
+    """
+    Read the live decimal odds of the single selection in the betslip.
+
+    Returns:
+        Optional[float]: The odds, or None if the book has no known odds selector or
+        the betslip does not hold exactly one readable selection (callers then fall
+        back to the computed stake).
+    """
+    selectors = BETSLIP_ODDS_SELECTORS.get(bookmaker)
+    if not selectors:
+        return None
+
+    try:
+        page = await browser_session.get_current_page()
+        result = await page.evaluate(READ_BETSLIP_ODDS_JS, {"itemSelector": selectors[0], "oddSelector": selectors[1]})
+    except Exception as e:
+        print(f"⚠️ Could not read {bookmaker} betslip odds: {e}")
+        return None
+
+    odds = [odd for odd in result.get("odds", []) if odd]
+    if result.get("item_count") != 1 or len(odds) != 1:
+        print(f"⚠️ {bookmaker} betslip odds unreadable: {result}")
+        return None
+
+    try:
+        return float(odds[0])
+    except ValueError:
+        return None
+
+
+def plausible_live_odd(live_odd: Optional[float], scraped_odd: float, max_move_fraction: float) -> bool:
+    """
+    Whether a live betslip odd can be trusted: a decimal price above 1.0 that moved
+    at most max_move_fraction of the scraped odd. Anything else is far more likely
+    a misread of the betslip than a real move.
+    """
+    if live_odd is None or live_odd <= 1.0:
+        return False
+    return abs(live_odd - scraped_odd) <= scraped_odd * max_move_fraction
+
+
+def odds_gate_abort_result(bookmaker: str, input_data: dict, live_odd: Optional[float]) -> dict:
+    """Bet placer result for a leg the odds gate refused to place"""
+    return {
+        "platform": bookmaker,
+        "input_data": input_data,
+        "bet_placement_result": None,
+        "betslip_verification_result": None,
+        "bet_placer_result": None,
+        "workflow_summary": {
+            "bet_placed": False,
+            "aborted_by_odds_gate": True,
+            "live_odd": live_odd,
+            "error": f"Odds gate aborted: live odd {live_odd} no longer gives an arbitrage",
+        },
+    }
@@ -0,0 +1,233 @@
+"""
+JSONL handoff files between arb_scraper.py, f.py and mainrunner.py.
+
+Rows are appended to a temp file next to the target as they are produced and the
+temp file is renamed over the target on commit, so readers only ever see a
+complete file from the previous or the current run.
+
+Published files also get a small manifest (<name>.manifest.json) carrying a
+generation number, so consumers can tell whether there is anything new with a
+single stat() instead of re-parsing the data file.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+ARB_OPPORTUNITIES_FILE = "arb_opportunities.jsonl"
+FILTERED_OPPORTUNITIES_FILE = "filtered_opportunities.jsonl"
+
+
+class AtomicJsonlWriter:
+    """
+    Append-only JSONL writer that publishes its file atomically.
+
+    Use as a context manager: the file is committed on a clean exit and the temp
+    file is discarded if an exception escapes.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        directory, name = os.path.split(self.path)
+        fd, self.temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+        self.file = os.fdopen(fd, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, row: Dict[str, Any]):
+        """Append a single row"""
+        self.file.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+        self.file.write("\n")
+        self.count += 1
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]):
+        """Append several rows"""
+        for row in rows:
+            self.write(row)
+
+    def commit(self):
+        """Flush, fsync and rename the temp file over the target"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+        _fsync_directory(os.path.dirname(self.path))
+
+    def abort(self):
+        """Discard everything written so far; the previous file stays in place"""
+        self.file.close()
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
+
+
+def _fsync_directory(directory: str):
+    """Persist a rename on POSIX; directories cannot be opened this way on Windows"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_jsonl(path: str, rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Atomically replace path with the given rows.
+
+    Returns:
+        int: Number of rows written.
+    """
+    with AtomicJsonlWriter(path) as writer:
+        writer.write_many(rows)
+    return writer.count
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield rows from a JSONL file one at a time.
+
+    Files from before the JSONL switch (a single JSON array) are still accepted.
+    Raises FileNotFoundError if the file does not exist.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+
+        if head == "[":
+            f.seek(0)
+            for row in json.load(f):
+                if isinstance(row, dict):
+                    yield row
+            return
+
+        f.seek(0)
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed line {line_number} in {path}: {e}")
+                continue
+            if isinstance(row, dict):
+                yield row
+
+
+def iter_jsonl_batches(path: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield rows from a JSONL file in lists of at most batch_size rows"""
+    batch = []
+    for row in iter_jsonl(path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def manifest_path(path: str) -> str:
+    """Path of the manifest that accompanies a published JSONL file"""
+    return os.path.splitext(os.path.abspath(path))[0] + ".manifest.json"
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Read the manifest of a published JSONL file, or None if it has never been published"""
+    try:
+        with open(manifest_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def publish_manifest(path: str, count: int, fingerprints: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Bump the generation of a JSONL file that has just been committed.
+
+    The data file is renamed into place before the manifest, so a reader that sees
+    generation N always reads data from generation N or newer. `fingerprints` is the
+    number of distinct opportunity fingerprints among the rows (rows sharing one
+    are a single row in the opportunity store).
+
+    Returns:
+        Dict[str, Any]: The new manifest.
+    """
+    previous = read_manifest(path) or {}
+    manifest = {
+        "generation": int(previous.get("generation", 0)) + 1,
+        "count": count,
+        "file": os.path.basename(path),
+        "published_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    if fingerprints is not None:
+        manifest["fingerprints"] = fingerprints
+
+    target = manifest_path(path)
+    directory, name = os.path.split(target)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, target)
+    _fsync_directory(directory)
+    return manifest
+
+
+def publish_jsonl(path: str, rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Atomically replace path with rows and publish a new generation"""
+    return publish_manifest(path, write_jsonl(path, rows))
+
+
+class GenerationWatcher:
+    """
+    Cheap "is there a newer generation?" check for a published JSONL file.
+
+    The manifest is only re-read when its stat() signature changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest_path = manifest_path(path)
+        self.consumed_generation = 0
+        self._stat_signature = None
+        self._manifest = None
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Return the current manifest, re-reading it only if the file changed"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature != self._stat_signature:
+            self._manifest = read_manifest(self.path)
+            self._stat_signature = signature
+        return self._manifest
+
+    def has_new_generation(self) -> bool:
+        manifest = self.latest()
+        return bool(manifest) and manifest.get("generation", 0) > self.consumed_generation
+
+    def mark_consumed(self, generation: int):
+        self.consumed_generation = max(self.consumed_generation, generation)
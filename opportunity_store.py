@@ -0,0 +1,295 @@
+"""
+SQLite-backed history of every scraped arbitrage opportunity.
+
+arb_scraper.py ingests each extracted row, f.py tags the rows that passed the
+filter with the generation it published, and mainrunner.py queries the store
+instead of re-reading JSON. Each opportunity is keyed by a fingerprint so repeat
+sightings update last_seen and append to the odds history, which is what arb
+lifetimes are measured from. mainrunner.py also records the lifecycle of every
+executed opportunity in the executions table (see lifecycle.py).
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from filter_rules import parse_profit
+
+
+DEFAULT_DB_FILE = "opportunities.db"
+
+# Fields that identify the same arb across scrapes (odds and profit move, these do not)
+FINGERPRINT_FIELDS = (
+    "bookmaker1", "bookmaker2", "team1_bk1", "team2_bk1", "team1_bk2", "team2_bk2",
+    "bet_type_bk1", "bet_type_bk2", "odd_specific", "event_time", "matchup",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS opportunities (
+    fingerprint TEXT PRIMARY KEY,
+    bookmaker_pair TEXT NOT NULL,
+    sport TEXT,
+    event_time TEXT,
+    matchup TEXT,
+    bet_type_bk1 TEXT,
+    bet_type_bk2 TEXT,
+    profit REAL,
+    odd_bk1 REAL,
+    odd_bk2 REAL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    seen_count INTEGER NOT NULL DEFAULT 1,
+    filtered_generation INTEGER,
+    filtered_at REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_opportunities_pair_time ON opportunities (bookmaker_pair, event_time);
+CREATE INDEX IF NOT EXISTS idx_opportunities_profit ON opportunities (profit);
+CREATE INDEX IF NOT EXISTS idx_opportunities_generation ON opportunities (filtered_generation);
+
+CREATE TABLE IF NOT EXISTS odds_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    odd_bk1 REAL,
+    odd_bk2 REAL,
+    profit REAL
+);
+CREATE INDEX IF NOT EXISTS idx_odds_history_fingerprint ON odds_history (fingerprint, seen_at);
+
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    bookmaker_pair TEXT,
+    first_seen REAL,
+    last_seen REAL,
+    filtered REAL,
+    picked REAL,
+    started REAL,
+    balance_done REAL,
+    leg1_placed REAL,
+    leg2_placed REAL,
+    finished REAL,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_executions_fingerprint ON executions (fingerprint);
+CREATE INDEX IF NOT EXISTS idx_executions_finished ON executions (finished);
+"""
+
+# Columns added after the first release, for stores created before them
+MIGRATIONS = (
+    ("opportunities", "filtered_at", "REAL"),
+)
+
+
+def opportunity_fingerprint(row: Dict[str, Any]) -> str:
+    """Stable identifier for an opportunity across scrapes"""
+    key = "|".join(str(row.get(field) or "").strip().lower() for field in FINGERPRINT_FIELDS)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+
+def bookmaker_pair(row: Dict[str, Any]) -> str:
+    """Order-independent bookmaker pair, e.g. "bet9ja|leon" """
+    names = sorted(str(row.get(field) or "").strip().lower() for field in ("bookmaker1", "bookmaker2"))
+    return "|".join(names)
+
+
+def _to_float(value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return parse_profit(value)
+    return None
+
+
+class OpportunityStore:
+    """Embedded opportunity store (SQLite in WAL mode so readers never block the scraper)"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_FILE):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        for table, column, column_type in MIGRATIONS:
+            columns = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                with self.conn:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    def close(self):
+        self.conn.close()
+
+    def ingest(self, rows: Iterable[Dict[str, Any]], seen_at: Optional[float] = None) -> int:
+        """
+        Upsert scraped rows and append their odds to the history.
+
+        Parameters:
+            rows (Iterable[Dict[str, Any]]): Scraped rows; extraction error rows are skipped.
+            seen_at (float): Epoch seconds of the sighting (defaults to now).
+
+        Returns:
+            int: Number of rows ingested.
+        """
+        seen_at = seen_at or time.time()
+        records = []
+        history = []
+        for row in rows:
+            if not row.get("bookmaker1") or not row.get("bookmaker2"):
+                continue
+            fingerprint = opportunity_fingerprint(row)
+            profit = _to_float(row.get("profit"))
+            odd1 = _to_float(row.get("odd_bk1"))
+            odd2 = _to_float(row.get("odd_bk2"))
+            records.append((
+                fingerprint, bookmaker_pair(row), row.get("sport"), row.get("event_time"), row.get("matchup"),
+                row.get("bet_type_bk1"), row.get("bet_type_bk2"), profit, odd1, odd2,
+                seen_at, seen_at, json.dumps(row, ensure_ascii=False),
+            ))
+            history.append((fingerprint, seen_at, odd1, odd2, profit))
+
+        if not records:
+            return 0
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO opportunities (
+                    fingerprint, bookmaker_pair, sport, event_time, matchup, bet_type_bk1, bet_type_bk2,
+                    profit, odd_bk1, odd_bk2, first_seen, last_seen, payload
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    profit = excluded.profit,
+                    odd_bk1 = excluded.odd_bk1,
+                    odd_bk2 = excluded.odd_bk2,
+                    last_seen = excluded.last_seen,
+                    seen_count = seen_count + 1,
+                    payload = excluded.payload
+            """, records)
+            self.conn.executemany(
+                "INSERT INTO odds_history (fingerprint, seen_at, odd_bk1, odd_bk2, profit) VALUES (?, ?, ?, ?, ?)",
+                history,
+            )
+        return len(records)
+
+    def mark_filtered(self, fingerprints: Iterable[str], generation: int) -> int:
+        """Tag the opportunities that passed f.py with the generation it published (and when)"""
+        filtered_at = time.time()
+        params = [(generation, filtered_at, fingerprint) for fingerprint in fingerprints]
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE opportunities SET filtered_generation = ?, filtered_at = COALESCE(filtered_at, ?) WHERE fingerprint = ?",
+                params,
+            )
+        return len(params)
+
+    def load_filtered(self, generation: int) -> List[Dict[str, Any]]:
+        """
+        Opportunities of a filtered generation, most profitable first. Each one gets
+        "seen_at", the epoch seconds of its latest sighting (used for scrape age), and
+        the "first_seen" and "filtered_at" timestamps of its lifecycle (lifecycle.py).
+        """
+        cursor = self.conn.execute(
+            "SELECT fingerprint, payload, first_seen, last_seen, filtered_at FROM opportunities "
+            "WHERE filtered_generation = ? ORDER BY profit DESC",
+            (generation,),
+        )
+        opportunities = []
+        for row in cursor:
+            opportunity = json.loads(row["payload"])
+            opportunity["fingerprint"] = row["fingerprint"]
+            opportunity["seen_at"] = row["last_seen"]
+            opportunity["first_seen"] = row["first_seen"]
+            opportunity["filtered_at"] = row["filtered_at"]
+            opportunities.append(opportunity)
+        return opportunities
+
+    def odds_history(self, fingerprint: str) -> List[Dict[str, Any]]:
+        """Every recorded sighting of one opportunity, oldest first"""
+        cursor = self.conn.execute(
+            "SELECT seen_at, odd_bk1, odd_bk2, profit FROM odds_history WHERE fingerprint = ? ORDER BY seen_at",
+            (fingerprint,),
+        )
+        return [dict(row) for row in cursor]
+
+    def lifetime_summary(self, since: Optional[float] = None) -> Dict[str, Any]:
+        """
+        How long arbs stay visible (last_seen - first_seen), overall and per bookmaker pair.
+        Opportunities seen only once have a lifetime of 0 (shorter than one scrape interval).
+        """
+        since = since or 0
+        cursor = self.conn.execute(
+            "SELECT bookmaker_pair, last_seen - first_seen AS lifetime FROM opportunities "
+            "WHERE first_seen >= ? ORDER BY lifetime",
+            (since,),
+        )
+        lifetimes = []
+        per_pair = {}
+        for row in cursor:
+            lifetimes.append(row["lifetime"])
+            per_pair.setdefault(row["bookmaker_pair"], []).append(row["lifetime"])
+
+        def summarize(values):
+            if not values:
+                return {"count": 0}
+            return {
+                "count": len(values),
+                "median_seconds": round(values[len(values) // 2], 1),
+                "p90_seconds": round(values[min(len(values) - 1, int(len(values) * 0.9))], 1),
+                "max_seconds": round(values[-1], 1),
+            }
+
+        return {
+            "overall": summarize(lifetimes),
+            "by_bookmaker_pair": {pair: summarize(values) for pair, values in per_pair.items()},
+        }
+
+    def record_execution(self, lifecycle: Dict[str, Any]):
+        """
+        Store the lifecycle of an executed opportunity (OpportunityLifecycle.as_dict()).
+        Sighting and filter timestamps the opportunity did not carry (JSONL fallback)
+        are taken from the opportunities table.
+        """
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO executions (
+                    fingerprint, bookmaker_pair, first_seen, last_seen, filtered, picked, started,
+                    balance_done, leg1_placed, leg2_placed, finished, outcome
+                ) VALUES (
+                    :fingerprint, :bookmaker_pair,
+                    COALESCE(:first_seen, (SELECT first_seen FROM opportunities WHERE fingerprint = :fingerprint)),
+                    COALESCE(:last_seen, (SELECT last_seen FROM opportunities WHERE fingerprint = :fingerprint)),
+                    COALESCE(:filtered, (SELECT filtered_at FROM opportunities WHERE fingerprint = :fingerprint)),
+                    :picked, :started, :balance_done, :leg1_placed, :leg2_placed, :finished, :outcome
+                )
+            """, {**lifecycle, "outcome": lifecycle.get("outcome") or "failed"})
+
+    def executions(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Stored execution lifecycles, oldest first"""
+        cursor = self.conn.execute(
+            "SELECT * FROM executions WHERE COALESCE(finished, started, 0) >= ? ORDER BY id",
+            (since or 0,),
+        )
+        return [dict(row) for row in cursor]
+
+    def filtered_count(self, since: Optional[float] = None) -> int:
+        """Opportunities that passed the filter (since a time)"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM opportunities WHERE filtered_at IS NOT NULL AND filtered_at >= ?",
+            (since or 0,),
+        ).fetchone()
+        return row[0]
+
+
+if __name__ == "__main__":
+    store = OpportunityStore()
+    summary = store.lifetime_summary()
+    print("⏱️ Arbitrage opportunity lifetimes")
+    print(json.dumps(summary, indent=2))
+    print("🎯 Run `python lifecycle.py` for capture rate vs reaction time")
+    store.close()
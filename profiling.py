@@ -0,0 +1,351 @@
+"""
+Opt-in sampling profiler for opportunity manager cycles and scraper runs.
+
+When a cycle is slow, the latency spans (latency.py) say which phase took the time
+but not where inside it. With profiling on, a fraction of the cycles of
+mainrunner.py and of the arb_scraper.py runs are profiled:
+
+- a daemon thread samples the Python stack of every thread every interval_ms
+  (sys._current_frames, no tracing hook, so the profiled code runs at full speed)
+- every Playwright call is timed at the client (Channel._inner_send), labelled
+  with its object type and method, e.g. "Frame.evaluate" or "Page.goto". CDP
+  commands sent through a CDPSession are labelled with the CDP method, e.g.
+  "CDP Runtime.evaluate".
+
+Each profiled cycle writes to the "profiles" directory:
+
+    <label>-<timestamp>.folded      collapsed stacks (flamegraph.pl, speedscope)
+    <label>-<timestamp>.svg         flamegraph, open it in a browser
+    <label>-<timestamp>.calls.json  Playwright/CDP call count, total and max seconds
+
+With "cprofile": true a deterministic cProfile of the thread running the cycle is
+also written (<label>-<timestamp>.prof, for pstats/snakeviz). It costs much more
+than sampling, so use it only while debugging.
+
+Settings ("profiling" section of config.json):
+    enabled          master switch
+    sample_fraction  share of cycles/runs that are profiled (1.0 = every one)
+    interval_ms      stack sampling interval
+    directory        where the artifacts go
+    keep_profiles    newest profiled cycles kept on disk
+    cprofile         also write a cProfile
+"""
+
+import cProfile
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_PROFILING_SETTINGS = {
+    "enabled": False,
+    "sample_fraction": 0.05,
+    "interval_ms": 5,
+    "directory": "profiles",
+    "keep_profiles": 50,
+    "cprofile": False,
+}
+
+ARTIFACT_SUFFIXES = (".folded", ".svg", ".calls.json", ".prof")
+
+# Profilers currently running; the Playwright hook records into each of them
+_active: List["CycleProfiler"] = []
+_active_lock = threading.Lock()
+_playwright_hooked = False
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class CycleProfiler:
+    """Stack sampler plus Playwright call timings for one cycle"""
+
+    def __init__(self, label: str, interval_ms: float = 5, use_cprofile: bool = False):
+        self.label = label
+        self.interval = max(0.001, float(interval_ms) / 1000)
+        self.use_cprofile = use_cprofile
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.calls: Dict[str, Dict[str, float]] = {}
+        self.started = 0.0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._calls_lock = threading.Lock()
+
+    def start(self):
+        install_playwright_timing()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name=f"profiler-{self.label}", daemon=True)
+        self._thread.start()
+        with _active_lock:
+            _active.append(self)
+        if self.use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        with _active_lock:
+            if self in _active:
+                _active.remove(self)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def record_call(self, name: str, seconds: float):
+        with self._calls_lock:
+            stats = self.calls.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def top_calls(self, limit: int = 10) -> List[tuple]:
+        """Playwright/CDP calls with the most total time"""
+        with self._calls_lock:
+            return sorted(self.calls.items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:limit]
+
+    def top_frames(self, limit: int = 10) -> List[tuple]:
+        """Innermost frames with the most samples (self time)"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def write(self, directory: str) -> Dict[str, str]:
+        """
+        Write the artifacts of this cycle.
+
+        Parameters:
+            directory (str): Output directory (created if missing).
+
+        Returns:
+            Dict[str, str]: Artifact kind -> path.
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.label}-{datetime.now():%Y%m%d-%H%M%S-%f}")
+        paths = {"folded": base + ".folded", "svg": base + ".svg", "calls": base + ".calls.json"}
+
+        with open(paths["folded"], "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        with open(paths["svg"], "w", encoding="utf-8") as f:
+            f.write(render_flamegraph(self.stacks, f"{self.label}: {self.seconds:.1f}s, {self.samples} samples"))
+
+        with open(paths["calls"], "w", encoding="utf-8") as f:
+            json.dump({
+                "label": self.label,
+                "seconds": round(self.seconds, 3),
+                "samples": self.samples,
+                "interval_ms": self.interval * 1000,
+                "calls": {
+                    name: {**stats, "total_seconds": round(stats["total_seconds"], 4), "max_seconds": round(stats["max_seconds"], 4)}
+                    for name, stats in self.top_calls(limit=len(self.calls))
+                },
+            }, f, indent=2)
+
+        if self._cprofile is not None:
+            paths["prof"] = base + ".prof"
+            self._cprofile.dump_stats(paths["prof"])
+        return paths
+
+
+def install_playwright_timing():
+    """Time every Playwright client call (once per process; a no-op without Playwright)"""
+    global _playwright_hooked
+    if _playwright_hooked:
+        return
+    try:
+        from playwright._impl._connection import Channel
+    except ImportError:
+        return
+
+    original = Channel._inner_send
+
+    async def timed_inner_send(self, method, *args, **kwargs):
+        if not _active:
+            return await original(self, method, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await original(self, method, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            object_type = getattr(self._object, "_type", "") or type(self._object).__name__
+            name = f"{object_type}.{method}"
+            if object_type == "CDPSession":
+                params = next((arg for arg in args if isinstance(arg, dict)), kwargs.get("params")) or {}
+                name = f"CDP {params.get('method', method)}"
+            for profiler in list(_active):
+                profiler.record_call(name, elapsed)
+
+    Channel._inner_send = timed_inner_send
+    _playwright_hooked = True
+
+
+def should_profile(settings: Dict[str, Any]) -> bool:
+    """Whether to profile this cycle: profiling enabled and the cycle falls in sample_fraction"""
+    if not settings.get("enabled"):
+        return False
+    return random.random() < float(settings.get("sample_fraction", 0))
+
+
+def prune_profiles(directory: str, keep: int):
+    """Keep the artifacts of the newest `keep` profiled cycles"""
+    if not os.path.isdir(directory):
+        return
+    # Oldest first by the "-YYYYmmdd-HHMMSS-ffffff" timestamp, whatever the label
+    bases = sorted({
+        name[:-len(suffix)] for name in os.listdir(directory)
+        for suffix in ARTIFACT_SUFFIXES if name.endswith(suffix)
+    }, key=lambda base: base.rsplit("-", 3)[1:])
+    for base in bases[:max(0, len(bases) - keep)]:
+        for suffix in ARTIFACT_SUFFIXES:
+            path = os.path.join(directory, base + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+@contextmanager
+def profile_cycle(label: str, settings: Optional[Dict[str, Any]] = None, force: bool = False):
+    """
+    Profile the enclosed block if this cycle is sampled.
+
+    Parameters:
+        label (str): Artifact name prefix, e.g. "cycle" or "scraper".
+        settings (Dict[str, Any]): The "profiling" section of config.json.
+        force (bool): Profile regardless of enabled/sample_fraction.
+
+    Yields:
+        CycleProfiler or None when the cycle is not profiled.
+    """
+    settings = {**DEFAULT_PROFILING_SETTINGS, **(settings or {})}
+    if not force and not should_profile(settings):
+        yield None
+        return
+
+    profiler = CycleProfiler(label, settings["interval_ms"], settings["cprofile"])
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            paths = profiler.write(settings["directory"])
+            prune_profiles(settings["directory"], int(settings["keep_profiles"]))
+            print(f"🔬 Profiled {label}: {profiler.seconds:.1f}s, {profiler.samples} samples → {paths['svg']}")
+            for name, stats in profiler.top_calls(5):
+                print(f"   {name}: {stats['count']} calls, {stats['total_seconds']:.2f}s total, {stats['max_seconds']:.2f}s max")
+        except Exception as e:
+            print(f"⚠️ Could not write profile: {e}")
+
+
+# ==================== FLAMEGRAPH ====================
+
+FLAMEGRAPH_WIDTH = 1200
+FLAMEGRAPH_ROW_HEIGHT = 16
+# Frames narrower than this (pixels) are left out
+FLAMEGRAPH_MIN_WIDTH = 0.5
+
+
+def _build_tree(stacks: Dict[str, int]) -> Dict[str, Any]:
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"name": frame, "value": 0, "children": {}})
+            node["value"] += count
+    return root
+
+
+def _color(name: str) -> str:
+    # Warm palette, stable per frame name
+    seed = sum(ord(ch) for ch in name)
+    return f"rgb({205 + seed % 50},{80 + seed * 7 % 120},{40 + seed * 13 % 50})"
+
+
+def render_flamegraph(stacks: Dict[str, int], title: str = "") -> str:
+    """Self-contained SVG flamegraph (root on top) of collapsed stacks"""
+    root = _build_tree(stacks)
+    total = root["value"] or 1
+    scale = FLAMEGRAPH_WIDTH / total
+    rects = []
+    depth_max = 0
+
+    def layout(node, x, depth):
+        nonlocal depth_max
+        width = node["value"] * scale
+        if width < FLAMEGRAPH_MIN_WIDTH:
+            return
+        depth_max = max(depth_max, depth)
+        y = 24 + depth * FLAMEGRAPH_ROW_HEIGHT
+        share = node["value"] / total * 100
+        label = html.escape(node["name"])
+        text = label if width > 40 else ""
+        if text and len(node["name"]) * 6.5 > width:
+            text = html.escape(node["name"][:max(0, int(width / 6.5) - 2)]) + ".."
+        rects.append(
+            f'<g><title>{label} ({node["value"]} samples, {share:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{FLAMEGRAPH_ROW_HEIGHT - 1}" '
+            f'fill="{_color(node["name"])}" rx="2"/>'
+            f'<text x="{x + 3:.1f}" y="{y + 11}">{text}</text></g>'
+        )
+        child_x = x
+        for child in sorted(node["children"].values(), key=lambda child: child["name"]):
+            layout(child, child_x, depth + 1)
+            child_x += child["value"] * scale
+
+    layout(root, 0.0, 0)
+    height = 24 + (depth_max + 1) * FLAMEGRAPH_ROW_HEIGHT + 8
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{FLAMEGRAPH_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="16" font-size="13">{html.escape(title)}</text>'
+        + "".join(rects)
+        + "</svg>\n"
+    )
+
+
+if __name__ == "__main__":
+    def busy(n):
+        return sum(i * i for i in range(n))
+
+    def parse():
+        for _ in range(30):
+            busy(20000)
+
+    with profile_cycle("demo", {"directory": "profiles"}, force=True) as profiler:
+        parse()
+        time.sleep(0.1)
+    for frame, count in profiler.top_frames(5):
+        print(f"   {count:5d}  {frame}")
@@ -0,0 +1,89 @@
+"""
+Background login refresh for every enabled bookmaker on every Chrome profile.
+
+A bookmaker can end up on either leg of an arb, so each enabled book is kept
+logged in on both profiles. After every cycle, whatever it found, mainrunner.py
+asks the keeper to refresh the saved login states that are missing or older than
+the refresh interval, oldest first. Each run refreshes a few states at most and
+stops early when the manager is switched off, so the next cycle is never held
+up for long; the rest are picked up after the following cycles. The refresh runs the book's own balance checker, which logs in if
+needed and exports the new state (see browser_sessions.save_storage_state).
+The balance it reads is fed to the bankroll allocator's cache as a side effect.
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+from browser_sessions import storage_state_age
+
+
+DEFAULT_SESSION_REFRESH_MINUTES = 60
+
+# Login states refreshed at most between two cycles (each one opens a browser)
+DEFAULT_SESSION_REFRESHES_PER_RUN = 2
+
+
+class SessionKeeper:
+    """Keeps the saved login state of every enabled book fresh, off the hot path"""
+
+    def __init__(self, betting_system, refresh_minutes: float = DEFAULT_SESSION_REFRESH_MINUTES,
+                 refreshes_per_run: int = DEFAULT_SESSION_REFRESHES_PER_RUN):
+        self.betting_system = betting_system
+        self.refresh_seconds = refresh_minutes * 60
+        self.refreshes_per_run = refreshes_per_run
+
+    def stale_sessions(self) -> List[Tuple[str, str, dict]]:
+        """(bookmaker, profile name, profile) for every login state that needs a refresh, oldest first"""
+        stale = []
+        enabled = self.betting_system.config.get_enabled_bookmakers()
+        for bookmaker in enabled:
+            if bookmaker not in self.betting_system.balance_tools:
+                continue
+            for profile_name, profile in self.betting_system.chrome_profiles.items():
+                age = storage_state_age(bookmaker, profile.get("user_data_dir", ""))
+                if age > self.refresh_seconds:
+                    stale.append((age, bookmaker, profile_name, profile))
+        stale.sort(key=lambda entry: entry[0], reverse=True)
+        return [entry[1:] for entry in stale]
+
+    async def refresh(self, bookmaker: str, profile_name: str, profile: dict) -> bool:
+        """Log in (if needed) and save the state of one bookmaker on one profile"""
+        print(f"🍪 Refreshing {bookmaker} login on {profile_name}...")
+        try:
+            balance_result = await self.betting_system.balance_tools[bookmaker](
+                profile.get("executable_path", ""), profile.get("user_data_dir", ""), "", ""
+            )
+        except Exception as e:
+            print(f"⚠️ {bookmaker} login refresh failed: {e}")
+            return False
+
+        if not (balance_result or {}).get("is_logged_in"):
+            print(f"⚠️ {bookmaker} is not logged in on {profile_name}: {(balance_result or {}).get('error_message', '')}")
+            return False
+
+        try:
+            balance = self.betting_system.extract_balance_money(balance_result)
+            balance_usd = self.betting_system.betting_bot.convert_money(balance, "USD")
+            self.betting_system.balance_cache.update(bookmaker, float(balance_usd.amount), float(balance.amount), balance.currency)
+        except Exception as e:
+            print(f"⚠️ Could not cache {bookmaker} balance: {e}")
+        return True
+
+    async def refresh_stale(self, keep_running: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Refresh the oldest stale login states, one at a time (a Chrome profile can
+        only be opened by one browser at once), at most refreshes_per_run of them.
+
+        Parameters:
+            keep_running (Callable[[], bool]): Checked before each state; the run
+                stops as soon as it returns False.
+
+        Returns:
+            int: Number of states refreshed successfully.
+        """
+        refreshed = 0
+        for bookmaker, profile_name, profile in self.stale_sessions()[:self.refreshes_per_run]:
+            if keep_running is not None and not keep_running():
+                break
+            if await self.refresh(bookmaker, profile_name, profile):
+                refreshed += 1
+        return refreshed
@@ -1,13 +1,18 @@
-from langchain_openai import ChatOpenAI  
+from llm_cache import chat_model
 from browser_use import Agent, BrowserSession, Controller, ActionResult
 from dotenv import load_dotenv  
 import asyncio
-import os
-import json
-from pathlib import Path
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
+from odds_gate import odds_check_ready, odds_gate_abort_result, read_betslip_odds
+from browser_sessions import browser_session_options, save_storage_state, session_storage_state
+from dom_balance import read_balance_from_dom
+from latency import span, timed
+from agent_usage import run_agent
+from agent_trace import evaluate_js, traced_action
+from journal import JOURNAL, new_run_id
+from money import parse_money
 
 load_dotenv()   
 
@@ -43,22 +48,26 @@ controller5 = Controller(output_model=placer)
 
 
 @controller4.action('Ask human for help with issues')
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
 
 @controller.action('Ask human for help with issues')
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
 @controller5.action('Fill stake amount')
+@traced_action
+@timed("stake_fill")
 async def fill_stake_amount(browser, stake: float = 10) -> ActionResult:
     """Just fill the stake amount without placing bet"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (stakeAmount) => {
             const stakeInput = document.querySelector('input[placeholder="min. 10"]');
             
@@ -77,11 +86,12 @@ async def fill_stake_amount(browser, stake: float = 10) -> ActionResult:
     return ActionResult(extracted_content=result)
 
 @controller5.action('Accept changes if needed')
+@traced_action
 async def accept_changes(browser) -> ActionResult:
     """Click Accept Changes button if it's active"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             const acceptButton = document.querySelector('button:has(span[data-cms-key="accept_changes"])');
             
@@ -103,11 +113,13 @@ async def accept_changes(browser) -> ActionResult:
     return ActionResult(extracted_content=result)
 
 @controller5.action('Click place bet button')
+@traced_action
+@timed("place_click")
 async def click_place_bet(browser) -> ActionResult:
     """Click the Place Bet button"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             const placeBetButton = document.querySelector('button:has(span[data-cms-key="place_bet"])');
             
@@ -127,11 +139,12 @@ async def click_place_bet(browser) -> ActionResult:
     return ActionResult(extracted_content=result)
 
 @controller4.action('Show balance if hidden')
+@traced_action
 async def show_balance(browser) -> ActionResult:
     """Toggle balance visibility using the toggle button"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             try {
                 const toggleButton = document.querySelector('#j_toggleBalance');
@@ -171,11 +184,12 @@ async def show_balance(browser) -> ActionResult:
     return ActionResult(extracted_content=f"Toggle result: {result}")
 
 @controller4.action('Login with credentials')
+@traced_action
 async def login_with_credentials(browser, phone: str = "9049914379", password: str = "$Theo3474") -> ActionResult:
     """Login to SportyBet with provided credentials"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (phone, password) => {
             try {
                 // Check if login form exists
@@ -276,12 +290,13 @@ async def login_with_credentials(browser, phone: str = "9049914379", password: s
 
 # Add betslip counter function to controller3
 @controller3.action('Check how many games are in the betslip')
+@traced_action
 async def count_betslip_games(browser) -> ActionResult:
     """Count number of games in betslip"""
     
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         () => {
             const betItems = document.querySelectorAll('.m-betslips .m-item');
             return `${betItems.length} games in betslip`;
@@ -291,14 +306,57 @@ async def count_betslip_games(browser) -> ActionResult:
     return ActionResult(extracted_content=result)
 
     
-async def balance_checker(executable_path, user_data_dir, email, password):
+SPORTY_BALANCE_JS = """
+    async () => {
+        try {
+            const balanceElement = document.querySelector('#j_balance');
+            
+            if (!balanceElement) {
+                return {
+                    success: false,
+                    is_logged_in: false,
+                    error: 'Balance element not found - user might not be logged in'
+                };
+            }
+            
+            // The balance is masked until the toggle is switched on (same button as show_balance)
+            const toggleButton = document.querySelector('#j_toggleBalance');
+            if (toggleButton && !toggleButton.classList.contains('on')) {
+                toggleButton.click();
+                await new Promise(resolve => setTimeout(resolve, 500));
+            }
+            
+            const balanceText = balanceElement.textContent.trim();
+            
+            if (!/\\d/.test(balanceText)) {
+                return {
+                    success: false,
+                    is_logged_in: true,
+                    error: 'Balance is hidden'
+                };
+            }
+            
+            return {
+                success: true,
+                is_logged_in: true,
+                balance: balanceText
+            };
+            
+        } catch (error) {
+            return {
+                success: false,
+                error: error.message
+            };
+        }
+    }
+"""
+
+async def balance_checker(executable_path, user_data_dir, email, password, browser_session=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"latest.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting browser automation test...")
-    print(f"💾 Conversation will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     # Sample betting input for testing
     sample_input = {
@@ -316,20 +374,31 @@ async def balance_checker(executable_path, user_data_dir, email, password):
     
     try:
         # ✅ Configure BrowserSession with your Windows Chrome
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("sportybet"),
+                keep_alive=True,
+                storage_state=session_storage_state("sportybet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
-        #agent4: Balance Checker
-        agent4 = Agent(
-            task=f"""You are a SportyBet balance checker. Follow these exact steps:
+        # Read the balance straight from the page; the agent only runs if that fails
+        balance = None
+        dom_balance = await read_balance_from_dom(browser_session, "SportyBet", "https://sportybet.com", SPORTY_BALANCE_JS)
+        if dom_balance:
+            balance = Balance(is_logged_in=True, balance=float(parse_money(dom_balance).amount))
+            await save_storage_state(browser_session, "sportybet", user_data_dir)
+            print("✅ SportyBet balance check completed!")
+        else:
+            #agent4: Balance Checker (fallback)
+            agent4 = Agent(
+                task=f"""You are a SportyBet balance checker. Follow these exact steps:
 
 STEP 1: Navigate to SportyBet
 - Navigate to https://sportybet.com
@@ -373,20 +442,21 @@ Expected output format:
 - balance: actual amount (e.g., " 3,029.51")
 - Currency: Currency (e.g NGN)
 - error_message: any issues encountered""",
-            llm=ChatOpenAI(model="gpt-4o"),
-            browser_session=browser_session,
+                llm=chat_model("gpt-4o", cached=True),
+                browser_session=browser_session,
            
-            controller=controller4,  # This controller has the balance checking functions
-        )
-        history4 = await agent4.run()
-        result4 = history4.final_result()
-        balance = None
+                controller=controller4,  # This controller has the balance checking functions
+            )
+            history4 = await run_agent(agent4, "sportybet", "balance")
+            result4 = history4.final_result()
         
-        if result4:
-            balance = Balance.model_validate_json(result4)
-            print("✅ Sportbet balance check completed!")
-        else:
-            print("❌ sportybet balance check failed")
+            if result4:
+                balance = Balance.model_validate_json(result4)
+                if balance.is_logged_in:
+                    await save_storage_state(browser_session, "sportybet", user_data_dir)
+                print("✅ Sportbet balance check completed!")
+            else:
+                print("❌ sportybet balance check failed")
         
         # Save results
         combined_results = {
@@ -395,9 +465,8 @@ Expected output format:
             "balance": balance.model_dump() if balance else None
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("balance", "sportybet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return balance
         
@@ -406,19 +475,18 @@ Expected output format:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
     
-async def bet_placer(input_data: dict, executable_path, user_data_dir):
+async def bet_placer(input_data: dict, executable_path, user_data_dir, odds_check=None, browser_session=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"latest.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting browser automation test...")
-    print(f"💾 Conversation will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     # Sample betting input for testing
     sample_input = {
@@ -436,16 +504,19 @@ async def bet_placer(input_data: dict, executable_path, user_data_dir):
     
     try:
         # ✅ Configure BrowserSession with your Windows Chrome
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state='/tmp/cookies.json',
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("sportybet"),
+                keep_alive=True,
+                storage_state=session_storage_state("sportybet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
             #agent4: Balance Checker
         
 
@@ -476,12 +547,13 @@ do not search for the event by name or league
 Your output format should include:
 - The input data you processed
 - Any errors encountered if any""",
-            llm=ChatOpenAI(model="gpt-4o"),
+            llm=chat_model("gpt-4o"),
             browser_session=browser_session,
             controller=controller
         )
         
-        history2 = await agent2.run()
+        with span("navigation_selection"):
+            history2 = await run_agent(agent2, "sportybet", "select")
         result2 = history2.final_result()
         bet_result = None
         
@@ -515,12 +587,13 @@ Your task is to:
 
 
 Describe what you see on the current page and confirm the betslip status.""",
-            llm=ChatOpenAI(model="gpt-4o"),
+            llm=chat_model("gpt-4o", cached=True),
             browser_session=browser_session,
             controller=controller3,  # This controller has the betslip counter function
         )
         
-        history3 = await agent3.run()
+        with span("betslip_verification"):
+            history3 = await run_agent(agent3, "sportybet", "verify")
         result3 = history3.final_result()
         site_analysis = None
         
@@ -535,21 +608,33 @@ Describe what you see on the current page and confirm the betslip status.""",
         else:
             print("❌ Agent 3 failed")
 
+        stake_amount = input_data.get('stake_amount', 100)
+        
+        # Re-verify the live betslip odds right before committing the stake
+        if odds_check is not None:
+            await odds_check_ready(odds_check)
+            with span("odds_gate_read"):
+                live_odd = await read_betslip_odds(browser_session, "sportybet")
+            stake_amount = await odds_check(live_odd)
+            if stake_amount is None:
+                print("🛑 Odds gate aborted SportyBet bet placement")
+                return odds_gate_abort_result("SportyBet", input_data, live_odd)
 
         agent5 = Agent(
             task=f"""You are the bet placer for sportybet , your task is to place bet based on the stame amount you were given
             
-            the stake amount is 100 . 
+            the stake amount is {stake_amount} . 
             step 1 : Visulally check if the betslip is empty or not
-            step 2 : If it is not empty fill the stake amount using the controller action 'Fill stake amount' with stake=100
+            step 2 : If it is not empty fill the stake amount using the controller action 'Fill stake amount' with stake={stake_amount}
             step 3 : If the stake amount is filled click the 'Place Bet' button using the controller action 'Click place bet button' or accept changes if needed using the controller action 'Accept changes if needed'
             step 4 : If the bet is placed successfully return a success message, otherwise return an error message""",
-            llm=ChatOpenAI(model="gpt-4o"),
+            llm=chat_model("gpt-4o"),
             browser_session=browser_session,
             controller=controller5,  # This controller has the betslip counter function
         )
         
-        history5 = await agent5.run()
+        with span("stake_fill_click"):
+            history5 = await run_agent(agent5, "sportybet", "place")
         result5 = history5.final_result()
         placer_result = None
         
@@ -564,10 +649,6 @@ Describe what you see on the current page and confirm the betslip status.""",
 
                 
         
-        # ✅ Wait for file system to sync
-        print("\n⏳ Waiting for conversation file to be written...")
-        await asyncio.sleep(3)
-        
         # ✅ Save combined results
         try:
             combined_results = {
@@ -581,10 +662,8 @@ Describe what you see on the current page and confirm the betslip status.""",
                 }
             }
 
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(combined_results, f, indent=2, ensure_ascii=False)
-            print(f"✅ Structured results saved to: {temp_path}")
-            print(f"📁 File size: {os.path.getsize(temp_path)} bytes")
+            JOURNAL.record("bet", "sportybet", combined_results, run_id=run_id)
+            print(f"✅ Results journaled: run {run_id}")
         except Exception as e:
             print(f"❌ Error saving results: {e}")
         
@@ -599,8 +678,9 @@ Describe what you see on the current page and confirm the betslip status.""",
     finally:
         # ✅ Cleanup (always runs)
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
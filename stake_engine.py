@@ -0,0 +1,222 @@
+"""
+Vectorized arbitrage stake engine.
+
+Works on an (M, K) matrix of decimal odds: M opportunities with up to K
+outcomes each (2 for DNB, 3 for 1X2, ...). Opportunities with fewer outcomes
+are padded with NaN, so 2-way and 3-way markets can be scored in the same pass.
+The math matches BettingBot.calculate_arbitrage_stakes and
+calculate_arbitrage_from_known_stake for the 2-way case.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from filter_rules import parse_profit
+
+
+ODDS_FIELD_PREFIX = "odd_bk"
+
+
+def _implied_probabilities(odds: np.ndarray) -> np.ndarray:
+    """1/odds, with 0 for padded (NaN) outcomes and for odds that are not > 0"""
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        implied = np.where(odds > 0, 1.0 / odds, 0.0)
+    return np.nan_to_num(implied, nan=0.0)
+
+
+def batch_arbitrage_stakes(odds, total_stake) -> Dict[str, np.ndarray]:
+    """
+    Split a total stake across the outcomes of many opportunities at once.
+
+    Parameters:
+        odds (array-like): (M, K) decimal odds; NaN marks an unused outcome.
+        total_stake (float or array-like): Total stake per opportunity, scalar or shape (M,).
+
+    Returns:
+        Dict[str, np.ndarray]:
+            stakes (M, K), payoffs (M, K) net profit if that outcome wins (NaN for
+            unused outcomes), profit_percent (M,), expected_profit (M,),
+            total_implied_prob (M,) and is_arbitrage (M,).
+    """
+    odds = np.atleast_2d(np.asarray(odds, dtype=float))
+    total_stake = np.broadcast_to(np.asarray(total_stake, dtype=float), (odds.shape[0],))
+
+    implied = _implied_probabilities(odds)
+    total_implied = implied.sum(axis=1)
+    outcome_count = (implied > 0).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = implied / total_implied[:, None]
+        profit_percent = (1.0 - total_implied) / total_implied * 100.0
+
+    weights = np.nan_to_num(weights, nan=0.0)
+    stakes = total_stake[:, None] * weights
+    payoffs = np.where(implied > 0, stakes * odds - total_stake[:, None], np.nan)
+
+    # An arb needs at least two priced outcomes whose implied probabilities sum to at most 1
+    is_arbitrage = (outcome_count >= 2) & (total_implied <= 1.0)
+    profit_percent = np.where(outcome_count >= 2, profit_percent, np.nan)
+
+    return {
+        "stakes": stakes,
+        "payoffs": payoffs,
+        "profit_percent": profit_percent,
+        "expected_profit": total_stake * profit_percent / 100.0,
+        "total_implied_prob": total_implied,
+        "is_arbitrage": is_arbitrage,
+    }
+
+
+def batch_stakes_from_known_stake(odds, known_outcome, known_stake) -> Dict[str, np.ndarray]:
+    """
+    Size the remaining outcomes when one stake per opportunity is already fixed
+    (for example the leg that has already been placed).
+
+    Parameters:
+        odds (array-like): (M, K) decimal odds; NaN marks an unused outcome.
+        known_outcome (int or array-like): Column index of the fixed stake, scalar or shape (M,).
+        known_stake (float or array-like): The fixed stake, scalar or shape (M,).
+
+    Returns:
+        Dict[str, np.ndarray]: Same keys as batch_arbitrage_stakes, for the implied total stake.
+    """
+    odds = np.atleast_2d(np.asarray(odds, dtype=float))
+    rows = np.arange(odds.shape[0])
+    known_outcome = np.broadcast_to(np.asarray(known_outcome, dtype=int), rows.shape)
+    known_stake = np.broadcast_to(np.asarray(known_stake, dtype=float), rows.shape)
+
+    implied = _implied_probabilities(odds)
+    total_implied = implied.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total_stake = known_stake * total_implied / implied[rows, known_outcome]
+
+    return batch_arbitrage_stakes(odds, np.nan_to_num(total_stake, nan=0.0, posinf=0.0))
+
+
+def best_rounded_stakes(odds, stakes, steps, min_stakes=None, max_stakes=None, usd_rates=None,
+                        search_steps: int = 3) -> Dict:
+    """
+    Round the stakes of one arb to each book's stake granularity, choosing the
+    combination with the best worst-case profit.
+
+    Every leg gets the candidates floor(stake/step) + [-search_steps .. search_steps + 1]
+    steps, clipped to the book's limits, and the whole grid (C^K combinations) is
+    scored at once.
+
+    Parameters:
+        odds (array-like): (K,) decimal odds.
+        stakes (array-like): (K,) unrounded stakes in each book's currency.
+        steps (array-like): (K,) stake granularity per book (e.g. 0.01, 1, 10).
+        min_stakes / max_stakes (array-like): (K,) limits per book in its currency; None for no limit.
+        usd_rates (array-like): (K,) USD per unit of each book's currency, so legs in
+            different currencies are compared on one scale (defaults to 1).
+        search_steps (int): Candidates on each side of the unrounded stake.
+
+    Returns:
+        Dict: stakes (rounded, book currency), stakes_usd, worst_case_profit_usd and
+        profit_by_outcome_usd, or {"error": ...} if no combination satisfies the limits.
+    """
+    odds = np.asarray(odds, dtype=float)
+    stakes = np.asarray(stakes, dtype=float)
+    steps = np.asarray(steps, dtype=float)
+    legs = odds.shape[0]
+    min_stakes = np.zeros(legs) if min_stakes is None else np.nan_to_num(np.asarray(min_stakes, dtype=float), nan=0.0)
+    max_stakes = np.full(legs, np.inf) if max_stakes is None else np.nan_to_num(np.asarray(max_stakes, dtype=float), nan=np.inf)
+    usd_rates = np.ones(legs) if usd_rates is None else np.asarray(usd_rates, dtype=float)
+
+    offsets = np.arange(-search_steps, search_steps + 2)
+    # (K, C) candidate stakes per leg; the round() removes float noise such as 0.30000000000000004
+    candidates = (np.floor(stakes / steps)[:, None] + offsets[None, :]) * steps[:, None]
+    candidates = np.round(candidates, 8)
+
+    # (C^K, K) every combination of per-leg candidates
+    grid = np.stack(np.meshgrid(*candidates, indexing="ij"), axis=-1).reshape(-1, legs)
+    valid = ((grid > 0) & (grid >= min_stakes) & (grid <= max_stakes)).all(axis=1)
+    if not valid.any():
+        return {"error": "No stake combination satisfies the bookmaker stake limits"}
+
+    grid_usd = grid * usd_rates
+    total_usd = grid_usd.sum(axis=1)
+    profit_by_outcome = grid_usd * odds - total_usd[:, None]
+    worst_case = np.where(valid, profit_by_outcome.min(axis=1), -np.inf)
+
+    # Best worst case; among equals prefer the combination closest to the requested stakes
+    distance = np.abs(grid - stakes).sum(axis=1)
+    best = np.lexsort((distance, -worst_case))[0]
+
+    return {
+        "stakes": [float(stake) for stake in grid[best]],
+        "stakes_usd": [round(float(stake), 2) for stake in grid_usd[best]],
+        "worst_case_profit_usd": round(float(worst_case[best]), 2),
+        "profit_by_outcome_usd": [round(float(profit), 2) for profit in profit_by_outcome[best]],
+    }
+
+
+def odds_field_count(opportunities: Sequence[Dict]) -> int:
+    """Highest N such that some opportunity has an odd_bkN field (at least 2)"""
+    count = 2
+    for opportunity in opportunities:
+        while f"{ODDS_FIELD_PREFIX}{count + 1}" in opportunity:
+            count += 1
+    return count
+
+
+def odds_matrix(opportunities: Sequence[Dict], outcomes: Optional[int] = None) -> np.ndarray:
+    """
+    Build the (M, K) odds matrix from opportunity dicts (odd_bk1, odd_bk2, odd_bk3, ...).
+    Missing or unparseable odds become NaN.
+    """
+    outcomes = outcomes or odds_field_count(opportunities)
+    matrix = np.full((len(opportunities), outcomes), np.nan)
+    for row, opportunity in enumerate(opportunities):
+        for column in range(outcomes):
+            value = opportunity.get(f"{ODDS_FIELD_PREFIX}{column + 1}")
+            if isinstance(value, (int, float)):
+                matrix[row, column] = value
+            elif isinstance(value, str) and value.strip():
+                parsed = parse_profit(value)
+                if parsed is not None:
+                    matrix[row, column] = parsed
+    return matrix
+
+
+def rank_opportunities(opportunities: Sequence[Dict], total_stake: float) -> List[Dict]:
+    """
+    Score every opportunity from its live-scraped odds and return the ones that are
+    still arbitrages, best expected profit first. Each returned dict gets a
+    "stake_engine" entry with the computed stakes and profit.
+    """
+    if not opportunities:
+        return []
+
+    result = batch_arbitrage_stakes(odds_matrix(opportunities), total_stake)
+    order = np.argsort(-np.nan_to_num(result["expected_profit"], nan=-np.inf), kind="stable")
+
+    ranked = []
+    for index in order:
+        if not result["is_arbitrage"][index]:
+            continue
+        opportunity = dict(opportunities[index])
+        stakes = result["stakes"][index]
+        opportunity["stake_engine"] = {
+            "stakes": [round(float(stake), 2) for stake in stakes if stake > 0],
+            "profit_percent": round(float(result["profit_percent"][index]), 2),
+            "expected_profit": round(float(result["expected_profit"][index]), 2),
+        }
+        ranked.append(opportunity)
+    return ranked
+
+
+if __name__ == "__main__":
+    example_odds = [
+        [2.10, 2.05, np.nan],   # 2-way DNB arb
+        [1.80, 1.95, np.nan],   # no arb
+        [3.40, 3.60, 3.30],     # 3-way 1X2 arb
+    ]
+    example = batch_arbitrage_stakes(example_odds, 100)
+    print("🧮 Batch stake engine example (total stake 100)")
+    for i, odds_row in enumerate(example_odds):
+        print(f"  odds={odds_row} arb={bool(example['is_arbitrage'][i])} "
+              f"profit={example['profit_percent'][i]:.2f}% stakes={np.round(example['stakes'][i], 2).tolist()}")
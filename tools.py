@@ -1,6 +1,9 @@
 from currency_converter import CurrencyConverter
 import requests
+import time
+from decimal import Decimal
 from config_manager import ConfigManager
+from money import Money, parse_money, to_decimal
 
 # Import all your existing bookmaker functions
 from sporty import balance_checker, bet_placer
@@ -13,9 +16,16 @@ from bet9ja import bet9ja_balance_checker, bet9ja_bet_placer
 from nairabet import nairabet_balance_checker, nairabet_bet_placer
 
 
+# How long a fetched exchange rate is reused
+RATE_CACHE_SECONDS = 600
+
+
 class BettingBot:
     def __init__(self):
         self.config = ConfigManager()
+        self._rate_cache = {}
+        # Pinned rates per 1 USD (set_rate_snapshot), used instead of the library/API
+        self._rate_snapshot = {}
 
     def get_credentials(self, bookmaker_name: str) -> dict:
         """Get credentials for a bookmaker from config"""
@@ -26,21 +36,36 @@ class BettingBot:
             print(f"⚠️ No credentials found for {bookmaker_name}")
             return {"username": "", "password": ""}
 
-    def currency_converter(self, amount: float, from_currency: str, to_currency: str) -> float:
+    def set_rate_snapshot(self, rates_per_usd: dict):
         """
-        Hybrid currency converter using currency_converter library with API fallback
+        Pin exchange rates for offline runs (benchmarks): {currency: units per 1 USD}.
+        Conversions between pinned currencies never reach the library or the API.
+        """
+        self._rate_snapshot = {currency.upper(): to_decimal(rate) for currency, rate in rates_per_usd.items()}
+
+    def exchange_rate(self, from_currency: str, to_currency: str) -> Decimal:
+        """
+        Hybrid exchange rate lookup using currency_converter library with API fallback.
+        Rates are cached for RATE_CACHE_SECONDS so a stake calculation does not hit the
+        API once per conversion.
         """
         from_currency = from_currency.upper()
         to_currency = to_currency.upper()
         
         if from_currency == to_currency:
-            return amount
+            return Decimal(1)
+        
+        if from_currency in self._rate_snapshot and to_currency in self._rate_snapshot:
+            return self._rate_snapshot[to_currency] / self._rate_snapshot[from_currency]
+        
+        cached = self._rate_cache.get((from_currency, to_currency))
+        if cached and time.time() - cached[1] < RATE_CACHE_SECONDS:
+            return cached[0]
         
         def try_currency_converter_library():
             try:
                 c = CurrencyConverter()
-                result = c.convert(amount, from_currency, to_currency)
-                return round(result, 2)
+                return c.convert(1, from_currency, to_currency)
             except Exception as e:
                 raise Exception(f"currency_converter library failed: {e}")
         
@@ -55,9 +80,7 @@ class BettingBot:
                 if to_currency not in data['rates']:
                     raise Exception(f"Currency {to_currency} not supported by API")
                 
-                rate = data['rates'][to_currency]
-                result = amount * rate
-                return round(result, 2)
+                return data['rates'][to_currency]
                 
             except requests.exceptions.RequestException as e:
                 raise Exception(f"API request failed: {e}")
@@ -69,20 +92,36 @@ class BettingBot:
         if from_currency in api_required_currencies or to_currency in api_required_currencies:
             try:
                 print(f"🌐 Using API for {from_currency}→{to_currency}")
-                return try_api_fallback()
+                rate = try_api_fallback()
             except Exception as e:
                 raise Exception(f"API failed for special currency conversion: {e}")
-        
-        try:
-            print(f"📚 Using currency_converter library for {from_currency}→{to_currency}")
-            return try_currency_converter_library()
-        except Exception as library_error:
-            print(f"❌ Library failed: {library_error}")
-            print(f"🌐 Falling back to API for {from_currency}→{to_currency}")
+        else:
             try:
-                return try_api_fallback()
-            except Exception as api_error:
-                raise Exception(f"Both methods failed. Library: {library_error}, API: {api_error}")
+                print(f"📚 Using currency_converter library for {from_currency}→{to_currency}")
+                rate = try_currency_converter_library()
+            except Exception as library_error:
+                print(f"❌ Library failed: {library_error}")
+                print(f"🌐 Falling back to API for {from_currency}→{to_currency}")
+                try:
+                    rate = try_api_fallback()
+                except Exception as api_error:
+                    raise Exception(f"Both methods failed. Library: {library_error}, API: {api_error}")
+        
+        rate = to_decimal(rate)
+        self._rate_cache[(from_currency, to_currency)] = (rate, time.time())
+        return rate
+    
+    def convert_money(self, money: Money, to_currency: str) -> Money:
+        """Convert Money exactly (Decimal rate, rounded to cents once at the end)"""
+        to_currency = to_currency.upper()
+        rate = self.exchange_rate(money.currency, to_currency)
+        return Money(money.amount * rate, to_currency).quantize()
+    
+    def currency_converter(self, amount: float, from_currency: str, to_currency: str) -> float:
+        """
+        Convert an amount between currencies, rounded to 2 decimals
+        """
+        return float(self.convert_money(parse_money(amount, from_currency), to_currency).amount)
     
     def calculate_arbitrage_stakes(self, odd1: float, odd2: float, max_stake: float) -> dict:
         """Calculate optimal stakes for arbitrage betting"""
@@ -163,7 +202,7 @@ class BettingBot:
         }
     
     # Balance checker methods
-    async def sporty_balance_checker(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def sporty_balance_checker(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on SportyBet for the logged-in user."""
         print("🔍 Starting SportyBet balance check...")
         try:
@@ -173,7 +212,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 print(f"✅ Direct balance result: {balance_result.balance}")
@@ -201,7 +240,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def leon_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def leon_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on Leon.ru for the logged-in user."""
         print("🔍 Starting Leon.ru balance check...")
         try:
@@ -211,7 +250,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await leon_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await leon_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -236,7 +275,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def marathonbet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def marathonbet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on Marathonbet for the logged-in user."""
         print("🔍 Starting Marathonbet balance check...")
         try:
@@ -246,7 +285,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await marathonbet_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await marathonbet_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -271,7 +310,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def zenitbet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def zenitbet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on Zenitbet for the logged-in user."""
         print("🔍 Starting Zenitbet balance check...")
         try:
@@ -281,7 +320,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await zenitbet_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await zenitbet_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -306,7 +345,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def vbet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def vbet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on Vbet for the logged-in user."""
         print("🔍 Starting Vbet balance check...")
         try:
@@ -316,7 +355,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await vbet_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await vbet_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -341,7 +380,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def sports888_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def sports888_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on Sports888 for the logged-in user."""
         print("🔍 Starting 888Sports balance check...")
         try:
@@ -351,7 +390,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await sport888_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await sport888_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -376,7 +415,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def bet9ja_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def bet9ja_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on Bet9ja for the logged-in user."""
         print("🔍 Starting Bet9ja balance check...")
         try:
@@ -386,7 +425,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await bet9ja_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await bet9ja_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -411,7 +450,7 @@ class BettingBot:
                 "error_message": str(e)
             }
     
-    async def nairabet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str) -> dict:
+    async def nairabet_balance_checker_tool(self, executable_path: str, user_data_dir: str, email: str, password: str, browser_session=None) -> dict:
         """Check balance on NairaBet for the logged-in user."""
         print("🔍 Starting NairaBet balance check...")
         try:
@@ -421,7 +460,7 @@ class BettingBot:
             if not password:
                 password = creds["password"]
                 
-            balance_result = await nairabet_balance_checker(executable_path, user_data_dir, email, password)
+            balance_result = await nairabet_balance_checker(executable_path, user_data_dir, email, password, browser_session=browser_session)
             
             if balance_result:
                 return {
@@ -447,7 +486,7 @@ class BettingBot:
             }
     
     # Bet placer methods
-    async def sporty_bet_placer(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def sporty_bet_placer(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on SportyBet with the provided betting information."""
         print("🔍 Starting SportyBet bet placement...")
         try:
@@ -462,10 +501,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await bet_placer(sporty_betting_data, executable_path, user_data_dir)
+            result = await bet_placer(sporty_betting_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -498,7 +537,7 @@ class BettingBot:
                 }
             }
     
-    async def leon_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def leon_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on Leon.ru with the provided betting information."""
         print("🔍 Starting Leon.ru bet placement...")
         try:
@@ -513,10 +552,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 100))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 100))
             }
             
-            result = await leon_bet_placer(input_data, executable_path, user_data_dir)
+            result = await leon_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -544,7 +583,7 @@ class BettingBot:
                 }
             }
     
-    async def marathonbet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def marathonbet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on Marathonbet with the provided betting information."""
         print("🔍 Starting Marathonbet bet placement...")
         try:
@@ -559,10 +598,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await marathonbet_bet_placer(input_data, executable_path, user_data_dir)
+            result = await marathonbet_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -590,7 +629,7 @@ class BettingBot:
                 }
             }
     
-    async def zenitbet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def zenitbet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on Zenitbet with the provided betting information."""
         print("🔍 Starting Zenitbet bet placement...")
         try:
@@ -605,10 +644,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await zenitbet_bet_placer(input_data, executable_path, user_data_dir)
+            result = await zenitbet_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -636,7 +675,7 @@ class BettingBot:
                 }
             }
     
-    async def vbet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def vbet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on Vbet with the provided betting information."""
         print("🔍 Starting Vbet bet placement...")
         try:
@@ -651,10 +690,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await vbet_bet_placer(input_data, executable_path, user_data_dir)
+            result = await vbet_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -682,7 +721,7 @@ class BettingBot:
                 }
             }
     
-    async def sports888_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def sports888_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on 888Sports with the provided betting information."""
         print("🔍 Starting 888Sports bet placement...")
         try:
@@ -697,10 +736,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await sport888_bet_placer(input_data, executable_path, user_data_dir)
+            result = await sport888_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -728,7 +767,7 @@ class BettingBot:
                 }
             }
     
-    async def bet9ja_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def bet9ja_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on Bet9ja with the provided betting information."""
         print("🔍 Starting Bet9ja bet placement...")
         try:
@@ -743,10 +782,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await bet9ja_bet_placer(input_data, executable_path, user_data_dir)
+            result = await bet9ja_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -774,7 +813,7 @@ class BettingBot:
                 }
             }
     
-    async def nairabet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str) -> dict:
+    async def nairabet_bet_placer_tool(self, betting_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None) -> dict:
         """Place a bet on NairaBet with the provided betting information."""
         print("🔍 Starting NairaBet bet placement...")
         try:
@@ -789,10 +828,10 @@ class BettingBot:
                 "bet_type_bk": betting_data.get("bet_type_bk", ""),
                 "odd_bk": betting_data.get("odd_bk", ""),
                 "link_bk": betting_data.get("link_bk", ""),
-                "stake_amount": float(betting_data.get("stake_amount", 0))
+                "stake_amount": to_decimal(betting_data.get("stake_amount", 0))
             }
             
-            result = await nairabet_bet_placer(input_data, executable_path, user_data_dir)
+            result = await nairabet_bet_placer(input_data, executable_path, user_data_dir, odds_check=odds_check, browser_session=browser_session)
             
             if result:
                 return {
@@ -1,13 +1,18 @@
-from langchain_anthropic import ChatAnthropic  
+from llm_cache import chat_model
 from browser_use import Agent, BrowserSession, Controller, ActionResult
 from dotenv import load_dotenv  
 import asyncio
 import os
-import json
-from pathlib import Path
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
+from odds_gate import odds_check_ready, odds_gate_abort_result, read_betslip_odds
+from browser_sessions import browser_session_options, save_storage_state, session_storage_state
+from dom_balance import read_balance_from_dom
+from latency import span, timed
+from agent_usage import run_agent
+from agent_trace import evaluate_js, traced_action
+from journal import JOURNAL, new_run_id
 
 load_dotenv()   
 
@@ -42,11 +47,12 @@ controller5 = Controller(output_model=Placer)
 # ==================== VBET CONTROLLER ACTIONS ====================
 
 @controller4.action('Login with VBet credentials')
+@traced_action
 async def login_with_vbet_credentials(browser, username: str, password: str) -> ActionResult:
     """Login to VBet with provided credentials"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (username, password) => {
             try {
                 // Check if already logged in by looking for balance
@@ -169,64 +175,69 @@ async def login_with_vbet_credentials(browser, username: str, password: str) ->
     return ActionResult(extracted_content=f"VBet Login result: {result}")
 
 @controller4.action('Ask human for help with issues')
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
-@controller4.action('Get VBet balance')
-async def get_vbet_balance(browser) -> ActionResult:
-    """Get current balance from VBet account"""
-    page = await browser.get_current_page()
-    
-    result = await page.evaluate("""
-        async () => {
-            try {
-                // Look for balance elements
-                const balanceElement = document.querySelector('.balanceAmount');
-                const currencyElement = document.querySelector('.currencySymbol');
-                
-                if (!balanceElement) {
-                    return {
-                        success: false,
-                        is_logged_in: false,
-                        error: 'Balance element not found - user might not be logged in'
-                    };
-                }
-                
-                const balanceText = balanceElement.textContent.trim();
-                const currencyText = currencyElement ? currencyElement.textContent.trim() : '$';
-                
-                if (!balanceText) {
-                    return {
-                        success: false,
-                        is_logged_in: false,
-                        error: 'Balance is empty - user might not be logged in'
-                    };
-                }
-                
+VBET_BALANCE_JS = """
+    async () => {
+        try {
+            // Look for balance elements
+            const balanceElement = document.querySelector('.balanceAmount');
+            const currencyElement = document.querySelector('.currencySymbol');
+            
+            if (!balanceElement) {
                 return {
-                    success: true,
-                    is_logged_in: true,
-                    balance: balanceText + ' ' + currencyText
+                    success: false,
+                    is_logged_in: false,
+                    error: 'Balance element not found - user might not be logged in'
                 };
-                
-            } catch (error) {
+            }
+            
+            const balanceText = balanceElement.textContent.trim();
+            const currencyText = currencyElement ? currencyElement.textContent.trim() : '$';
+            
+            if (!balanceText) {
                 return {
                     success: false,
-                    error: error.message
+                    is_logged_in: false,
+                    error: 'Balance is empty - user might not be logged in'
                 };
             }
+            
+            return {
+                success: true,
+                is_logged_in: true,
+                balance: balanceText + ' ' + currencyText
+            };
+            
+        } catch (error) {
+            return {
+                success: false,
+                error: error.message
+            };
         }
-    """)
+    }
+"""
+
+@controller4.action('Get VBet balance')
+@traced_action
+async def get_vbet_balance(browser) -> ActionResult:
+    """Get current balance from VBet account"""
+    page = await browser.get_current_page()
+    
+    result = await evaluate_js(page, VBET_BALANCE_JS)
     
     return ActionResult(extracted_content=f"VBet Balance result: {result}")
 
 @controller3.action('Count VBet betslip games')
+@traced_action
 async def count_vbet_betslip_games(browser) -> ActionResult:
     """Count number of games in VBet betslip"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         () => {
             try {
                 // Look for betslip items
@@ -264,11 +275,13 @@ async def count_vbet_betslip_games(browser) -> ActionResult:
     return ActionResult(extracted_content=f"VBet Betslip count: {result}")
 
 @controller5.action('Fill VBet stake amount')
+@traced_action
+@timed("stake_fill")
 async def fill_vbet_stake_amount(browser, stake: float = 100) -> ActionResult:
     """Fill stake amount in VBet betslip"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (stakeAmount) => {
             try {
                 // Look for stake input field
@@ -317,11 +330,13 @@ async def fill_vbet_stake_amount(browser, stake: float = 100) -> ActionResult:
     return ActionResult(extracted_content=f"VBet Stake fill result: {result}")
 
 @controller5.action('Click VBet place bet button')
+@traced_action
+@timed("place_click")
 async def click_vbet_place_bet(browser) -> ActionResult:
     """Click the Bet Now button in VBet"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             try {
                 // Look for place bet button
@@ -398,31 +413,40 @@ async def click_vbet_place_bet(browser) -> ActionResult:
 
 # ==================== MAIN AUTOMATION FUNCTIONS ====================
 
-async def vbet_balance_checker(executable_path, user_data_dir, username, password):
+async def vbet_balance_checker(executable_path, user_data_dir, username, password, browser_session=None):
     """Check VBet balance"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"vbet_balance_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting VBet balance check...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("vbet"),
+                keep_alive=True,
+                storage_state=session_storage_state("vbet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
-        # Agent 4: Balance Checker
-        agent4 = Agent(
-            task=f"""You are a VBet balance checker. Follow these exact steps:
+        # Read the balance straight from the page; the agent only runs if that fails
+        balance = None
+        dom_balance = await read_balance_from_dom(browser_session, "VBet", "https://vbet.com", VBET_BALANCE_JS)
+        if dom_balance:
+            balance = Balance(is_logged_in=True, balance=dom_balance)
+            await save_storage_state(browser_session, "vbet", user_data_dir)
+            print("✅ VBet balance check completed!")
+        else:
+            # Agent 4: Balance Checker (fallback)
+            agent4 = Agent(
+                task=f"""You are a VBet balance checker. Follow these exact steps:
 
 STEP 1: Navigate to VBet
 - Navigate to https://vbet.com
@@ -457,24 +481,25 @@ Expected output format:
 - balance: actual amount with currency (e.g., "3.74 $")
 - currency: "usd"
 - error_message: any issues encountered""",
-            llm=ChatAnthropic(model="claude-3-7-sonnet-20250219"),
-            browser_session=browser_session,
-            sensitive_data={
-                "username": username,
-                "password": password
-            },
-            controller=controller4,
-        )
+                llm=chat_model("claude-3-7-sonnet-20250219", cached=True),
+                browser_session=browser_session,
+                sensitive_data={
+                    "username": username,
+                    "password": password
+                },
+                controller=controller4,
+            )
         
-        history4 = await agent4.run()
-        result4 = history4.final_result()
-        balance = None
+            history4 = await run_agent(agent4, "vbet", "balance")
+            result4 = history4.final_result()
         
-        if result4:
-            balance = Balance.model_validate_json(result4)
-            print("✅ VBet balance check completed!")
-        else:
-            print("❌ VBet balance check failed")
+            if result4:
+                balance = Balance.model_validate_json(result4)
+                if balance.is_logged_in:
+                    await save_storage_state(browser_session, "vbet", user_data_dir)
+                print("✅ VBet balance check completed!")
+            else:
+                print("❌ VBet balance check failed")
         
         # Save results
         combined_results = {
@@ -483,9 +508,8 @@ Expected output format:
             "balance": balance.model_dump() if balance else None
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("balance", "vbet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return balance
         
@@ -499,28 +523,28 @@ Expected output format:
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
-async def vbet_bet_placer(input_data: dict, executable_path: str, user_data_dir: str):
+async def vbet_bet_placer(input_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None):
     """Place bet on VBet"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"vbet_bet_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting VBet bet placement...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-     
-        print("✅ Browser session created successfully")
-        
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("vbet"),
+                keep_alive=True,
+                storage_state=session_storage_state("vbet", user_data_dir),
+            )
+
+            print("✅ Browser session created successfully")
+
         # Agent 2: Bet Placement
         agent2 = Agent(
             task=f"""You will place a bet on VBet based on this input data: {input_data}
@@ -544,12 +568,13 @@ Your output should include:
 - The input data you processed
 - Success/failure status
 - Any errors encountered""",
-            llm=ChatAnthropic(model="claude-3-7-sonnet-20250219"),
+            llm=chat_model("claude-3-7-sonnet-20250219"),
             browser_session=browser_session,
             controller=controller
         )
         
-        history2 = await agent2.run()
+        with span("navigation_selection"):
+            history2 = await run_agent(agent2, "vbet", "select")
         result2 = history2.final_result()
         bet_result = None
         
@@ -572,12 +597,13 @@ Your task:
 5. Describe what you see in the betslip
 
 Previous bet placement result: {bet_result.input_data if bet_result else 'No result'}""",
-            llm=ChatAnthropic(model="claude-3-7-sonnet-20250219"),
+            llm=chat_model("claude-3-7-sonnet-20250219", cached=True),
             browser_session=browser_session,
             controller=controller3,
         )
         
-        history3 = await agent3.run()
+        with span("betslip_verification"):
+            history3 = await run_agent(agent3, "vbet", "verify")
         result3 = history3.final_result()
         site_analysis = None
         
@@ -589,6 +615,17 @@ Previous bet placement result: {bet_result.input_data if bet_result else 'No res
 
         # Agent 5: Bet Placer
         stake_amount = input_data.get('stake_amount', 100)
+        
+        # Re-verify the live betslip odds right before committing the stake
+        if odds_check is not None:
+            await odds_check_ready(odds_check)
+            with span("odds_gate_read"):
+                live_odd = await read_betslip_odds(browser_session, "vbet")
+            stake_amount = await odds_check(live_odd)
+            if stake_amount is None:
+                print("🛑 Odds gate aborted VBet bet placement")
+                return odds_gate_abort_result("VBet", input_data, live_odd)
+        
         agent5 = Agent(
             task=f"""You are the final bet placer for VBet. Your stake amount is {stake_amount}.
 
@@ -602,12 +639,13 @@ STEPS:
 Expected final result:
 - is_place_bet: true/false
 - error_message: any issues encountered""",
-            llm=ChatAnthropic(model="claude-3-7-sonnet-20250219"),
+            llm=chat_model("claude-3-7-sonnet-20250219"),
             browser_session=browser_session,
             controller=controller5,
         )
         
-        history5 = await agent5.run()
+        with span("stake_fill_click"):
+            history5 = await run_agent(agent5, "vbet", "place")
         result5 = history5.final_result()
         placer_result = None
         
@@ -632,9 +670,8 @@ Expected final result:
             }
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("bet", "vbet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return combined_results
         
@@ -643,8 +680,9 @@ Expected final result:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
@@ -1,13 +1,18 @@
-from langchain_anthropic import ChatAnthropic  
+from llm_cache import chat_model
 from browser_use import Agent, BrowserSession, Controller, ActionResult
 from dotenv import load_dotenv  
 import asyncio
 import os
-import json
-from pathlib import Path
 from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
+from odds_gate import odds_check_ready, odds_gate_abort_result, read_betslip_odds
+from browser_sessions import browser_session_options, save_storage_state, session_storage_state
+from dom_balance import read_balance_from_dom
+from latency import span, timed
+from agent_usage import run_agent
+from agent_trace import evaluate_js, traced_action
+from journal import JOURNAL, new_run_id
 
 load_dotenv()   
 
@@ -42,11 +47,12 @@ controller5 = Controller(output_model=Placer)
 # ==================== ZENITBET CONTROLLER ACTIONS ====================
 
 @controller4.action('Login with ZenitBet credentials')
+@traced_action
 async def login_with_zenitbet_credentials(browser, login: str, password: str) -> ActionResult:
     """Login to ZenitBet with provided credentials"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async (credentials) => {
             try {
                 const { login, password } = credentials;
@@ -165,21 +171,24 @@ async def login_with_zenitbet_credentials(browser, login: str, password: str) ->
     return ActionResult(extracted_content=f"ZenitBet Login result: {result}")
 
 @controller4.action('Ask human for help with issues')   
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
 @controller5.action('Ask human for help with issues')   
+@traced_action
 def ask_human(question: str) -> ActionResult:
     answer = input(f'{question} > ')
     return ActionResult(extracted_content=f'The human responded with: {answer}', include_in_memory=True)
 
 @controller3.action('Count ZenitBet betslip games')
+@traced_action
 async def count_zenitbet_betslip_games(browser) -> ActionResult:
     """Count number of games in ZenitBet betslip"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         () => {
             try {
                 // Look for betslip items
@@ -221,11 +230,13 @@ async def count_zenitbet_betslip_games(browser) -> ActionResult:
     return ActionResult(extracted_content=f"ZenitBet Stake fill result: {result}")
 
 @controller5.action('Click ZenitBet place bet button')
+@traced_action
+@timed("place_click")
 async def click_zenitbet_place_bet(browser) -> ActionResult:
     """Click the Place Bet button in ZenitBet"""
     page = await browser.get_current_page()
     
-    result = await page.evaluate("""
+    result = await evaluate_js(page, """
         async () => {
             try {
                 // Look for place bet button
@@ -300,33 +311,82 @@ async def click_zenitbet_place_bet(browser) -> ActionResult:
     
     return ActionResult(extracted_content=f"ZenitBet Place bet result: {result}")
 
+ZENITBET_BALANCE_JS = """
+    async () => {
+        try {
+            // Balance display with RUB in the top-right corner
+            const balanceElement = document.querySelector('[class*="balance"]');
+            
+            if (!balanceElement) {
+                return {
+                    success: false,
+                    is_logged_in: false,
+                    error: 'Balance element not found - user might not be logged in'
+                };
+            }
+            
+            const balanceText = balanceElement.textContent.trim();
+            
+            // Check if balance shows Russian Rubles
+            if (!/\\d/.test(balanceText) || !(balanceText.includes('RUB') || balanceText.includes('₽'))) {
+                return {
+                    success: false,
+                    is_logged_in: false,
+                    error: 'Balance does not contain RUB - user might not be logged in'
+                };
+            }
+            
+            return {
+                success: true,
+                is_logged_in: true,
+                balance: balanceText
+            };
+            
+        } catch (error) {
+            return {
+                success: false,
+                error: error.message
+            };
+        }
+    }
+"""
+
 # ==================== MAIN AUTOMATION FUNCTIONS ====================
 
-async def zenitbet_balance_checker(executable_path, user_data_dir, login, password):
+async def zenitbet_balance_checker(executable_path, user_data_dir, login, password, browser_session=None):
     """Check ZenitBet balance"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"zenitbet_balance_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting ZenitBet balance check...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("zenitbet"),
+                keep_alive=True,
+                storage_state=session_storage_state("zenitbet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
-        # Agent 4: Balance Checker
-        agent4 = Agent(
-            task=f"""You are a ZenitBet balance checker. Follow these exact steps:
+        # Read the balance straight from the page; the agent only runs if that fails
+        balance = None
+        dom_balance = await read_balance_from_dom(browser_session, "ZenitBet", "https://zenitbet.com", ZENITBET_BALANCE_JS)
+        if dom_balance:
+            balance = Balance(is_logged_in=True, balance=dom_balance)
+            await save_storage_state(browser_session, "zenitbet", user_data_dir)
+            print("✅ ZenitBet balance check completed!")
+        else:
+            # Agent 4: Balance Checker (fallback)
+            agent4 = Agent(
+                task=f"""You are a ZenitBet balance checker. Follow these exact steps:
 
 STEP 1: Navigate to ZenitBet
 - Navigate to https://zenitbet.com
@@ -360,24 +420,25 @@ Expected output format:
 - balance: actual amount with currency (e.g., "RUB0.00")
 - currency: "rub"
 - error_message: any issues encountered""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
-            browser_session=browser_session,
-            sensitive_data={
-                "login": login,
-                "password": password
-            },
-            controller=controller4,
-        )
+                llm=chat_model("claude-3-5-sonnet-20241022", cached=True),
+                browser_session=browser_session,
+                sensitive_data={
+                    "login": login,
+                    "password": password
+                },
+                controller=controller4,
+            )
         
-        history4 = await agent4.run()
-        result4 = history4.final_result()
-        balance = None
+            history4 = await run_agent(agent4, "zenitbet", "balance")
+            result4 = history4.final_result()
         
-        if result4:
-            balance = Balance.model_validate_json(result4)
-            print("✅ ZenitBet balance check completed!")
-        else:
-            print("❌ ZenitBet balance check failed")
+            if result4:
+                balance = Balance.model_validate_json(result4)
+                if balance.is_logged_in:
+                    await save_storage_state(browser_session, "zenitbet", user_data_dir)
+                print("✅ ZenitBet balance check completed!")
+            else:
+                print("❌ ZenitBet balance check failed")
         
         # Save results
         combined_results = {
@@ -386,9 +447,8 @@ Expected output format:
             "balance": balance.model_dump() if balance else None
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("balance", "zenitbet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return balance
         
@@ -397,32 +457,34 @@ Expected output format:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 
-async def zenitbet_bet_placer(input_data: dict, executable_path: str, user_data_dir: str):
+async def zenitbet_bet_placer(input_data: dict, executable_path: str, user_data_dir: str, odds_check=None, browser_session=None):
     """Place bet on ZenitBet"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    conv_dir = Path("conversations")
-    conv_dir.mkdir(exist_ok=True)
-    temp_path = str(conv_dir / f"zenitbet_bet_{timestamp}.json")
+    run_id = new_run_id()
     
     print(f"🚀 Starting ZenitBet bet placement...")
-    print(f"💾 Results will be saved to: {temp_path}")
+    print(f"💾 Results will be journaled as run {run_id}")
     
     try:
-        browser_session = BrowserSession(
-            executable_path=executable_path,
-            user_data_dir=user_data_dir,
-            headless=False,
-            keep_alive=True,
-            storage_state=None,
-        )
-        
-        await browser_session.start()
-        print("✅ Browser session created successfully")
+        # Reuse the caller's session (pipelined execution) or open our own
+        owns_session = browser_session is None
+        if owns_session:
+            browser_session = BrowserSession(
+                executable_path=executable_path,
+                user_data_dir=user_data_dir,
+                **browser_session_options("zenitbet"),
+                keep_alive=True,
+                storage_state=session_storage_state("zenitbet", user_data_dir),
+            )
+            
+            await browser_session.start()
+            print("✅ Browser session created successfully")
         
         # Agent 2: Bet Placement
         agent2 = Agent(
@@ -447,12 +509,13 @@ Your output should include:
 - The input data you processed
 - Success/failure status
 - Any errors encountered""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
+            llm=chat_model("claude-3-5-sonnet-20241022"),
             browser_session=browser_session,
             controller=controller
         )
         
-        history2 = await agent2.run()
+        with span("navigation_selection"):
+            history2 = await run_agent(agent2, "zenitbet", "select")
         result2 = history2.final_result()
         bet_result = None
         
@@ -475,12 +538,13 @@ Your task:
 5. Describe what you see in the betslip
 
 Previous bet placement result: {bet_result.input_data if bet_result else 'No result'}""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
+            llm=chat_model("claude-3-5-sonnet-20241022", cached=True),
             browser_session=browser_session,
             controller=controller3,
         )
         
-        history3 = await agent3.run()
+        with span("betslip_verification"):
+            history3 = await run_agent(agent3, "zenitbet", "verify")
         result3 = history3.final_result()
         site_analysis = None
         
@@ -492,6 +556,17 @@ Previous bet placement result: {bet_result.input_data if bet_result else 'No res
 
         # Agent 5: Bet Placer
         stake_amount = input_data.get('stake_amount')
+        
+        # Re-verify the live betslip odds right before committing the stake
+        if odds_check is not None:
+            await odds_check_ready(odds_check)
+            with span("odds_gate_read"):
+                live_odd = await read_betslip_odds(browser_session, "zenitbet")
+            stake_amount = await odds_check(live_odd)
+            if stake_amount is None:
+                print("🛑 Odds gate aborted ZenitBet bet placement")
+                return odds_gate_abort_result("ZenitBet", input_data, live_odd)
+        
         agent5 = Agent(
             task=f"""You are the persisitent final bet placer for ZenitBet. Your stake amount is {stake_amount}.
 
@@ -508,12 +583,13 @@ STEPS:
 Expected final result:
 - is_place_bet: true/false
 - error_message: any issues encountered""",
-            llm=ChatAnthropic(model="claude-3-5-sonnet-20241022"),
+            llm=chat_model("claude-3-5-sonnet-20241022"),
             browser_session=browser_session,
             controller=controller5,
         )
         
-        history5 = await agent5.run()
+        with span("stake_fill_click"):
+            history5 = await run_agent(agent5, "zenitbet", "place")
         result5 = history5.final_result()
         placer_result = None
         
@@ -538,9 +614,8 @@ Expected final result:
             }
         }
 
-        with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(combined_results, f, indent=2, ensure_ascii=False)
-        print(f"✅ Results saved to: {temp_path}")
+        JOURNAL.record("bet", "zenitbet", combined_results, run_id=run_id)
+        print(f"✅ Results journaled: run {run_id}")
         
         return combined_results
         
@@ -549,8 +624,9 @@ Expected final result:
         return None
     finally:
         try:
-            await browser_session.close()
-            print("🧹 Browser session closed successfully")
+            if owns_session:
+                await browser_session.close()
+                print("🧹 Browser session closed successfully")
         except Exception as cleanup_error:
             print(f"⚠️ Cleanup warning: {cleanup_error}")
 